@@ -0,0 +1,137 @@
+"""
+Бенчмарк уровней детализации анимации: время кадра со множеством удаленных
+актеров с AnimationLOD и без него.
+
+Актеры - настоящие Actor с анимацией: модель игрока, а если ее нет -
+панда из моделей Panda3D (models/panda-model, models/panda-walk4). Каждый
+кадр, как при интерполяции снимков, актеры сдвигаются, а камера
+поворачивается. Прогрев - полный оборот камеры: первая отрисовка каждого
+актера дорогая (при программном OpenGL - секунды) и к LOD отношения не имеет.
+Сравниваются медианы: программный OpenGL и после прогрева периодически
+задерживает отдельные кадры на сотни миллисекунд в обоих режимах.
+Код выхода 1, если актеры не анимированы или медианный кадр с LOD не быстрее
+медианного кадра без него.
+
+Запуск: python -m benchmarks.animation_lod --actors 200 --frames 300
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from panda3d.core import loadPrcFileData
+
+from nine.core.actors import PLAYER_ANIMS, PLAYER_MODEL, ActorPool, ModelCache
+from nine.core.anim_lod import AnimationLOD
+
+FALLBACK_MODEL = "models/panda-model"
+FALLBACK_ANIM = "models/panda-walk4"
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(base, lod: AnimationLOD, actors, frames: int, rng: np.random.Generator, sweep: float = 30.0):
+    """
+    Время кадра целиком и отдельно lod.update(). Камера за frames кадров
+    качается на sweep градусов в обе стороны (при sweep=180 - полный оборот).
+    """
+    frame_samples, update_samples = [], []
+    states = ("walk", "idle")
+    positions = np.array([tuple(actor.getPos()) for actor in actors])
+    velocity = rng.normal(0, 0.05, size=positions.shape)
+    velocity[:, 2] = 0
+    for frame in range(frames):
+        # Как world_state: часть актеров меняет состояние.
+        for key in rng.choice(len(actors), size=max(1, len(actors) // 20), replace=False).tolist():
+            lod.set_state(key, states[(frame + key) % 2])
+        start = time.perf_counter()
+        positions += velocity
+        for actor, pos in zip(actors, positions.tolist()):
+            actor.setPos(*pos)
+        phase = frame / frames
+        base.camera.setH(360 * phase if sweep >= 180 else sweep * math.sin(2 * math.pi * phase))
+        update_start = time.perf_counter()
+        lod.update()
+        update_samples.append(time.perf_counter() - update_start)
+        base.taskMgr.step()
+        frame_samples.append(time.perf_counter() - start)
+    return frame_samples, update_samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--actors", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--extent", type=float, default=100.0)
+    parser.add_argument("--model", default=None, help="модель актера (по умолчанию модель игрока или панда)")
+    parser.add_argument("--anim", default=None, help="файл анимации для walk и idle")
+    args = parser.parse_args()
+
+    loadPrcFileData("", "window-type offscreen\naudio-library-name null\nsync-video false")
+    from direct.actor.Actor import Actor
+    from direct.showbase.ShowBase import ShowBase
+
+    model = args.model
+    anims = {"walk": args.anim, "idle": args.anim} if args.anim else None
+    if model is None:
+        if os.path.exists(PLAYER_MODEL):
+            model, anims = PLAYER_MODEL, anims or PLAYER_ANIMS
+        else:
+            model, anims = FALLBACK_MODEL, anims or {"walk": FALLBACK_ANIM, "idle": FALLBACK_ANIM}
+
+    base = ShowBase()
+    base.disableMouse()
+    base.camera.setPos(0, -10, 3)
+
+    models = ModelCache(base.loader)
+    pool = ActorPool(models, base.render, model_path=model, anims=anims or PLAYER_ANIMS, scale=0.3)
+    rng = np.random.default_rng(42)
+
+    actors = []
+    for key in range(args.actors):
+        actor = pool.acquire((rng.random(), rng.random(), rng.random(), 1))
+        # Актеры по всему кругу вокруг камеры: часть впереди, часть позади и вдали.
+        actor.setPos(rng.uniform(-args.extent, args.extent), rng.uniform(-args.extent, args.extent), 0)
+        actors.append(actor)
+    if not isinstance(actors[0], Actor) or not actors[0].getNumFrames("walk"):
+        print(f"ПРОВЕРКА НЕ ПРОЙДЕНА: {model} - не анимированная модель, замер без смысла")
+        base.destroy()
+        sys.exit(1)
+
+    lod = AnimationLOD(base, models)
+    for key, actor in enumerate(actors):
+        lod.add(key, actor)
+
+    print(f"{args.actors} актеров ({model}), {args.frames} кадров; время в мс")
+    print(f"{'режим':<10} {'кадр mean':>10} {'кадр p50':>10} {'кадр p95':>10} {'update':>10}")
+    results = {}
+    for name, enabled in (("без LOD", False), ("LOD", True)):
+        lod.enabled = enabled
+        run(base, lod, actors, 72, rng, sweep=180)  # прогрев: полный оборот камеры
+        frame_samples, update_samples = run(base, lod, actors, args.frames, rng)
+        frame_ms = [s * 1000 for s in frame_samples]
+        results[name] = statistics.median(frame_ms)
+        print(f"{name:<10} {statistics.mean(frame_ms):>10.3f} {results[name]:>10.3f} "
+              f"{percentile(frame_ms, 0.95):>10.3f} {statistics.mean(update_samples) * 1000:>10.3f}")
+    print(f"уровни: {lod.stats()}")
+
+    lod.clear()
+    for actor in actors:
+        pool.release(actor)
+    pool.destroy()
+    base.destroy()
+
+    if results["LOD"] >= results["без LOD"]:
+        print(f"ПРОВЕРКА НЕ ПРОЙДЕНА: медианный кадр с LOD {results['LOD']:.3f} мс не быстрее, чем без него "
+              f"{results['без LOD']:.3f} мс")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Бенчмарк окна чата: стоимость кадра и добавления сообщения при пустой и
+полной (max_messages) истории. С инкрементальной раскладкой и очередью
+сроков исчезновения обе величины не должны зависеть от числа сообщений.
+
+Перед замерами проверяется само свойство (при нарушении - код выхода 1):
+с 50 неистекшими сообщениями кадр не трогает ни одного сообщения
+(set_alpha_scale не вызывается), а add_message измеряет только новое
+сообщение (один get_tight_bounds на вызов при любой длине истории).
+
+Запуск: python -m benchmarks.chat_window --messages 50 --frames 500
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from panda3d.core import loadPrcFileData
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure_frames(window, frames: int) -> list:
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        window._update_fade(_Task)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def measure_adds(window, count: int) -> list:
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        window.add_message("bench", f"сообщение {i} " + "текст " * (i % 12))
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+class _Task:
+    """Заглушка задачи taskMgr: _update_fade возвращает task.cont."""
+    cont = 1
+
+
+class _CountingNode:
+    """Обертка NodePath, считающая вызовы раскладки и прозрачности."""
+
+    calls = {"get_tight_bounds": 0, "set_alpha_scale": 0}
+
+    def __init__(self, node_path):
+        self._node_path = node_path
+
+    def attach_new_node(self, *args):
+        return _CountingNode(self._node_path.attach_new_node(*args))
+
+    def get_tight_bounds(self, *args):
+        self.calls["get_tight_bounds"] += 1
+        return self._node_path.get_tight_bounds(*args)
+
+    def set_alpha_scale(self, *args):
+        self.calls["set_alpha_scale"] += 1
+        return self._node_path.set_alpha_scale(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._node_path, name)
+
+
+def check(ui_manager, messages: int, frames: int):
+    """Проверяет, что стоимость кадра и добавления не зависит от числа сообщений."""
+    from nine.ui.chat_window import ChatWindow
+
+    window = ChatWindow(ui_manager)
+    window.max_messages = messages
+    window.message_lifetime = 3600.0
+    window.lines = _CountingNode(window.lines)
+    calls = _CountingNode.calls
+    try:
+        for i in range(messages):
+            window.add_message("check", f"сообщение {i}")
+        assert calls["get_tight_bounds"] == messages, \
+            f"add_message измеряет историю: {calls['get_tight_bounds']} get_tight_bounds на {messages} сообщений"
+        for i in range(messages):
+            window.add_message("check", f"сверх лимита {i}")
+        assert calls["get_tight_bounds"] == 2 * messages, \
+            f"add_message при полной истории: {calls['get_tight_bounds']} get_tight_bounds на {2 * messages} сообщений"
+
+        nearest = window._deadlines[0]
+        for _ in range(frames):
+            window._update_fade(_Task)
+        assert calls["set_alpha_scale"] == 0, \
+            f"кадр без истекших сообщений вызвал set_alpha_scale {calls['set_alpha_scale']} раз"
+        assert not window._fading and window._deadlines[0] is nearest and len(window._deadlines) == 2 * messages, \
+            "кадр без истекших сообщений изменил очередь сроков"
+    finally:
+        window.destroy()
+
+
+def report(name: str, samples: list):
+    ms = [s * 1000 for s in samples]
+    print(f"{name:<28} среднее {statistics.mean(ms):8.4f} мс   p99 {percentile(ms, 0.99):8.4f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=500)
+    args = parser.parse_args()
+
+    loadPrcFileData("", "window-type offscreen\naudio-library-name null\nsync-video false")
+    from direct.showbase.ShowBase import ShowBase
+
+    from nine.ui.chat_window import ChatWindow
+    from nine.ui.manager import UIManager
+
+    base = ShowBase()
+    ui_manager = UIManager(base, {})
+    try:
+        check(ui_manager, args.messages, args.frames)
+    except AssertionError as e:
+        print(f"ПРОВЕРКА НЕ ПРОЙДЕНА: {e}")
+        base.destroy()
+        sys.exit(1)
+    print(f"Проверки пройдены: {args.messages} сообщений, {args.frames} кадров")
+
+    window = ChatWindow(ui_manager)
+    window.max_messages = args.messages
+
+    report("кадр, 0 сообщений", measure_frames(window, args.frames))
+    report("добавление, до заполнения", measure_adds(window, args.messages))
+    report(f"кадр, {args.messages} сообщений", measure_frames(window, args.frames))
+    report("добавление, история полна", measure_adds(window, args.messages))
+
+    # Все сообщения исчезают одновременно: худший случай, работа пропорциональна их числу.
+    window.message_lifetime = 0.0
+    window.fade_duration = 3600.0
+    window._deadlines = [(message.created_at, i, message) for i, message in enumerate(window.messages)]
+    report(f"кадр, {len(window.messages)} исчезают", measure_frames(window, args.frames))
+
+    window.destroy()
+    base.destroy()
+
+
+if __name__ == "__main__":
+    main()
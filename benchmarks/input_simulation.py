@@ -0,0 +1,125 @@
+"""
+Бенчмарк InputSimulation: стоимость такта при заданном числе игроков.
+
+Перед замером проверяется ограничение скорости (при нарушении - код выхода 1):
+клиент, присылающий команды ввода во много раз чаще sim_rate, за все время
+проходит не больше move_speed * t (плюс запас BURST_STEPS шагов), а
+честный клиент - с ровным или рваным по тактам потоком команд - движется
+с полной скоростью и ни разу не исправляется проверкой MovementValidator.
+
+Запуск: python -m benchmarks.input_simulation --entities 1000 --ticks 200
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from nine.core.events import EventManager
+from nine.core.movement import InputSimulation, MovementValidator
+from nine.core.world import World
+
+SIM_RATE = 30
+MOVE_SPEED = 10.0
+TICK_INTERVAL = 0.1
+BURST_STEPS = 2.0
+
+
+def build(count: int):
+    """Мир как на сервере: позиции InputSimulation проверяет MovementValidator (время - по тактам)."""
+    world = World(EventManager())
+    bounds = ((-1e6, -1e6, -10), (1e6, 1e6, 100))
+    validator = MovementValidator(world, max_speed=MOVE_SPEED, bounds=bounds)
+    clock = [0.0]
+    validator.clock = lambda: clock[0]
+    simulation = InputSimulation(world, sim_rate=SIM_RATE, move_speed=MOVE_SPEED, max_burst_steps=BURST_STEPS,
+                                 bounds=bounds, validator=validator)
+    entities = []
+    for _ in range(count):
+        entity = world.create_entity()
+        world.add_component(entity, "transform", pos=(0, 0, 0), rot=(0, 0, 0))
+        world.add_component(entity, "animation")
+        validator.track(entity)
+        simulation.track(entity)
+        entities.append(entity)
+    return world, simulation, entities, clock
+
+
+def run_client(commands_per_tick, ticks: int):
+    """
+    Расстояние, пройденное за ticks тактов, и число исправленных проверкой
+    перемещений; commands_per_tick(tick) - сколько команд прислано.
+    """
+    world, simulation, (entity,), clock = build(1)
+    seq = 0
+    for tick in range(ticks):
+        commands = []
+        for _ in range(commands_per_tick(tick)):
+            seq += 1
+            commands.append([seq, 1.0, 0.0, 0.0])
+        simulation.submit(entity, commands)
+        clock[0] += TICK_INTERVAL
+        simulation.simulate(world, TICK_INTERVAL)
+    stats = simulation.validator.stats()
+    return float(world.get_component(entity, "transform")["pos"][0]), stats["corrected"] + stats["rejected"]
+
+
+def check(ticks: int):
+    step = MOVE_SPEED / SIM_RATE
+    limit = MOVE_SPEED * ticks * TICK_INTERVAL
+    burst = BURST_STEPS * step
+    per_tick = round(SIM_RATE * TICK_INTERVAL)
+
+    flood, _ = run_client(lambda tick: 10 * per_tick, ticks)
+    assert flood <= limit + burst + 1e-6, \
+        f"флуд командами: пройдено {flood:.2f} при пределе {limit:.2f} (+{burst:.2f} запаса)"
+
+    steady, corrected = run_client(lambda tick: per_tick, ticks)
+    assert steady >= limit - step - 1e-6, f"ровный поток: пройдено {steady:.2f} из {limit:.2f}"
+    assert not corrected, f"ровный поток: проверка исправила {corrected} перемещений"
+
+    # Команды приходят пачками через такт: бюджет и очередь сглаживают рывки.
+    bursty, corrected = run_client(lambda tick: 2 * per_tick if tick % 2 == 0 else 0, ticks)
+    assert bursty >= limit - 2 * per_tick * step - 1e-6, f"рваный поток: пройдено {bursty:.2f} из {limit:.2f}"
+    assert not corrected, f"рваный поток: проверка исправила {corrected} перемещений"
+    return flood, steady, bursty, limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        flood, steady, bursty, limit = check(args.ticks)
+    except AssertionError as e:
+        print(f"ПРОВЕРКА НЕ ПРОЙДЕНА: {e}")
+        sys.exit(1)
+    print(f"Проверки пройдены: за {args.ticks * TICK_INTERVAL:.0f} с предел {limit:.2f}, "
+          f"флуд {flood:.2f}, ровный {steady:.2f}, рваный {bursty:.2f}")
+
+    world, simulation, entities, clock = build(args.entities)
+    rng = np.random.default_rng(42)
+    per_tick = round(SIM_RATE * TICK_INTERVAL)
+    seq = 0
+    samples = []
+    for _ in range(args.ticks):
+        directions = rng.uniform(-1, 1, size=(args.entities, per_tick, 2)).tolist()
+        for entity, steps in zip(entities, directions):
+            simulation.submit(entity, [[seq + i + 1, dx, dy, 0.0] for i, (dx, dy) in enumerate(steps)])
+        seq += per_tick
+        clock[0] += TICK_INTERVAL
+        start = time.perf_counter()
+        simulation.simulate(world, TICK_INTERVAL)
+        samples.append(time.perf_counter() - start)
+
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{args.entities} сущностей, {per_tick} команд на такт")
+    print(f"{'simulate + check (на такт)':<28} mean {statistics.mean(samples) * 1000:8.3f} ms   p95 {p95 * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
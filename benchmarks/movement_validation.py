@@ -0,0 +1,107 @@
+"""
+Бенчмарк проверки перемещений: стоимость одного такта MovementValidator
+в сравнении с наивной проверкой каждого сообщения move на Python.
+
+Запуск: python -m benchmarks.movement_validation --entities 1000
+"""
+import argparse
+import math
+import statistics
+import time
+
+import numpy as np
+
+from nine.core.components import ANIM_IDLE
+from nine.core.events import EventManager
+from nine.core.movement import MovementValidator
+from nine.core.world import World
+
+
+def build_world(count: int, now: float):
+    world = World(EventManager())
+    validator = MovementValidator(world)
+    for _ in range(count):
+        entity = world.create_entity()
+        world.add_component(entity, "transform", pos=(0, 0, 0), rot=(0, 0, 0))
+        world.add_component(entity, "animation", state=ANIM_IDLE)
+        validator.track(entity, now)
+    return world, validator
+
+
+def random_moves(rng: np.random.Generator, current: np.ndarray) -> np.ndarray:
+    """Смесь обычных шагов, слишком быстрых шагов и телепортаций от текущих позиций."""
+    count = len(current)
+    steps = rng.normal(0, 0.2, size=(count, 3))
+    steps[rng.random(count) < 0.05] *= 20
+    steps[rng.random(count) < 0.01] += 100
+    return current + steps
+
+
+def naive_validate(players: dict, moves: list, now: float, max_speed=10.0, tolerance=1.5, teleport=25.0):
+    """Та же логика по одному сообщению - для сравнения."""
+    for client_id, pos in moves:
+        player = players[client_id]
+        old = player["pos"]
+        dx, dy, dz = pos[0] - old[0], pos[1] - old[1], pos[2] - old[2]
+        distance = math.sqrt(dx * dx + dy * dy + dz * dz)
+        allowed = max_speed * tolerance * min(1.0, now - player["last_accept_time"])
+        if distance > teleport:
+            continue
+        if distance > allowed:
+            k = allowed / distance
+            pos = [old[0] + dx * k, old[1] + dy * k, old[2] + dz * k]
+        player["pos"] = [min(50, max(-50, pos[0])), min(50, max(-50, pos[1])), min(100, max(-10, pos[2]))]
+        player["last_accept_time"] = now
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    tick_interval = 0.05
+    start_time = time.monotonic()
+    world, validator = build_world(args.entities, start_time)
+    entities = world.storage("transform").entities.copy()
+
+    transform = world.storage("transform")
+
+    submit_times, validate_times = [], []
+    for tick in range(1, args.ticks + 1):
+        moves = random_moves(rng, transform.column("pos"))
+        now = start_time + tick * tick_interval
+
+        start = time.perf_counter()
+        for entity, pos in zip(entities.tolist(), moves.tolist()):
+            validator.submit(entity, pos, (0, 0, 0), now)
+        submit_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        validator.validate(world, tick_interval)
+        validate_times.append(time.perf_counter() - start)
+
+    players = {i: {"pos": [0.0, 0.0, 0.0], "last_accept_time": start_time} for i in range(args.entities)}
+    naive_times = []
+    for tick in range(1, args.ticks + 1):
+        current = np.array([players[i]["pos"] for i in range(args.entities)])
+        moves = list(enumerate(random_moves(rng, current).tolist()))
+        start = time.perf_counter()
+        naive_validate(players, moves, start_time + tick * tick_interval)
+        naive_times.append(time.perf_counter() - start)
+
+    def report(name, samples):
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"{name:<28} mean {statistics.mean(samples) * 1000:8.3f} ms   p95 {p95 * 1000:8.3f} ms")
+
+    print(f"{args.entities} сущностей, {args.ticks} тактов")
+    report("submit (на такт)", submit_times)
+    report("validate (на такт)", validate_times)
+    report("naive python (на такт)", naive_times)
+    print("Итоги:", validator.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Бенчмарк пространственных запросов: SpatialIndex в сравнении с линейным
+перебором словаря игроков (как пришлось бы делать по app.players).
+
+С установленным SciPy (requirements-optional.txt) замеряется и KD-дерево;
+перед замером его ответы сверяются с сеткой (при расхождении - код выхода 1).
+
+Запуск: python -m benchmarks.spatial_query --sizes 100 1000 10000
+"""
+import argparse
+import math
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from nine.core.events import EventManager
+from nine.core.spatial import SpatialIndex, cKDTree
+from nine.core.world import World
+
+
+def build_world(count: int, rng: np.random.Generator, extent: float):
+    world = World(EventManager())
+    for _ in range(count):
+        entity = world.create_entity()
+        world.add_component(entity, "transform", pos=(0, 0, 0), rot=(0, 0, 0))
+    pos = world.storage("transform").column("pos")
+    pos[:, :2] = rng.uniform(-extent, extent, size=(count, 2))
+    return world
+
+
+def linear_radius(players: dict, center, radius: float) -> list:
+    """Перебор всех игроков на Python."""
+    cx, cy, cz = center
+    limit = radius * radius
+    result = []
+    for client_id, player in players.items():
+        x, y, z = player["pos"]
+        if (x - cx) ** 2 + (y - cy) ** 2 + (z - cz) ** 2 <= limit:
+            result.append(client_id)
+    return result
+
+
+def linear_nearest(players: dict, center, k: int) -> list:
+    return sorted(players, key=lambda cid: math.dist(players[cid]["pos"], center))[:k]
+
+
+def check_kdtree(grid: SpatialIndex, tree: SpatialIndex, centers: np.ndarray, radius: float, k: int):
+    """Ответы KD-дерева совпадают с сеткой: те же сущности в радиусе, те же расстояния до k ближайших."""
+    for center, by_grid, by_tree in zip(centers, grid.query_radius_batch(centers, radius),
+                                        tree.query_radius_batch(centers, radius)):
+        assert set(by_grid.tolist()) == set(by_tree.tolist()), f"query_radius_batch расходится в точке {center}"
+
+    transform = grid.world.storage("transform")
+    positions = transform.column("pos")
+
+    def distances(found, center):
+        found = found[found >= 0]
+        return np.sort(np.linalg.norm(positions[transform.indices(found)] - center, axis=1))
+
+    for center, by_grid, by_tree in zip(centers, grid.query_nearest_batch(centers, k),
+                                        tree.query_nearest_batch(centers, k)):
+        assert np.allclose(distances(by_grid, center), distances(by_tree, center)), \
+            f"query_nearest_batch расходится в точке {center}"
+
+
+def measure(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=10.0)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if cKDTree is None:
+        print("SciPy не установлен, KD-дерево не замеряется (pip install -r requirements-optional.txt)")
+    print(f"{args.queries} запросов на замер, radius={args.radius}, k={args.k}; время в мс на все запросы")
+    print(f"{'сущностей':>10} {'запрос':<10} {'linear':>10} {'grid':>10} {'batch':>10} {'update':>10}")
+
+    for count in args.sizes:
+        # Плотность как у мира 100x100 на 1000 игроков.
+        extent = 50.0 * math.sqrt(count / 1000)
+        world = build_world(count, rng, extent)
+        index = SpatialIndex(world, use_kdtree=False)
+        index.update()
+
+        transform = world.storage("transform")
+        players = {int(e): {"pos": p} for e, p in zip(transform.entities, transform.column("pos").tolist())}
+        centers = np.zeros((args.queries, 3))
+        centers[:, :2] = rng.uniform(-extent, extent, size=(args.queries, 2))
+        center_list = centers.tolist()
+
+        # Небольшие перемещения: обновление индекса трогает только сменивших ячейку.
+        def update():
+            transform.column("pos")[:, :2] += rng.normal(0, 0.3, size=(count, 2))
+            index.update()
+
+        rows = {
+            "radius": (
+                lambda: [linear_radius(players, c, args.radius) for c in center_list],
+                lambda: [index.query_radius(c, args.radius) for c in centers],
+                lambda: index.query_radius_batch(centers, args.radius),
+            ),
+            "nearest": (
+                lambda: [linear_nearest(players, c, args.k) for c in center_list],
+                lambda: [index.query_nearest(c, args.k) for c in centers],
+                lambda: index.query_nearest_batch(centers, args.k),
+            ),
+        }
+        update_time = measure(update, args.repeat)
+        for name, (linear, grid, batch) in rows.items():
+            times = [measure(func, args.repeat) * 1000 for func in (linear, grid, batch)]
+            print(f"{count:>10} {name:<10} {times[0]:>10.3f} {times[1]:>10.3f} {times[2]:>10.3f} {update_time * 1000:>10.3f}")
+
+        if cKDTree is not None:
+            tree_index = SpatialIndex(world)
+            tree_index.update()
+            try:
+                check_kdtree(index, tree_index, centers, args.radius, args.k)
+            except AssertionError as e:
+                print(f"ПРОВЕРКА НЕ ПРОЙДЕНА: {e}")
+                sys.exit(1)
+            kd_radius = measure(lambda: tree_index.query_radius_batch(centers, args.radius), args.repeat)
+            kd_nearest = measure(lambda: tree_index.query_nearest_batch(centers, args.k), args.repeat)
+            kd_update = measure(tree_index.update, args.repeat)
+            print(f"{'':>10} kd-tree: radius batch {kd_radius * 1000:.3f}, nearest batch {kd_nearest * 1000:.3f}, "
+                  f"update {kd_update * 1000:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Набор микробенчмарков горячих путей сервера с сохранением результатов в JSON
+и сравнением с базовой линией.
+
+Запуск:
+    python -m benchmarks.suite run --output benchmarks/baselines/main.json
+    python -m benchmarks.suite run --compare benchmarks/baselines/main.json
+    python -m benchmarks.suite compare old.json new.json --threshold 10
+Сравнение завершается с кодом 1, если какой-то замер вырос больше порога.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from nine.core.events import EventManager
+from nine.core.metrics import MetricsRegistry
+from nine.core.network import MessageReceivedEvent, NetworkManager
+
+# Имя -> (функция, единица). Функция получает контекст и возвращает либо
+# операцию без аргументов (замеряется время одного вызова в мкс), либо число
+# (замер размера, например байты пакета).
+BENCHMARKS: Dict[str, tuple] = {}
+
+SAMPLE_INPUT = {"type": "input", "commands": [[1024, 0.7071, 0.7071, 45.0], [1025, 0.7071, 0.7071, 45.0]]}
+SAMPLE_MOVE = {"type": "move", "pos": [1.5, 2.5, 0.0], "rot": [90.0, 0.0, 0.0]}
+
+
+def benchmark(name: str, unit: str = "us"):
+    def register(function):
+        BENCHMARKS[name] = (function, unit)
+        return function
+    return register
+
+
+class FakeWriter:
+    """Заменяет asyncio.StreamWriter: считает байты вместо записи в сокет."""
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, data: bytes):
+        self.written += len(data)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Context:
+    """Общие ресурсы бенчмарков: временный каталог, цикл asyncio и сервер."""
+
+    def __init__(self):
+        self.directory = Path(tempfile.mkdtemp(prefix="nine-bench-"))
+        self.loop = asyncio.new_event_loop()
+        self._server = None
+        self._db = None
+
+    @property
+    def server(self):
+        """ServerApp без сети во временном каталоге (свой server_config.json, server.log и база)."""
+        if self._server is None:
+            import server
+            (self.directory / "server_config.json").write_text(json.dumps({
+                "npc": {"count": 0, "path_workers": 1},
+                "lod": {"enabled": False},
+            }))
+            cwd = os.getcwd()
+            os.chdir(self.directory)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self._server = server.ServerApp()
+            finally:
+                os.chdir(cwd)
+            self._server.asyncio_loop = self.loop
+        return self._server
+
+    @property
+    def db(self):
+        if self._db is None:
+            from nine.core.database import DatabaseManager
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._db = DatabaseManager(self.directory / "bench.db")
+        return self._db
+
+    def add_players(self, count: int):
+        """Игроки на сервере с соединениями FakeWriter."""
+        app = self.server
+        for client_id in list(app.players):
+            app._remove_player(client_id)
+        app.network.clients.clear()
+        for client_id in range(1, count + 1):
+            app._add_player(client_id, f"bench{client_id}", f"uuid-{client_id}",
+                            [client_id % 50 - 25.0, client_id // 50 - 25.0, 0.0], is_dev=True)
+            app.network.clients[client_id] = FakeWriter()
+        return app
+
+    def close(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if self._server is not None:
+                self._server.path_service.shutdown()
+                self._server.db.shutdown()
+            if self._db is not None:
+                self._db.shutdown()
+        self.loop.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# --- Кадры протокола ---
+
+@benchmark("frame.encode.input")
+def frame_encode(ctx: Context):
+    def encode():
+        payload = json.dumps(SAMPLE_INPUT).encode("utf-8")
+        return struct.pack("!I", len(payload)) + payload
+    return encode
+
+
+@benchmark("frame.decode.input")
+def frame_decode(ctx: Context):
+    payload = json.dumps(SAMPLE_INPUT).encode("utf-8")
+    frame = struct.pack("!I", len(payload)) + payload
+
+    def decode():
+        length = struct.unpack("!I", frame[:4])[0]
+        return json.loads(frame[4:4 + length].decode("utf-8"))
+    return decode
+
+
+# --- Рассылка ---
+
+def broadcast_case(writers: int):
+    def case(ctx: Context):
+        network = NetworkManager(EventManager())
+        network.clients = {client_id: FakeWriter() for client_id in range(writers)}
+        data = {"type": "player_left", "id": 1}
+        return lambda: ctx.loop.run_until_complete(network.broadcast(data))
+    return case
+
+
+for _writers in (10, 100, 1000):
+    benchmark(f"network.broadcast.{_writers}")(broadcast_case(_writers))
+
+
+def post_case(listeners: int):
+    def case(ctx: Context):
+        events = EventManager()
+        for _ in range(listeners):
+            events.subscribe("bench", lambda data: None)
+        return lambda: events.post("bench", {"delta_time": 0.1})
+    return case
+
+
+for _listeners in (1, 10, 100):
+    benchmark(f"events.post.{_listeners}")(post_case(_listeners))
+
+
+@benchmark("events.post.10.timed")
+def post_timed(ctx: Context):
+    events = EventManager()
+    events.handler_time = MetricsRegistry().histogram("bench_seconds", "", ("event", "handler"))
+    for _ in range(10):
+        events.subscribe("bench", lambda data: None)
+    return lambda: events.post("bench", {"delta_time": 0.1})
+
+
+@benchmark("metrics.render")
+def metrics_render(ctx: Context):
+    return ctx.add_players(100).metrics.render
+
+
+# --- ServerApp ---
+
+@benchmark("server.on_message_received.move")
+def on_message_move(ctx: Context):
+    app = ctx.add_players(100)
+    events = [MessageReceivedEvent(client_id, SAMPLE_MOVE) for client_id in app.players]
+    position = [0]
+
+    def handle():
+        position[0] = (position[0] + 1) % len(events)
+        app.on_message_received(events[position[0]])
+    return handle
+
+
+def world_state_build_case(players: int):
+    def case(ctx: Context):
+        app = ctx.add_players(players)
+        return app.world_state_payloads
+    return case
+
+
+def world_state_size_case(players: int):
+    def case(ctx: Context):
+        payloads = ctx.add_players(players).world_state_payloads()
+        return statistics.fmean(len(payload) + 4 for payload in payloads.values())
+    return case
+
+
+for _players in (10, 100):
+    benchmark(f"world_state.build.{_players}")(world_state_build_case(_players))
+    benchmark(f"world_state.payload_bytes.{_players}", unit="bytes")(world_state_size_case(_players))
+
+
+# --- DatabaseManager ---
+
+@benchmark("db.auth")
+def db_auth(ctx: Context):
+    db = ctx.db
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.create_player("uuid-auth", "bench-auth", "secret")
+    return lambda: db.verify_player_password_by_name("bench-auth", "secret")
+
+
+@benchmark("db.set_attribute.pos")
+def db_set_pos(ctx: Context):
+    db = ctx.db
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.create_player("uuid-pos", "bench-pos", "secret")
+    return lambda: db.set_player_attribute("uuid-pos", "pos", [1.0, 2.0, 3.0])
+
+
+@benchmark("db.set_attribute.custom")
+def db_set_custom(ctx: Context):
+    db = ctx.db
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.create_player("uuid-attr", "bench-attr", "secret")
+    return lambda: db.set_player_attribute("uuid-attr", "health", 87)
+
+
+# --- Запуск ---
+
+def measure(operation: Callable, rounds: int, min_round_time: float) -> List[float]:
+    """Время одного вызова в мкс для каждого раунда; число вызовов в раунде подбирается."""
+    operation()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_round_time / elapsed) + 1))
+
+    samples = [elapsed / number * 1e6]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        samples.append((time.perf_counter() - started) / number * 1e6)
+    return samples
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> dict:
+    selected = [name for name in BENCHMARKS if not args.filter or any(part in name for part in args.filter)]
+    results = {}
+    ctx = Context()
+    try:
+        for name in selected:
+            function, unit = BENCHMARKS[name]
+            operation = function(ctx)
+            if callable(operation):
+                samples = measure(operation, args.rounds, args.min_time)
+                # Минимум по раундам меньше всего зависит от посторонней нагрузки на машину.
+                value = min(samples)
+                results[name] = {"value": round(value, 4), "unit": unit,
+                                 "stdev": round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0}
+            else:
+                results[name] = {"value": round(float(operation), 4), "unit": unit, "stdev": 0.0}
+            print(f"{name:<36} {results[name]['value']:>14.3f} {unit}")
+    finally:
+        ctx.close()
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": args.rounds,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Печатает изменения относительно baseline. Возвращает True, если есть регрессии."""
+    regressions = False
+    print(f"{'замер':<36} {'база':>12} {'сейчас':>12} {'изменение':>10}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base["value"]:
+            print(f"{name:<36} {'-':>12} {result['value']:>12.3f}    новый")
+            continue
+        change = (result["value"] - base["value"]) / base["value"] * 100
+        flag = ""
+        if change > threshold:
+            flag = "  РЕГРЕССИЯ"
+            regressions = True
+        elif change < -threshold:
+            flag = "  улучшение"
+        print(f"{name:<36} {base['value']:>12.3f} {result['value']:>12.3f} {change:>+9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="выполнить замеры")
+    run_parser.add_argument("--filter", action="append", help="только замеры, содержащие подстроку (можно несколько)")
+    run_parser.add_argument("--rounds", type=int, default=7)
+    run_parser.add_argument("--min-time", type=float, default=0.1, help="минимальная длительность раунда, с")
+    run_parser.add_argument("--output", type=Path, help="сохранить результаты в JSON")
+    run_parser.add_argument("--compare", type=Path, help="сравнить с базовой линией")
+    run_parser.add_argument("--threshold", type=float, default=10.0, help="порог регрессии, %%")
+
+    compare_parser = commands.add_parser("compare", help="сравнить два файла результатов")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="порог регрессии, %%")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        current = json.loads(args.current.read_text())
+        baseline = json.loads(args.baseline.read_text())
+    else:
+        current = run(args)
+        if args.output:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            args.output.write_text(json.dumps(current, indent=2))
+            print(f"Результаты сохранены: {args.output}")
+        if not args.compare:
+            return
+        baseline = json.loads(args.compare.read_text())
+    if compare(baseline, current, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,7 +33,22 @@ async def user_input(writer: asyncio.StreamWriter):
     while True:
         message = await asyncio.to_thread(sys.stdin.readline)
         message = message.strip()
-        if message:
+        if message.startswith("/history"):
+            # /history [cursor|before] - страница истории общего чата перед курсором
+            # из предыдущего ответа ("<сегмент>:<смещение>") или до времени before.
+            parts = message.split()
+            request = {"type": "chat_history", "channel": "global"}
+            if len(parts) > 1:
+                if ":" in parts[1]:
+                    request["cursor"] = parts[1]
+                else:
+                    try:
+                        request["before"] = float(parts[1])
+                    except ValueError:
+                        print("Usage: /history [cursor | before_timestamp]")
+                        continue
+            await send_message(writer, request)
+        elif message:
             await send_message(writer, {"type": "chat_message", "message": message})
 
 async def main(name: str):
@@ -1,9 +1,7 @@
-import asyncio
 import logging
 import json
-import ssl
-import struct
 import sys
+import time
 import uuid
 import argparse
 from pathlib import Path
@@ -14,13 +12,22 @@ loadPrcFileData("", "audio-library-name null")
 loadPrcFileData("", "cursor-hidden 0")
 loadPrcFileData("", "mouse-mode absolute")
 
-from direct.actor.Actor import Actor
 from direct.showbase.ShowBase import ShowBase
 from direct.task import Task
 from panda3d.core import CardMaker, NodePath, LColor
 
+from nine.core.actors import PLAYER_ANIMS, PLAYER_MODEL, ActorPool, ModelCache
+from nine.core.anim_lod import AnimationLOD
+from nine.core.archive import AssetLibrary
+from nine.core.assets import AssetPreloader, BamCache
+from nine.core.decoder import DISCONNECTED, NetworkDecoder
 from nine.core.camera_controller import CameraController
+from nine.core.client_network import ClientNetwork
+from nine.core.content import AssetDownloader, BlobStore
+from nine.core.chunks import ChunkStreamer
 from nine.core.events import EventManager
+from nine.core.interpolation import SnapshotInterpolator
+from nine.core.movement import MovementPredictor
 from nine.core.plugins import PluginManager
 from nine.ui.manager import UIManager
 
@@ -35,12 +42,6 @@ class GameClient(ShowBase):
         self.logger.setLevel(logging.INFO)
         self.logger.addHandler(file_handler)
 
-        try:
-            self.asyncio_loop = asyncio.get_event_loop()
-        except RuntimeError:
-            self.asyncio_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.asyncio_loop)
-
         ShowBase.__init__(self)
         self.disableMouse()
 
@@ -51,8 +52,30 @@ class GameClient(ShowBase):
             with open("config.json") as f:
                 config = json.load(f)
             self.camera_sensitivity = config.get("camera_sensitivity", 1.0)
+            self.interpolation_delay = config.get("interpolation_delay")
+            self.max_extrapolation = config.get("max_extrapolation", 0.25)
+            self.chunk_load_radius = config.get("chunk_load_radius", 2)
+            self.chunk_memory_mb = config.get("chunk_memory_mb", 64)
+            self.actor_pool_size = config.get("actor_pool_size", 8)
+            self.animation_lod_config = config.get("animation_lod", {})
+            self.network_apply_budget_ms = config.get("network_apply_budget_ms", 4.0)
+            self.asset_cache_dir = config.get("asset_cache_dir", ".cache/models")
+            self.archives_dir = config.get("archives_dir", "archives")
+            self.blob_cache_dir = config.get("blob_cache_dir", ".cache/blobs")
+            self.chat_history_page = config.get("chat_history_page", 20)
         except (FileNotFoundError, json.JSONDecodeError):
             self.camera_sensitivity = 1.0
+            self.interpolation_delay = None
+            self.max_extrapolation = 0.25
+            self.chunk_load_radius = 2
+            self.chunk_memory_mb = 64
+            self.actor_pool_size = 8
+            self.animation_lod_config = {}
+            self.network_apply_budget_ms = 4.0
+            self.asset_cache_dir = ".cache/models"
+            self.archives_dir = "archives"
+            self.blob_cache_dir = ".cache/blobs"
+            self.chat_history_page = 20
 
         with open("server_config.json") as f:
             config = json.load(f)
@@ -60,13 +83,14 @@ class GameClient(ShowBase):
         self.port = config.get("port", 9009)
 
         self.player_id = -1
-        self.is_connected = False
         self.character_name = name
         self.client_uuid = client_uuid
         self.player_actor = None
+        self.movement = None
+        self.snapshots = None
+        self.chunks = None
         self.camera_controller = None
         self.other_players = {}
-        self.writer = None
         self.temp_password = None
         self.in_game_menu_active = False
 
@@ -77,15 +101,34 @@ class GameClient(ShowBase):
             "close_login_menu": self.close_login_menu,
             "settings": self.show_settings_menu,
         }
+        # Упакованные ресурсы подключаются до UI: шрифт и фон меню тоже берутся из архивов.
+        self.archives = AssetLibrary(self.logger)
+        self.archives.mount_dir(self.archives_dir)
         self.ui = UIManager(self, callbacks)
 
         self.event_manager.subscribe("client_send_chat_message", self.send_chat_packet)
         self.plugin_manager.load_plugins()
 
         self.setup_scene()
+        self.bam_cache = BamCache(self.loader, self.asset_cache_dir, resolve_source=self.archives.resolve, log=self.logger)
+        self.models = ModelCache(self.loader, resolve=self.bam_cache.resolve)
+        self.actor_pool = ActorPool(self.models, self.render)
+        self.anim_lod = AnimationLOD(self, self.models, **self.animation_lod_config)
+        # Модели готовятся в фоне, пока открыто меню, чтобы появление игрока не подвисало.
+        self.assets = AssetPreloader(
+            self.bam_cache, self.models,
+            [PLAYER_MODEL, *PLAYER_ANIMS.values(), self.anim_lod.proxy_model],
+            log=self.logger,
+        )
+        self.decoder = NetworkDecoder(self.logger)
+        self.network = ClientNetwork(self.decoder, log=self.logger)
+        # Ресурсы плагинов сервера: скачиваются только отсутствующие блобы, куски пишутся в потоке декодера.
+        self.downloader = AssetDownloader(BlobStore(self.blob_cache_dir), self.archives, self.network.send, log=self.logger)
+        self.decoder.side_handlers["asset_chunk"] = self.downloader.on_chunk
+        self.taskMgr.add(self.prewarm_actors, "prewarm-actors")
         self.logger.info(
             f"Dev Client {self.character_name} ({self.client_uuid}) launched. Connecting to {self.host}:{self.port}")
-        self.asyncio_loop.create_task(self.connect_and_read(self.host))
+        self.network.connect(self.host, self.port, self.auth_message())
 
         self.keyMap = {"w": False, "a": False, "s": False, "d": False}
         self.accept("w", self.update_key_map, ["w", True])
@@ -98,7 +141,8 @@ class GameClient(ShowBase):
         self.accept("d-up", self.update_key_map, ["d", False])
         self.accept("escape", self.handle_escape)
 
-        self.taskMgr.add(self.poll_asyncio, "asyncio-poll")
+        self.taskMgr.add(self.apply_network_updates, "network-apply")
+        self.taskMgr.add(self.update_remote_players, "remote-players-update")
         self.update_movement_task = None
 
     def _get_or_create_uuid(self) -> str:
@@ -107,9 +151,10 @@ class GameClient(ShowBase):
     def setup_scene(self):
         cm = CardMaker("ground")
         cm.setFrame(-50, 50, -50, 50)
-        ground = self.render.attachNewNode(cm.generate())
-        ground.setP(-90)
-        ground.setPos(0, 0, -1)
+        # Плоскость-заглушка для меню; в игре мир загружается чанками (ChunkStreamer).
+        self.ground = self.render.attachNewNode(cm.generate())
+        self.ground.setP(-90)
+        self.ground.setPos(0, 0, -1)
 
     def setup_mouse_control(self, active):
         if self.camera_controller:
@@ -118,6 +163,12 @@ class GameClient(ShowBase):
             else:
                 self.camera_controller.stop()
 
+    def prewarm_actors(self, task):
+        """Заранее создает актеров для пула, по одному за кадр, после предзагрузки моделей."""
+        if self.assets.update() or self.actor_pool.prewarm(self.actor_pool_size):
+            return Task.cont
+        return Task.done
+
     def update_key_map(self, key, state):
         self.keyMap[key] = state
 
@@ -141,11 +192,10 @@ class GameClient(ShowBase):
             self.update_movement_task = self.taskMgr.add(self.update_movement, "update-movement-task")
 
     def update_movement(self, task):
-        if not self.is_connected or not self.player_actor or not self.camera_controller or self.is_chat_active() or self.in_game_menu_active:
+        if not self.is_connected or not self.player_actor or not self.camera_controller or not self.movement or self.is_chat_active() or self.in_game_menu_active:
             return Task.cont
 
         dt = globalClock.getDt()
-        move_speed = 10.0
 
         move_vec = LVector3(0, 0, 0)
         if self.keyMap["w"]: move_vec.y += 1
@@ -153,6 +203,7 @@ class GameClient(ShowBase):
         if self.keyMap["a"]: move_vec.x -= 1
         if self.keyMap["d"]: move_vec.x += 1
 
+        direction = (0.0, 0.0)
         moved = move_vec.length_squared() > 0
         if moved:
             if self.player_actor.getCurrentAnim() != "walk":
@@ -165,18 +216,19 @@ class GameClient(ShowBase):
             world_move_vec.z = 0
             world_move_vec.normalize()
 
-            self.player_actor.setPos(self.player_actor.getPos() + world_move_vec * move_speed * dt)
+            direction = (world_move_vec.x, world_move_vec.y)
             self.player_actor.lookAt(self.player_actor.getPos() + world_move_vec)
-
-            pos = self.player_actor.getPos()
-            rot = self.player_actor.getHpr()
-            self.asyncio_loop.create_task(
-                self.send_message(self.writer, {"type": "move", "pos": [pos.x, pos.y, pos.z], "rot": [rot.x, rot.y, rot.z]})
-            )
         else:
             if self.player_actor.getCurrentAnim() != "idle":
                 self.player_actor.loop("idle")
 
+        commands = self.movement.update(dt, direction, self.player_actor.getH())
+        self.player_actor.setPos(*self.movement.render_pos())
+        if self.chunks:
+            self.chunks.update(self.player_actor.getPos())
+        if commands:
+            self.network.send({"type": "input", "commands": commands})
+
         return Task.cont
 
     def open_login_menu(self):
@@ -193,8 +245,8 @@ class GameClient(ShowBase):
 
     def exit_game(self):
         self.plugin_manager.unload_plugins()
-        if self.writer:
-            self.writer.close()
+        self.network.stop()
+        self.decoder.stop()
         self.userExit()
 
     def handle_escape(self):
@@ -214,34 +266,31 @@ class GameClient(ShowBase):
         if not message.strip():
             return
         message_data = {"type": "chat_message", "message": message}
-        self.asyncio_loop.create_task(self.send_message(self.writer, message_data))
+        self.network.send(message_data)
 
-    def on_successful_connection(self):
+    def post_chat_message(self, data: dict):
+        self.event_manager.post("network_chat_broadcast", {
+            "sender": data.get("from_name", "Unknown"),
+            "message": data.get("message", ""),
+            "channel": data.get("channel", "global"),
+            "to": data.get("to_name"),
+        })
+
+    def auth_message(self) -> dict:
         auth_data = {
             "type": "dev_auth",
             "name": self.character_name,
             "uuid": self.client_uuid,
         }
         self.temp_password = None
-        self.asyncio_loop.create_task(self.send_message(self.writer, auth_data))
-
-    def load_actor(self, is_local_player=False) -> NodePath:
-        anims = {
-            "walk": "nine/assets/models/player.egg",
-            "idle": "nine/assets/models/player.egg"
-        }
-        actor = Actor("nine/assets/models/player.egg", anims)
+        return auth_data
 
-        if not actor or actor.isEmpty():
-            cm = CardMaker("fallback-player")
-            cm.setFrame(-0.5, 0.5, -0.5, 0.5)
-            actor = NodePath(cm.generate())
-            actor.setZ(0.5)
+    @property
+    def is_connected(self) -> bool:
+        return self.network.connected
 
-        actor.setColor(LColor(0.5, 0.8, 0.5, 1) if is_local_player else LColor(0.8, 0.8, 0.8, 1))
-        actor.set_scale(0.3)
-        actor.reparentTo(self.render)
-        return actor
+    def load_actor(self, is_local_player=False) -> NodePath:
+        return self.actor_pool.acquire(LColor(0.5, 0.8, 0.5, 1) if is_local_player else LColor(0.8, 0.8, 0.8, 1))
 
     def handle_network_data(self, data: dict):
         msg_type = data.get("type")
@@ -250,6 +299,25 @@ class GameClient(ShowBase):
             self.player_id = data["id"]
             self.player_actor = self.load_actor(is_local_player=True)
             self.player_actor.setPos(*data["pos"])
+            self.movement = MovementPredictor(data["pos"], data.get("sim_rate", 30), data.get("move_speed", 10.0))
+            # По умолчанию удаленные игроки отстают на два снимка сервера.
+            delay = self.interpolation_delay
+            if delay is None:
+                delay = 2.0 / data.get("tick_rate", 10)
+            self.snapshots = SnapshotInterpolator(delay, self.max_extrapolation)
+            self.downloader.sync(data.get("assets", {}))
+            # Последние сообщения общего чата для только что вошедшего игрока.
+            self.network.send({"type": "chat_history", "channel": "global", "limit": self.chat_history_page})
+
+            if "world" in data:
+                self.ground.hide()
+                self.chunks = ChunkStreamer(
+                    self, data["world"], self.render,
+                    load_radius=self.chunk_load_radius,
+                    max_resident_bytes=self.chunk_memory_mb * 1024 * 1024,
+                    log=self.logger,
+                )
+                self.chunks.update(data["pos"])
 
             self.camera_controller = CameraController(self, self.camera, self.win, self.player_actor, self.camera_sensitivity)
             self.enable_game_input()
@@ -260,18 +328,20 @@ class GameClient(ShowBase):
                     p_node = self.load_actor()
                     p_node.setPos(*p_info["pos"])
                     self.other_players[p_id] = p_node
+                    self.anim_lod.add(p_id, p_node)
 
         elif msg_type == "auth_failed":
             self.logger.error(f"Ошибка аутентификации: {data.get('reason', 'Неизвестная ошибка')}")
-            self.is_connected = False
+            self.network.disconnect()
             self.disable_game_input()
             self.exit_game()
 
         elif msg_type == "chat_broadcast":
-            self.event_manager.post("network_chat_broadcast", {
-                "sender": data.get("from_name", "Unknown"),
-                "message": data.get("message", "")
-            })
+            self.post_chat_message(data)
+
+        elif msg_type == "chat_history":
+            for message in data.get("messages", []):
+                self.post_chat_message(message)
 
         elif msg_type == "player_joined":
             p_id = data["id"]
@@ -280,74 +350,77 @@ class GameClient(ShowBase):
                 p_node = self.load_actor()
                 p_node.setPos(*p_info["pos"])
                 self.other_players[p_id] = p_node
+                self.anim_lod.add(p_id, p_node)
+
+        elif msg_type == "position_correction":
+            if self.movement:
+                self.movement.reset(data["pos"])
 
         elif msg_type == "world_state":
-            for p_id_str, p_info in data.get("players", {}).items():
-                p_id = int(p_id_str)
-                if p_id in self.other_players:
-                    actor = self.other_players[p_id]
-                    actor.setPos(*p_info["pos"])
-                    actor.setHpr(*p_info["rot"])
-                    anim_state = p_info.get("anim_state", "idle")
-                    if actor.getCurrentAnim() != anim_state:
-                        actor.loop(anim_state)
+            ack = data.get("ack")
+            if ack and self.movement:
+                self.movement.reconcile(ack["seq"], ack["pos"])
+
+            # Декодер уже оставил только изменившихся игроков (PlayerUpdate).
+            server_time = data["t"]
+            interpolate = server_time is not None and self.snapshots is not None
+            if interpolate:
+                self.snapshots.observe_server_time(server_time, data["received_at"])
+
+            for update in data["changed"]:
+                actor = self.other_players.get(update.id)
+                if actor is None:
+                    continue
+                if update.pos is not None:
+                    if interpolate:
+                        if update.hold:
+                            self.snapshots.push(update.id, *update.hold)
+                        self.snapshots.push(update.id, server_time, update.pos, update.rot)
+                    else:
+                        actor.setPos(*update.pos)
+                        actor.setHpr(*update.rot)
+                if update.anim_state is not None:
+                    self.anim_lod.set_state(update.id, update.anim_state)
+
+        elif msg_type == DISCONNECTED:
+            self.cleanup_game_state()
 
         elif msg_type == "player_left":
             p_id = data["id"]
             if p_id in self.other_players:
-                self.other_players[p_id].removeNode()
-                del self.other_players[p_id]
+                self.anim_lod.remove(p_id)
+                self.actor_pool.release(self.other_players.pop(p_id))
+            if self.snapshots:
+                self.snapshots.remove(p_id)
 
         else:
             self.event_manager.post(msg_type, data)
 
-    async def poll_asyncio(self, task):
-        self.asyncio_loop.stop()
-        self.asyncio_loop.run_forever()
+    def update_remote_players(self, task):
+        """
+        Ставит удаленных игроков в интерполированное по снимкам положение
+        и обновляет уровни детализации их анимации.
+        """
+        if self.snapshots is not None:
+            now = time.monotonic()
+            for p_id, actor in self.other_players.items():
+                state = self.snapshots.sample(p_id, now)
+                if state:
+                    pos, rot = state
+                    actor.setPos(*pos)
+                    actor.setHpr(*rot)
+        self.anim_lod.update()
         return Task.cont
 
-    async def send_message(self, writer: asyncio.StreamWriter, data: dict):
-        if not writer or writer.is_closing(): return
-        payload = json.dumps(data).encode("utf-8")
-        header = struct.pack("!I", len(payload))
-        writer.write(header + payload)
-        await writer.drain()
-
-    async def connect_and_read(self, host: str):
-        ssl_context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-        try:
-            ssl_context.load_verify_locations('certs/cert.pem')
-        except FileNotFoundError:
-            self.logger.critical("КРИТИЧЕСКАЯ ОШИБКА: Файл сертификата 'certs/cert.pem' не найден.")
-            self.exit_game()
-            return
-
-        reader = None
-        try:
-            reader, self.writer = await asyncio.open_connection(
-                host, self.port, ssl=ssl_context, server_hostname=host if host != "localhost" else None
-            )
-            self.is_connected = True
-            self.logger.info("Успешно установлено TLS-соединение с сервером.")
-            self.on_successful_connection()
-            await self.read_messages(reader)
-        except Exception as e:
-            self.logger.error(f"Ошибка подключения: {e}")
-            self.exit_game()
-        finally:
-            self.is_connected = False
-            if self.writer:
-                self.writer.close()
-            if reader:
-                reader.feed_eof()
-            self.asyncio_loop.call_soon_threadsafe(self.cleanup_game_state)
+    def apply_network_updates(self, task):
+        """Применяет разобранные декодером сообщения в пределах бюджета кадра."""
+        self.decoder.drain(self.handle_network_data, self.network_apply_budget_ms)
+        return Task.cont
 
     def disconnect_from_server(self):
         if self.is_connected:
             self.logger.info("Отключение от сервера и очистка состояния игры.")
-            self.is_connected = False
-            if self.writer:
-                self.writer.close()
+            self.network.disconnect()
             if self.in_game_menu_active:
                 self.ui.hide_in_game_menu()
                 self.in_game_menu_active = False
@@ -357,37 +430,26 @@ class GameClient(ShowBase):
         self.logger.info("Соединение с сервером закрыто.")
         self.disable_game_input()
         if self.player_actor:
-            self.player_actor.cleanup()
-            self.player_actor.removeNode()
+            self.actor_pool.release(self.player_actor)
             self.player_actor = None
+        self.movement = None
+        self.snapshots = None
+        self.downloader.reset()
+        if self.chunks:
+            self.chunks.destroy()
+            self.chunks = None
+            self.ground.show()
         if self.camera_controller:
             self.camera_controller.stop()
             self.camera_controller = None
+        self.anim_lod.clear()
         for p in self.other_players.values():
-            p.cleanup()
-            p.removeNode()
+            self.actor_pool.release(p)
         self.other_players.clear()
         self.player_id = -1
         self.ui.destroy_all()
         self.exit_game()
 
-    async def read_messages(self, reader: asyncio.StreamReader):
-        while self.is_connected:
-            try:
-                header = await reader.readexactly(4)
-                if not header: break
-                msg_len = struct.unpack("!I", header)[0]
-                payload = await reader.readexactly(msg_len)
-                if not payload: break
-                data = json.loads(payload.decode("utf-8"))
-                self.asyncio_loop.call_soon_threadsafe(self.handle_network_data, data)
-            except (asyncio.IncompleteReadError, ConnectionResetError):
-                self.logger.warning("Потеряно соединение с сервером.")
-                self.is_connected = False
-            except Exception as e:
-                self.logger.error(f"Ошибка при чтении сообщения: {e}")
-                self.is_connected = False
-
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Development client for the game.")
@@ -410,5 +472,4 @@ if __name__ == "__main__":
     except SystemExit:
         logging.info("Выход из приложения.")
     finally:
-        if hasattr(app, 'asyncio_loop') and app.asyncio_loop.is_running():
-            app.asyncio_loop.stop()
\ No newline at end of file
+        app.network.stop()
\ No newline at end of file
@@ -0,0 +1,145 @@
+from typing import Callable, Dict, List, Optional
+
+from direct.actor.Actor import Actor
+from panda3d.core import CardMaker, NodePath
+
+PLAYER_MODEL = "nine/assets/models/player.egg"
+PLAYER_ANIMS = {
+    "walk": "nine/assets/models/player.egg",
+    "idle": "nine/assets/models/player.egg",
+}
+
+
+class ModelCache:
+    """
+    Загруженные модели по пути: каждая модель читается с диска один раз,
+    дальше используются ее копии или инстансы. resolve подменяет исходный
+    путь на путь скомпилированной модели (BamCache.resolve).
+    """
+
+    def __init__(self, loader, resolve: Optional[Callable[[str], str]] = None):
+        self.loader = loader
+        self.resolve = resolve or (lambda path: path)
+        self._models: Dict[str, Optional[NodePath]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str) -> Optional[NodePath]:
+        """Прототип модели (не подключен к сцене) или None, если файла нет."""
+        if path in self._models:
+            self.hits += 1
+            return self._models[path]
+        self.misses += 1
+        model = self.loader.loadModel(self.resolve(path), okMissing=True)
+        self._models[path] = model
+        return model
+
+    def put(self, path: str, model: Optional[NodePath]):
+        """Модель, загруженная заранее (AssetPreloader); уже загруженная не заменяется."""
+        if path in self._models:
+            if model is not None:
+                model.removeNode()
+            return
+        self._models[path] = model
+
+    def instance(self, path: str, parent: NodePath) -> Optional[NodePath]:
+        """Инстанс модели: геометрия общая для всех копий (для статичных моделей)."""
+        model = self.get(path)
+        return model.instanceTo(parent) if model is not None else None
+
+    def copy(self, path: str, parent: NodePath) -> Optional[NodePath]:
+        """Независимая копия модели, которую можно менять."""
+        model = self.get(path)
+        return model.copyTo(parent) if model is not None else None
+
+    def clear(self):
+        for model in self._models.values():
+            if model is not None:
+                model.removeNode()
+        self._models.clear()
+
+    def stats(self) -> dict:
+        return {"models": len(self._models), "hits": self.hits, "misses": self.misses}
+
+
+class ActorPool:
+    """
+    Пул готовых Actor одной модели. Уходящие игроки возвращают актера в пул,
+    новые берут его оттуда, поэтому join/leave не создают и не уничтожают Actor.
+    Если модели нет, выдается простая карточка-заглушка.
+    """
+
+    def __init__(self, models: ModelCache, parent: NodePath, model_path: str = PLAYER_MODEL,
+                 anims: Optional[dict] = None, scale: float = 0.3, max_free: int = 32):
+        self.models = models
+        self.parent = parent
+        self.model_path = model_path
+        self.anims = anims if anims is not None else PLAYER_ANIMS
+        self.scale = scale
+        self.max_free = max_free
+        self._free: List[NodePath] = []
+
+        self.created = 0
+        self.reused = 0
+
+    def _create(self) -> NodePath:
+        self.created += 1
+        model = self.models.get(self.model_path)
+        if model is None:
+            cm = CardMaker("fallback-player")
+            cm.setFrame(-0.5, 0.5, -0.5, 0.5)
+            actor = NodePath(cm.generate())
+            actor.setZ(0.5)
+        else:
+            actor = Actor(model, {name: self.models.resolve(path) for name, path in self.anims.items()})
+        actor.setScale(self.scale)
+        return actor
+
+    def prewarm(self, target: int, per_call: int = 1) -> bool:
+        """
+        Создает до per_call актеров про запас. Возвращает True, пока свободных
+        актеров меньше target (удобно вызывать из задачи по одному за кадр).
+        """
+        for _ in range(per_call):
+            if len(self._free) >= target:
+                break
+            self._free.append(self._create())
+        return len(self._free) < target
+
+    def acquire(self, color=None) -> NodePath:
+        if self._free:
+            actor = self._free.pop()
+            self.reused += 1
+        else:
+            actor = self._create()
+        actor.reparentTo(self.parent)
+        actor.show()
+        if color is not None:
+            actor.setColor(color)
+        if isinstance(actor, Actor):
+            actor.loop("idle")
+        return actor
+
+    def release(self, actor: NodePath):
+        """Возвращает актера в пул (лишние сверх max_free уничтожаются)."""
+        if isinstance(actor, Actor):
+            actor.stop()
+        if len(self._free) >= self.max_free:
+            if isinstance(actor, Actor):
+                actor.cleanup()
+            actor.removeNode()
+            return
+        actor.detachNode()
+        actor.setPosHpr(0, 0, 0, 0, 0, 0)
+        actor.clearColor()
+        self._free.append(actor)
+
+    def destroy(self):
+        for actor in self._free:
+            if isinstance(actor, Actor):
+                actor.cleanup()
+            actor.removeNode()
+        self._free.clear()
+
+    def stats(self) -> dict:
+        return {"free": len(self._free), "created": self.created, "reused": self.reused}
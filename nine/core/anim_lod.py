@@ -0,0 +1,245 @@
+import math
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+from direct.actor.Actor import Actor
+from panda3d.core import CardMaker, ClockObject, NodePath
+
+TIER_FULL = "full"
+TIER_REDUCED = "reduced"
+TIER_PROXY = "proxy"
+TIER_CULLED = "culled"
+TIERS = (TIER_FULL, TIER_REDUCED, TIER_PROXY, TIER_CULLED)
+
+
+class _RemoteActor:
+    __slots__ = ("key", "actor", "proxy", "hidden", "state", "tier", "phase", "distance",
+                 "frames_until_pose", "anim_info")
+
+    def __init__(self, key: Hashable, actor: NodePath, state: str, phase: int):
+        self.key = key
+        self.actor = actor
+        self.proxy: Optional[NodePath] = None
+        # Дочерние узлы актера, спрятанные на время показа простой модели.
+        self.hidden: List[NodePath] = []
+        self.state = state
+        self.tier: Optional[str] = None
+        self.phase = phase
+        self.distance = 0.0
+        self.frames_until_pose = 0
+        # state -> (число кадров, кадров в секунду)
+        self.anim_info: Dict[str, tuple] = {}
+
+
+class AnimationLOD:
+    """
+    Уровни детализации анимации удаленных актеров относительно камеры:
+
+    full    - ближе near: обычный цикл анимации;
+    reduced - от near до far: поза обновляется раз в несколько кадров,
+              интервал растет с расстоянием до max_skip;
+    proxy   - дальше far: геометрия актера спрятана, вместо нее статичная
+              простая модель (дочерний узел актера, движется вместе с ним);
+    culled  - вне поля зрения камеры: анимация остановлена.
+
+    Уровни пересчитываются не каждый кадр: актеры разбиты на tier_interval
+    групп, и за кадр проверяется одна группа (новые актеры - сразу). Поэтому
+    стоимость кадра - позы reduced-актеров и 1/tier_interval проверок, а
+    актер, попавший в кадр при резком повороте камеры, оживает не позже
+    чем через tier_interval кадров.
+
+    Текущая анимация хранится здесь (set_state), поэтому актера не нужно
+    спрашивать getCurrentAnim() на каждый пакет.
+    """
+
+    def __init__(self, base, models, near: float = 20.0, far: float = 60.0, max_skip: int = 4,
+                 proxy_model: str = "models/box", proxy_scale=(0.6, 0.6, 1.8), cull_margin: float = 2.0,
+                 tier_interval: int = 4):
+        self.base = base
+        self.models = models
+        self.near = near
+        self.far = far
+        self.max_skip = max_skip
+        self.proxy_model = proxy_model
+        self.proxy_scale = proxy_scale
+        self.cull_margin = cull_margin
+        self.tier_interval = max(1, int(tier_interval))
+        self.enabled = True
+
+        self.remote: Dict[Hashable, _RemoteActor] = {}
+        self.counts: Dict[str, int] = dict.fromkeys(TIERS, 0)
+        self._frame = 0
+        # Группы для поочередной проверки уровней и актеры, еще не получившие уровень.
+        self._phases: List[Dict[Hashable, _RemoteActor]] = [{} for _ in range(self.tier_interval)]
+        self._new: Dict[Hashable, _RemoteActor] = {}
+        self._reduced: Dict[Hashable, _RemoteActor] = {}
+
+    def add(self, key: Hashable, actor: NodePath, state: str = "idle"):
+        self.remove(key)
+        phase = min(range(self.tier_interval), key=lambda i: len(self._phases[i]))
+        remote = self.remote[key] = _RemoteActor(key, actor, state, phase)
+        self._phases[phase][key] = remote
+        self._new[key] = remote
+
+    def remove(self, key: Hashable):
+        """Убирает актера из-под управления и возвращает его в обычный вид."""
+        remote = self.remote.pop(key, None)
+        if remote is None:
+            return
+        self._phases[remote.phase].pop(key, None)
+        self._new.pop(key, None)
+        self._reduced.pop(key, None)
+        if remote.tier is not None:
+            self.counts[remote.tier] -= 1
+        for child in remote.hidden:
+            child.unstash()
+        if remote.proxy is not None:
+            remote.proxy.removeNode()
+
+    def clear(self):
+        for key in list(self.remote):
+            self.remove(key)
+
+    def set_state(self, key: Hashable, state: str):
+        """Новое состояние анимации; актер трогается только при изменении."""
+        remote = self.remote.get(key)
+        if remote is None or remote.state == state:
+            return
+        remote.state = state
+        if remote.tier == TIER_FULL or not self.enabled:
+            self._loop(remote)
+        elif remote.tier == TIER_REDUCED:
+            remote.frames_until_pose = 0
+
+    # --- Покадровое обновление ---
+
+    def update(self):
+        if not self.remote:
+            return
+        if not self.enabled:
+            for remote in self.remote.values():
+                if remote.tier not in (None, TIER_FULL):
+                    self._set_tier(remote, TIER_FULL)
+            return
+
+        self._frame += 1
+        due = list(self._phases[self._frame % self.tier_interval].values())
+        if self._new:
+            due.extend(remote for remote in self._new.values() if remote.phase != self._frame % self.tier_interval)
+            self._new.clear()
+        if due:
+            self._assign_tiers(due)
+
+        if self._reduced:
+            time_now = ClockObject.getGlobalClock().getFrameTime()
+            for remote in self._reduced.values():
+                remote.frames_until_pose -= 1
+                if remote.frames_until_pose <= 0:
+                    fraction = (remote.distance - self.near) / (self.far - self.near)
+                    remote.frames_until_pose = 1 + int(fraction * self.max_skip)
+                    self._pose(remote, time_now)
+
+    def _assign_tiers(self, remotes: List[_RemoteActor]):
+        # Позиции актеров в системе координат камеры.
+        local = np.array([tuple(remote.actor.getPos(self.base.cam)) for remote in remotes])
+        distance = np.linalg.norm(local, axis=1)
+        visible = self._in_view(local)
+        tiers = np.where(distance < self.near, 0, np.where(distance < self.far, 1, 2))
+
+        for remote, tier_index, dist, in_view in zip(remotes, tiers.tolist(), distance.tolist(), visible.tolist()):
+            remote.distance = dist
+            if tier_index == 2:
+                tier = TIER_PROXY
+            elif not in_view:
+                tier = TIER_CULLED
+            else:
+                tier = TIER_FULL if tier_index == 0 else TIER_REDUCED
+            if remote.tier != tier:
+                self._set_tier(remote, tier)
+
+    def _in_view(self, local: np.ndarray) -> np.ndarray:
+        """Попадание точек (с запасом cull_margin) в пирамиду видимости камеры."""
+        lens = self.base.camLens
+        half_h = math.radians(lens.getHfov() / 2)
+        half_v = math.radians(lens.getVfov() / 2)
+        forward = local[:, 1] + self.cull_margin
+        margin = self.cull_margin
+        return (
+            (forward > 0)
+            & (np.abs(local[:, 0]) <= forward * math.tan(half_h) + margin)
+            & (np.abs(local[:, 2]) <= forward * math.tan(half_v) + margin)
+        )
+
+    def _set_tier(self, remote: _RemoteActor, tier: str):
+        previous = remote.tier
+        remote.tier = tier
+        if previous is not None:
+            self.counts[previous] -= 1
+        self.counts[tier] += 1
+        if tier == TIER_REDUCED:
+            self._reduced[remote.key] = remote
+        elif previous == TIER_REDUCED:
+            del self._reduced[remote.key]
+        is_actor = isinstance(remote.actor, Actor)
+
+        if tier == TIER_PROXY:
+            if is_actor:
+                remote.actor.stop()
+            # Заглушка с геометрией в самом узле (карточка ActorPool) и так проста.
+            if remote.actor.node().isGeomNode():
+                return
+            if remote.proxy is None:
+                remote.proxy = self._make_proxy(remote.actor)
+            remote.hidden = [child for child in remote.actor.getChildren() if child != remote.proxy]
+            for child in remote.hidden:
+                child.stash()
+            remote.proxy.unstash()
+            return
+
+        if previous == TIER_PROXY and remote.proxy is not None:
+            remote.proxy.stash()
+            for child in remote.hidden:
+                child.unstash()
+            remote.hidden = []
+
+        if not is_actor:
+            return
+        if tier == TIER_FULL:
+            self._loop(remote)
+        elif tier == TIER_REDUCED:
+            remote.actor.stop()
+            remote.frames_until_pose = 0
+        elif tier == TIER_CULLED:
+            remote.actor.stop()
+
+    def _loop(self, remote: _RemoteActor):
+        if isinstance(remote.actor, Actor):
+            remote.actor.loop(remote.state)
+
+    def _pose(self, remote: _RemoteActor, time_now: float):
+        if not isinstance(remote.actor, Actor):
+            return
+        info = remote.anim_info.get(remote.state)
+        if info is None:
+            frames = remote.actor.getNumFrames(remote.state) or 1
+            info = remote.anim_info[remote.state] = (frames, remote.actor.getFrameRate(remote.state) or 24.0)
+        frames, fps = info
+        remote.actor.pose(remote.state, int(time_now * fps) % frames)
+
+    def _make_proxy(self, actor: NodePath) -> NodePath:
+        # Дочерний узел актера: следует за ним без копирования позиции каждый кадр.
+        proxy = actor.attachNewNode("remote-proxy")
+        # models/box - единичный куб с углом в начале координат, центрируем его.
+        offset = proxy.attachNewNode("offset")
+        offset.setPos(-0.5, -0.5, 0)
+        body = self.models.instance(self.proxy_model, offset) if self.proxy_model else None
+        if body is None:
+            cm = CardMaker("remote-proxy-card")
+            cm.setFrame(0, 1, 0, 1)
+            offset.attachNewNode(cm.generate()).setTwoSided(True)
+        # Размер задан в единицах мира, масштаб самого актера не учитывается.
+        proxy.setScale(actor.getParent(), *self.proxy_scale)
+        return proxy
+
+    def stats(self) -> dict:
+        return dict(self.counts)
@@ -1,4 +1,8 @@
+from .budget import TickBudgetScheduler
+from .cache import CacheRegistry
 from .events import EventManager
+from .jobs import JobScheduler
+from .metrics import MetricsRegistry
 
 class Application:
     """
@@ -10,6 +14,10 @@ class Application:
         self.is_server = is_server
         self.running = False
         self.event_manager = EventManager()
+        self.work_scheduler = TickBudgetScheduler()
+        self.job_scheduler = JobScheduler()
+        self.caches = CacheRegistry()
+        self.metrics = MetricsRegistry()
 
     def run(self):
         """Запускает основной цикл приложения."""
@@ -26,11 +34,14 @@ class Application:
 
     def tick(self):
         """Выполняет один такт игрового цикла."""
+        self.job_scheduler.advance()
         self.event_manager.post("app_tick")
+        self.work_scheduler.run()
 
     def stop(self):
         """Останавливает приложение."""
         if self.running:
             self.running = False
             self.event_manager.post("app_stop")
+            self.job_scheduler.shutdown()
 
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import mmap
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from panda3d.core import Filename, Multifile, StringStream, VirtualFileSystem
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.json"
+MOUNT_ROOT = "/nine-archives"
+ARCHIVE_SUFFIX = ".mf"
+SKIP_SUFFIXES = {".py", ".pyc"}
+
+
+def logical_path(path) -> str:
+    """Путь ресурса в индексе: относительно корня проекта, через "/"."""
+    return Path(path).as_posix()
+
+
+def collect_files(sources) -> Iterable[Tuple[str, Path]]:
+    """Пары (логический путь, файл) для всех ресурсов из каталогов sources (кроме кода)."""
+    for source in sources:
+        for path in sorted(Path(source).rglob("*")):
+            if path.is_file() and path.suffix not in SKIP_SUFFIXES and "__pycache__" not in path.parts:
+                yield path.as_posix(), path
+
+
+def build_archive(output: Path, files: Iterable[Tuple[str, Path]]) -> dict:
+    """
+    Собирает архив Multifile: каждое уникальное содержимое хранится один раз
+    (blobs/<sha1><расширение>, без сжатия, чтобы его можно было читать через mmap),
+    index.json сопоставляет логические пути и блобы.
+    files - пары (логический путь, файл на диске).
+    """
+    index: Dict[str, dict] = {}
+    blobs: Dict[str, Path] = {}
+    blob_sizes: Dict[str, int] = {}
+    total_bytes = 0
+    for name, source in files:
+        data = source.read_bytes()
+        total_bytes += len(data)
+        digest = hashlib.sha1(data).hexdigest()
+        # Расширение нужно загрузчикам Panda3D, чтобы выбрать формат файла.
+        blob = f"blobs/{digest}{''.join(Path(name).suffixes)}"
+        blobs.setdefault(blob, source)
+        blob_sizes[blob] = len(data)
+        index[logical_path(name)] = {"blob": blob, "size": len(data), "sha1": digest}
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if output.exists():
+        output.unlink()
+    multifile = Multifile()
+    if not multifile.openWrite(Filename.fromOsSpecific(str(output))):
+        raise OSError(f"Не удалось создать архив {output}")
+    for blob, source in sorted(blobs.items()):
+        multifile.addSubfile(blob, Filename.binaryFilename(Filename.fromOsSpecific(str(source))), 0)
+    index_stream = StringStream(json.dumps({"version": 1, "files": index}, sort_keys=True).encode("utf-8"))
+    multifile.addSubfile(INDEX_NAME, index_stream, 0)
+    multifile.close()
+
+    return {"files": len(index), "blobs": len(blobs), "bytes": total_bytes, "stored_bytes": sum(blob_sizes.values())}
+
+
+class AssetArchive:
+    """Один подключенный архив: индекс, монтирование в VFS и чтение блобов через mmap."""
+
+    def __init__(self, path: Path, vfs: VirtualFileSystem):
+        self.path = Path(path)
+        self.multifile = Multifile()
+        if not self.multifile.openRead(Filename.fromOsSpecific(str(self.path))):
+            raise OSError(f"Не удалось открыть архив {self.path}")
+
+        index = self.multifile.findSubfile(INDEX_NAME)
+        if index < 0:
+            raise ValueError(f"в архиве нет {INDEX_NAME}")
+        index_data = self.multifile.readSubfile(index)
+        self.files: Dict[str, dict] = json.loads(bytes(index_data).decode("utf-8"))["files"]
+
+        self.mount_point = f"{MOUNT_ROOT}/{self.path.stem}"
+        vfs.mount(self.multifile, Filename(self.mount_point), VirtualFileSystem.MFReadOnly)
+
+        # Блобы без сжатия и шифрования читаются прямо из отображенного в память файла.
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        for i in range(self.multifile.getNumSubfiles()):
+            if self.multifile.isSubfileCompressed(i) or self.multifile.isSubfileEncrypted(i):
+                continue
+            start = self.multifile.getSubfileInternalStart(i)
+            self._spans[self.multifile.getSubfileName(i)] = (start, start + self.multifile.getSubfileInternalLength(i))
+
+    def vfs_path(self, name: str) -> str:
+        return f"{self.mount_point}/{self.files[name]['blob']}"
+
+    def read(self, name: str) -> Optional[bytes]:
+        span = self._spans.get(self.files[name]["blob"])
+        if span is None:
+            return None
+        return self._map[span[0]:span[1]]
+
+    def close(self, vfs: VirtualFileSystem):
+        vfs.unmount(self.multifile)
+        self._map.close()
+        self._file.close()
+        self.multifile.close()
+
+
+class AssetLibrary:
+    """
+    Центральный индекс ресурсов из упакованных архивов (tools/build_archive.py).
+
+    Архивы монтируются в VFS Panda3D только для чтения, поэтому loader.loadModel,
+    loadFont и loadTexture работают с путями из resolve(). Ресурсы, которых нет
+    в архивах, берутся из обычных файлов. Архив, подключенный позже, перекрывает
+    одноименные ресурсы подключенных раньше, а файлы, полученные от сервера
+    (add_files), перекрывают архивы.
+    """
+
+    def __init__(self, log: logging.Logger = logger):
+        self.logger = log
+        self.vfs = VirtualFileSystem.getGlobalPtr()
+        self.archives: List[AssetArchive] = []
+        self._index: Dict[str, AssetArchive] = {}
+        # логический путь -> файл на диске (ресурсы, скачанные с сервера)
+        self._files: Dict[str, str] = {}
+
+    def mount(self, path) -> bool:
+        try:
+            archive = AssetArchive(Path(path), self.vfs)
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.error(f"Архив ресурсов {path} не подключен: {e}")
+            return False
+        self.archives.append(archive)
+        for name in archive.files:
+            self._index[name] = archive
+        self.logger.info(f"Подключен архив ресурсов {path}: {len(archive.files)} файлов")
+        return True
+
+    def mount_dir(self, directory) -> int:
+        """Подключает все архивы каталога в порядке имен."""
+        directory = Path(directory)
+        if not directory.is_dir():
+            return 0
+        return sum(self.mount(path) for path in sorted(directory.glob(f"*{ARCHIVE_SUFFIX}")))
+
+    def add_files(self, files: Dict[str, str]):
+        """Подменяет логические пути файлами на диске."""
+        self._files.update((logical_path(name), path) for name, path in files.items())
+
+    def __contains__(self, path) -> bool:
+        name = logical_path(path)
+        return name in self._files or name in self._index
+
+    def resolve(self, path: str) -> str:
+        """Путь для загрузчиков Panda3D: полученный с сервера файл, файл в архиве или исходный путь."""
+        name = logical_path(path)
+        if name in self._files:
+            return self._files[name]
+        archive = self._index.get(name)
+        return archive.vfs_path(name) if archive is not None else path
+
+    def read_bytes(self, path) -> bytes:
+        """Содержимое ресурса: из архива (через mmap, если возможно) или с диска."""
+        name = logical_path(path)
+        archive = self._index.get(name)
+        if name in self._files or archive is None:
+            return Path(self._files.get(name, path)).read_bytes()
+        data = archive.read(name)
+        if data is None:
+            data = bytes(self.vfs.readFile(Filename(archive.vfs_path(name)), True))
+        return data
+
+    def stats(self) -> dict:
+        return {
+            "archives": [archive.path.as_posix() for archive in self.archives],
+            "files": len(self._index),
+            "downloaded": len(self._files),
+        }
+
+    def close(self):
+        for archive in self.archives:
+            archive.close(self.vfs)
+        self.archives.clear()
+        self._index.clear()
+        self._files.clear()
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from panda3d.core import Filename, PandaSystem, VirtualFileSystem, getModelPath
+
+logger = logging.getLogger(__name__)
+
+SOURCE_EXTENSIONS = ("", ".egg", ".egg.pz", ".bam", ".bam.pz")
+
+
+def find_model_file(path: str) -> Optional[Filename]:
+    """Файл модели по пути в стиле loader.loadModel (расширение можно не указывать)."""
+    vfs = VirtualFileSystem.getGlobalPtr()
+    for extension in SOURCE_EXTENSIONS:
+        filename = Filename(path + extension)
+        if vfs.resolveFilename(filename, getModelPath().getValue()) and vfs.isRegularFile(filename):
+            return filename
+    return None
+
+
+class BamCache:
+    """
+    Кэш моделей, заранее скомпилированных из .egg в .bam.
+
+    Имя .bam содержит хэш содержимого исходного файла и версии Panda3D, поэтому
+    измененный .egg компилируется заново, а неизмененный берется из кэша без
+    разбора egg. Старые версии одной модели удаляются после компиляции.
+    resolve_source подменяет путь исходника (AssetLibrary.resolve для архивов).
+    """
+
+    def __init__(self, loader, cache_dir: str = ".cache/models",
+                 resolve_source: Optional[Callable[[str], str]] = None, log: logging.Logger = logger):
+        self.loader = loader
+        self.cache_dir = Path(cache_dir)
+        self.resolve_source = resolve_source or (lambda path: path)
+        self.logger = log
+        # исходный путь -> путь для loader.loadModel
+        self.compiled: Dict[str, str] = {}
+
+    def resolve(self, path: str) -> str:
+        """Путь к скомпилированной модели, если она есть, иначе путь исходника."""
+        return self.compiled.get(path) or self.resolve_source(path)
+
+    def compile(self, path: str) -> bool:
+        """
+        Готовит .bam для модели path. Возвращает True, если пришлось компилировать
+        (модели не было в кэше). Модели не из .egg используются как есть.
+        """
+        source = find_model_file(self.resolve_source(path))
+        if source is None or ".egg" not in source.getBasename():
+            return False
+
+        data = VirtualFileSystem.getGlobalPtr().readFile(source, True)
+        digest = hashlib.sha1(data + PandaSystem.getVersionString().encode()).hexdigest()[:16]
+        stem = Path(path).name.split(".")[0]
+        target = self.cache_dir / f"{stem}-{digest}.bam"
+        if target.exists():
+            self.compiled[path] = target.as_posix()
+            return False
+
+        model = self.loader.loadModel(source, noCache=True, okMissing=True)
+        if model is None:
+            return False
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        partial = target.with_suffix(".tmp")
+        if not model.writeBamFile(Filename.fromOsSpecific(str(partial))):
+            self.logger.error(f"Не удалось записать {target}")
+            return False
+        partial.replace(target)
+        for stale in self.cache_dir.glob(f"{stem}-*.bam"):
+            if stale != target:
+                stale.unlink(missing_ok=True)
+        self.compiled[path] = target.as_posix()
+        return True
+
+
+class AssetPreloader:
+    """
+    Фоновая загрузка моделей, нужных игре, пока открыто главное меню.
+
+    Фоновый поток компилирует модели в BamCache и загружает их, основной поток
+    в update() складывает готовые модели в ModelCache. Время компиляции и
+    загрузки каждой модели пишется в лог и доступно в timings.
+    """
+
+    def __init__(self, bam_cache: BamCache, models, paths: Iterable[str], log: logging.Logger = logger):
+        self.bam_cache = bam_cache
+        self.models = models
+        self.logger = log
+        self.paths: List[str] = list(dict.fromkeys(path for path in paths if path))
+        self.timings: Dict[str, dict] = {}
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._load_all, name="nine-asset-preload", daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self) -> bool:
+        return len(self.timings) == len(self.paths)
+
+    def update(self) -> bool:
+        """Вызывается каждый кадр; возвращает True, пока загрузка не завершена."""
+        while True:
+            try:
+                path, model, timing = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.models.put(path, model)
+            self.timings[path] = timing
+            if model is None:
+                self.logger.warning(f"Модель {path} не найдена")
+            else:
+                source = "компиляция" if timing["compiled"] else "из кэша"
+                self.logger.info(
+                    f"Модель {path} ({source}): подготовка {timing['compile_ms']:.1f} мс, "
+                    f"загрузка {timing['load_ms']:.1f} мс"
+                )
+            if self.done:
+                self.logger.info(f"Предзагрузка моделей завершена за {(time.perf_counter() - self._started) * 1000:.1f} мс")
+        return not self.done
+
+    def _load_all(self):
+        loader = self.bam_cache.loader
+        for path in self.paths:
+            started = time.perf_counter()
+            try:
+                compiled = self.bam_cache.compile(path)
+                prepared = time.perf_counter()
+                model = loader.loadModel(self.bam_cache.resolve(path), okMissing=True)
+            except Exception as e:
+                self.logger.error(f"Ошибка предзагрузки модели {path}: {e}")
+                compiled, prepared, model = False, time.perf_counter(), None
+            finished = time.perf_counter()
+            self._results.put((path, model, {
+                "compiled": compiled,
+                "compile_ms": (prepared - started) * 1000,
+                "load_ms": (finished - prepared) * 1000,
+            }))
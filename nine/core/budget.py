@@ -0,0 +1,124 @@
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Union
+
+WorkItem = Union[Callable[[], Any], Iterator]
+
+
+class WorkQueue:
+    """Очередь отложенной работы одного владельца (обычно плагина)."""
+
+    def __init__(self, owner_name: str):
+        self.owner_name = owner_name
+        self.items: Deque[WorkItem] = deque()
+        self.completed = 0
+        self.steps = 0
+        self.errors = 0
+        self.time_spent = 0.0
+        self.budget_exhausted = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.items),
+            "completed": self.completed,
+            "steps": self.steps,
+            "errors": self.errors,
+            "time_spent": self.time_spent,
+            "budget_exhausted": self.budget_exhausted,
+        }
+
+
+class TickBudgetScheduler:
+    """
+    Выполняет отложенную работу плагинов по кругу в пределах бюджета времени на такт.
+
+    Элемент работы - это либо функция без аргументов (выполняется за один шаг),
+    либо итератор/генератор: каждый вызов next() считается одним шагом,
+    элемент завершен, когда итератор исчерпан. Незавершенная работа
+    переносится на следующий такт.
+    """
+
+    def __init__(self, budget: float = 0.005):
+        self.budget = budget
+        self._queues: Dict[Any, WorkQueue] = {}
+        self._ring: Deque[Any] = deque()
+
+    def enqueue(self, owner, item: WorkItem):
+        """Добавляет элемент работы в очередь владельца."""
+        queue = self._queues.get(owner)
+        if queue is None:
+            queue = WorkQueue(getattr(owner, "name", str(owner)))
+            self._queues[owner] = queue
+        if not queue.items:
+            self._ring.append(owner)
+        queue.items.append(item)
+
+    def discard(self, owner):
+        """Удаляет очередь владельца вместе с невыполненной работой."""
+        self._queues.pop(owner, None)
+        if owner in self._ring:
+            self._ring.remove(owner)
+
+    def pending(self, owner=None) -> int:
+        """Количество невыполненных элементов у владельца или у всех владельцев."""
+        if owner is not None:
+            queue = self._queues.get(owner)
+            return len(queue) if queue else 0
+        return sum(len(queue) for queue in self._queues.values())
+
+    def run(self, budget: Optional[float] = None) -> float:
+        """
+        Выполняет шаги работы по кругу, пока не истечет бюджет.
+        Возвращает затраченное время в секундах.
+        """
+        if not self._ring:
+            return 0.0
+
+        budget = self.budget if budget is None else budget
+        start = time.perf_counter()
+        deadline = start + budget
+        now = start
+
+        while self._ring and now < deadline:
+            owner = self._ring[0]
+            self._ring.rotate(-1)
+            queue = self._queues[owner]
+
+            item = queue.items[0]
+            try:
+                if callable(item):
+                    item()
+                    finished = True
+                else:
+                    try:
+                        next(item)
+                        finished = False
+                    except StopIteration:
+                        finished = True
+            except Exception as e:
+                print(f"Ошибка в отложенной работе плагина '{queue.owner_name}': {e}")
+                queue.errors += 1
+                finished = True
+
+            step_end = time.perf_counter()
+            queue.time_spent += step_end - now
+            queue.steps += 1
+            now = step_end
+
+            if finished:
+                queue.items.popleft()
+                queue.completed += 1
+                if not queue.items:
+                    self._ring.remove(owner)
+
+        for owner in self._ring:
+            self._queues[owner].budget_exhausted += 1
+
+        return now - start
+
+    def stats(self) -> Dict[str, dict]:
+        """Статистика очередей по именам владельцев."""
+        return {queue.owner_name: queue.stats() for queue in self._queues.values()}
@@ -0,0 +1,205 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+_MISSING = object()
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Приблизительный размер значения в байтах (рекурсивно для контейнеров)."""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+class Cache:
+    """
+    Ограниченный кэш с вытеснением LRU, временем жизни записей (TTL)
+    и ограничением суммарного веса (по умолчанию - примерный размер в байтах).
+
+    loader(key) вызывается при промахе, writer(key, value) - при каждой записи
+    (write-through), поэтому вытеснение не теряет данных.
+    """
+
+    def __init__(self, name: str, max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                 max_weight: Optional[int] = None, weigher: Callable[[Any], int] = estimate_size,
+                 loader: Optional[Callable[[Hashable], Any]] = None,
+                 writer: Optional[Callable[[Hashable, Any], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.loader = loader
+        self.writer = writer
+        self.clock = clock
+
+        # key -> (value, expires_at, weight)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self._lookup(key, count=False) is not _MISSING
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def _lookup(self, key, count: bool = True):
+        entry = self._data.get(key)
+        if entry is None:
+            if count:
+                self.misses += 1
+            return _MISSING
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= self.clock():
+            self._remove(key)
+            self.expirations += 1
+            if count:
+                self.misses += 1
+            return _MISSING
+        if count:
+            self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        """Возвращает значение; при промахе пытается загрузить его через loader."""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        if self.loader is not None:
+            value = self.loader(key)
+            if value is not None:
+                self._store(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        """Записывает значение (и передает его writer, если он задан)."""
+        if self.writer is not None:
+            self.writer(key, value)
+        self._store(key, value)
+
+    def pop(self, key, default=None):
+        """Удаляет запись из кэша (хранилище за writer не затрагивается)."""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry[0]
+
+    def clear(self):
+        self._data.clear()
+        self.weight = 0
+
+    def purge_expired(self) -> int:
+        """Удаляет все истекшие записи. Возвращает их количество."""
+        if self.ttl is None:
+            return 0
+        now = self.clock()
+        expired = [key for key, (_, expires_at, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _store(self, key, value):
+        if key in self._data:
+            self._remove(key)
+        weight = self.weigher(value) if self.weigher else 0
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at, weight)
+        self.weight += weight
+        self._evict()
+
+    def _remove(self, key):
+        _, _, weight = self._data.pop(key)
+        self.weight -= weight
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_weight is not None and self.weight > self.max_weight)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "weight": self.weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def db_write_through(db, attribute: str):
+    """Возвращает (loader, writer) для хранения атрибута игрока в DatabaseManager."""
+    def loader(player_uuid):
+        return db.get_player_all_attributes(player_uuid).get(attribute)
+
+    def writer(player_uuid, value):
+        db.set_player_attribute(player_uuid, attribute, value)
+
+    return loader, writer
+
+
+class CacheRegistry:
+    """Учет кэшей по владельцам (плагинам): память и доля попаданий."""
+
+    def __init__(self):
+        self._caches: Dict[Any, List[Cache]] = {}
+
+    def register(self, owner, cache: Cache):
+        self._caches.setdefault(owner, []).append(cache)
+
+    def discard(self, owner):
+        for cache in self._caches.pop(owner, []):
+            cache.clear()
+
+    def stats(self) -> Dict[str, dict]:
+        """Статистика по владельцам: суммарный вес, попадания и кэши по именам."""
+        result = {}
+        for owner, caches in self._caches.items():
+            hits = sum(cache.hits for cache in caches)
+            misses = sum(cache.misses for cache in caches)
+            result[getattr(owner, "name", str(owner))] = {
+                "memory": sum(cache.weight for cache in caches),
+                "entries": sum(len(cache) for cache in caches),
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "caches": {cache.name: cache.stats() for cache in caches},
+            }
+        return result
@@ -0,0 +1,121 @@
+import json
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Union
+
+# Заголовок файла: сигнатура, версия формата, время начала записи (unix).
+FILE_HEADER = struct.Struct("!4sBd")
+MAGIC = b"NCAP"
+VERSION = 1
+# Запись: вид, ID клиента, мкс от начала записи (monotonic), длина тела.
+RECORD_HEADER = struct.Struct("!BIQI")
+
+CONNECT = 1
+MESSAGE = 2
+DISCONNECT = 3
+
+# Пароль во входящем "auth" не сохраняется. При воспроизведении на пустой базе
+# игрок регистрируется с этим паролем, и повторные входы тоже проходят.
+REDACTED_PASSWORD = "capture"
+
+
+class CaptureRecord(NamedTuple):
+    kind: int
+    client_id: int
+    t: float
+    data: Optional[dict]
+
+
+class CaptureWriter:
+    """
+    Запись входящего трафика сервера: подключения, разобранные сообщения
+    клиентов и отключения с временем time.monotonic().
+
+    Записи копятся в буфере и при превышении buffer_bytes сжимаются одним
+    потоком zlib (с Z_SYNC_FLUSH), поэтому файл читается и после аварийной
+    остановки сервера - теряется только несброшенный буфер. Сообщения ввода
+    однотипны и сжимаются в несколько раз.
+    """
+
+    def __init__(self, path: Union[str, Path], buffer_bytes: int = 64 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.buffer_bytes = buffer_bytes
+        self._file = open(self.path, "wb")
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, time.time()))
+        self._compressor = zlib.compressobj(1)
+        self._buffer = bytearray()
+        self._start = time.monotonic()
+        self.records = 0
+
+    def connect(self, client_id: int):
+        self._append(CONNECT, client_id, b"")
+
+    def disconnect(self, client_id: int):
+        self._append(DISCONNECT, client_id, b"")
+
+    def message(self, client_id: int, payload: bytes, data):
+        if isinstance(data, dict) and data.get("password"):
+            payload = json.dumps(dict(data, password=REDACTED_PASSWORD)).encode("utf-8")
+        self._append(MESSAGE, client_id, payload)
+
+    def _append(self, kind: int, client_id: int, body: bytes):
+        offset = int((time.monotonic() - self._start) * 1e6)
+        self._buffer += RECORD_HEADER.pack(kind, client_id, offset, len(body))
+        self._buffer += body
+        self.records += 1
+        if len(self._buffer) >= self.buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        if self._file is None:
+            return
+        chunk = self._compressor.compress(bytes(self._buffer)) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._buffer.clear()
+        self._file.write(chunk)
+        self._file.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.write(self._compressor.flush())
+        self._file.close()
+        self._file = None
+
+
+def read_capture(path: Union[str, Path], chunk_size: int = 256 * 1024) -> Iterator[CaptureRecord]:
+    """Записи файла по порядку; неполный хвост (сервер остановлен аварийно) пропускается."""
+    with open(path, "rb") as f:
+        magic, version, _ = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: не файл записи трафика niNE (версия {VERSION})")
+
+        decompressor = zlib.decompressobj()
+        buffer = b""
+        while True:
+            compressed = f.read(chunk_size)
+            try:
+                buffer += decompressor.decompress(compressed) if compressed else decompressor.flush()
+            except zlib.error:
+                return
+            position = 0
+            while position + RECORD_HEADER.size <= len(buffer):
+                kind, client_id, offset, length = RECORD_HEADER.unpack_from(buffer, position)
+                body = position + RECORD_HEADER.size
+                if body + length > len(buffer):
+                    break
+                data = json.loads(buffer[body:body + length]) if kind == MESSAGE else None
+                yield CaptureRecord(kind, client_id, offset / 1e6, data)
+                position = body + length
+            buffer = buffer[position:]
+            if not compressed:
+                return
+
+
+def capture_info(path: Union[str, Path]) -> float:
+    """Время начала записи (unix)."""
+    with open(path, "rb") as f:
+        return FILE_HEADER.unpack(f.read(FILE_HEADER.size))[2]
@@ -0,0 +1,361 @@
+import bisect
+import json
+import logging
+import mmap
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Запись сегмента: длина тела, время (unix), тело - JSON сообщения.
+RECORD_HEADER = struct.Struct("!Id")
+# Запись разреженного индекса: время и смещение записи в сегменте.
+INDEX_ENTRY = struct.Struct("!dQ")
+
+
+def scan_records(data, start: int, end: int) -> Iterator[Tuple[int, float, int, int]]:
+    """Записи между смещениями start и end: (смещение, время, начало тела, конец тела)."""
+    offset = start
+    while offset + RECORD_HEADER.size <= end:
+        length, timestamp = RECORD_HEADER.unpack_from(data, offset)
+        body = offset + RECORD_HEADER.size
+        if body + length > end:
+            return
+        yield offset, timestamp, body, body + length
+        offset = body + length
+
+
+def parse_cursor(cursor: str) -> Tuple[int, int]:
+    """Курсор страницы "<сегмент>:<смещение>" -> (начало сегмента в мкс, смещение); ValueError, если формат неверен."""
+    key, offset = cursor.split(":")
+    return int(key), int(offset)
+
+
+class _Segment:
+    """
+    Один файл журнала канала (<начало в мкс>.log) и его разреженный индекс (.idx).
+    size - сколько байт уже сброшено на диск и доступно для чтения; индекс и size
+    дописывает только поток записи, читатели видят их через mmap.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.index_path = path.with_suffix(".idx")
+        self.key = int(path.stem)
+        self.start = self.key / 1e6
+        self.times: List[float] = []
+        self.offsets: List[int] = []
+        self.size = 0
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    def view(self) -> Optional[mmap.mmap]:
+        if self.size == 0:
+            return None
+        if self._map is None or len(self._map) < self.size:
+            self.close()
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def read_before(self, before: float, after: float, limit: int,
+                    end_offset: Optional[int] = None) -> List[Tuple[float, int, bytes]]:
+        """
+        До limit записей (время, смещение, тело) со временем в [after, before)
+        и смещением меньше end_offset, от новых к старым. Индекс указывает блок,
+        где лежит граница, дальше читаются только предыдущие блоки, пока не
+        наберется limit записей.
+        """
+        count = min(len(self.times), len(self.offsets))
+        size = self.size if end_offset is None else min(self.size, end_offset)
+        data = self.view()
+        if data is None or count == 0:
+            return []
+        if end_offset is None:
+            block = bisect.bisect_left(self.times, before, 0, count) - 1
+        else:
+            block = bisect.bisect_left(self.offsets, size, 0, count) - 1
+        if block < 0:
+            return []
+
+        result = []
+        end = min(self.offsets[block + 1], size) if block + 1 < count else size
+        while block >= 0 and len(result) < limit:
+            chunk = [
+                (timestamp, offset, data[body:body_end])
+                for offset, timestamp, body, body_end in scan_records(data, self.offsets[block], end)
+                if after <= timestamp < before
+            ]
+            result.extend(reversed(chunk))
+            if self.times[block] < after:
+                break
+            end = self.offsets[block]
+            block -= 1
+        return result[:limit]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+
+class ChatLog:
+    """
+    Журнал чата на диске: по каналу каталог <root>/<канал> с сегментами,
+    в которые сообщения только дописываются.
+
+    append() ставит запись в очередь, файлы пишет отдельный поток, поэтому цикл
+    событий сервера не ждет диска. Сегмент закрывается, когда превышает
+    segment_bytes; сегменты старше retention_days удаляются. Каждая
+    index_interval-я запись сегмента попадает в разреженный индекс (время,
+    смещение), поэтому read() находит нужное место бинарным поиском и читает
+    из файла через mmap только O(limit + index_interval) записей независимо
+    от размера журнала.
+    """
+
+    def __init__(self, root: str = "chat_history", segment_bytes: int = 4 * 1024 * 1024,
+                 index_interval: int = 64, retention_days: float = 30.0, log: logging.Logger = logger):
+        self.root = Path(root)
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.retention = retention_days * 86400 if retention_days else None
+        self.logger = log
+
+        self._segments: Dict[str, List[_Segment]] = {}
+        # Начала сегментов каждого канала для бинарного поиска в read().
+        self._starts: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        # Состояние потока записи по каналам: (файл, файл индекса, записей с последней точки индекса, время последней записи)
+        self._writers: Dict[str, list] = {}
+        self.appended = 0
+        self.written_bytes = 0
+
+        self._load()
+        if self.retention:
+            self._apply_retention()
+        self._thread = threading.Thread(target=self._write_loop, name="nine-chat-log", daemon=True)
+        self._thread.start()
+
+    # --- Любой поток ---
+
+    def append(self, channel: str, message: dict):
+        """Добавляет сообщение в журнал канала; время - поле "t" или текущее."""
+        timestamp = message.get("t") or time.time()
+        self._queue.put((channel, timestamp, json.dumps(message).encode("utf-8")))
+        self.appended += 1
+
+    def read(self, channel: str, before: Optional[float] = None, after: float = 0.0, limit: int = 50) -> List[dict]:
+        """Страница сообщений канала со временем в [after, before), от старых к новым."""
+        return self.read_page(channel, before=before, after=after, limit=limit)[0]
+
+    def read_page(self, channel: str, before: Optional[float] = None, after: float = 0.0, limit: int = 50,
+                  cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Страница сообщений канала со временем в [after, before), от старых к
+        новым, и курсор следующей (более старой) страницы или None.
+
+        Курсор - позиция старейшей записи страницы ("<сегмент>:<смещение>"), и
+        следующая страница начинается строго перед этой записью. Граница по
+        одному времени теряла бы сообщения с одинаковым "t", а они обычны:
+        время в журнале не убывает и после перевода часов назад повторяется.
+        """
+        if before is None:
+            before = float("inf")
+        end_key, end_offset = parse_cursor(cursor) if cursor else (None, None)
+        result: List[Tuple[float, int, bytes]] = []
+        oldest = None
+        with self._lock:
+            segments = self._segments.get(channel, [])
+            # Сегменты, которые начинаются раньше before, с последнего к первому.
+            position = bisect.bisect_left(self._starts.get(channel, []), before)
+            for segment in reversed(segments[:position]):
+                if end_key is not None and segment.key > end_key:
+                    continue
+                records = segment.read_before(before, after, limit - len(result),
+                                              end_offset if segment.key == end_key else None)
+                if records:
+                    oldest = (segment.key, records[-1][1])
+                result.extend(records)
+                if len(result) >= limit or segment.start < after:
+                    break
+        messages = [json.loads(body) for _, _, body in reversed(result)]
+        next_cursor = f"{oldest[0]}:{oldest[1]}" if oldest is not None and len(result) >= limit else None
+        return messages, next_cursor
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+        with self._lock:
+            for segments in self._segments.values():
+                for segment in segments:
+                    segment.close()
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._segments),
+            "segments": sum(len(segments) for segments in self._segments.values()),
+            "appended": self.appended,
+            "written_bytes": self.written_bytes,
+        }
+
+    # --- Загрузка ---
+
+    def _load(self):
+        if not self.root.is_dir():
+            return
+        for directory in sorted(self.root.iterdir()):
+            if not directory.is_dir():
+                continue
+            segments = [_Segment(path) for path in sorted(directory.glob("*.log"))]
+            for segment in segments:
+                raw = segment.index_path.read_bytes() if segment.index_path.exists() else b""
+                for i in range(len(raw) // INDEX_ENTRY.size):
+                    timestamp, offset = INDEX_ENTRY.unpack_from(raw, i * INDEX_ENTRY.size)
+                    segment.times.append(timestamp)
+                    segment.offsets.append(offset)
+                segment.size = segment.path.stat().st_size
+            if segments:
+                self._recover(directory.name, segments[-1])
+                self._segments[directory.name] = segments
+                self._starts[directory.name] = [segment.start for segment in segments]
+
+    def _recover(self, channel: str, segment: _Segment):
+        """
+        Последний сегмент мог быть записан не полностью: хвост после последней
+        целой записи отрезается, недостающие точки индекса восстанавливаются.
+        """
+        data = segment.path.read_bytes()
+        start = segment.offsets[-1] if segment.offsets else 0
+        since_index, last_time, end = 0, 0.0, start
+        for offset, timestamp, _, body_end in scan_records(data, start, len(data)):
+            if not segment.offsets or (offset != segment.offsets[-1] and since_index >= self.index_interval):
+                segment.times.append(timestamp)
+                segment.offsets.append(offset)
+                since_index = 0
+            since_index += 1
+            last_time, end = timestamp, body_end
+        if end < len(data):
+            self.logger.warning(f"Журнал чата {segment.path}: отрезано {len(data) - end} байт неполной записи")
+
+        segment_file = open(segment.path, "r+b")
+        segment_file.truncate(end)
+        segment_file.seek(end)
+        index_file = open(segment.index_path, "wb")
+        index_file.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in zip(segment.times, segment.offsets)))
+        segment.size = end
+        self._writers[channel] = [segment_file, index_file, since_index, last_time]
+
+    # --- Поток записи ---
+
+    def _write_loop(self):
+        last_retention = 0.0
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = False
+            # Сегмент -> (новые точки индекса, конец последней записи)
+            published: Dict[_Segment, tuple] = {}
+            for item in batch:
+                if item is None:
+                    stopping = True
+                    continue
+                try:
+                    segment, entries, end = self._write(*item)
+                except OSError as e:
+                    self.logger.error(f"Ошибка записи журнала чата: {e}")
+                    continue
+                pending = published.get(segment, ([], end))[0]
+                pending.extend(entries)
+                published[segment] = (pending, end)
+
+            # Читатели видят записи и точки индекса только после сброса на диск.
+            for segment_file, index_file, *_ in self._writers.values():
+                segment_file.flush()
+                index_file.flush()
+            for segment, (entries, end) in published.items():
+                # Сначала размер, потом точки индекса: читатель, увидевший точку, видит и ее запись.
+                segment.size = end
+                for timestamp, offset in entries:
+                    segment.times.append(timestamp)
+                    segment.offsets.append(offset)
+
+            if stopping:
+                for segment_file, index_file, *_ in self._writers.values():
+                    segment_file.close()
+                    index_file.close()
+                self._writers.clear()
+                return
+            if self.retention and time.monotonic() - last_retention > 60:
+                last_retention = time.monotonic()
+                self._apply_retention()
+
+    def _write(self, channel: str, timestamp: float, body: bytes) -> Tuple[_Segment, list, int]:
+        writer = self._writers.get(channel)
+        # Время в журнале не убывает, иначе бинарный поиск по индексу невозможен.
+        if writer is not None:
+            timestamp = max(timestamp, writer[3])
+        if writer is None or writer[0].tell() + RECORD_HEADER.size + len(body) > self.segment_bytes:
+            segment = self._open_segment(channel, timestamp)
+            writer = self._writers[channel]
+        else:
+            segment = self._segments[channel][-1]
+
+        segment_file, index_file, since_index, _ = writer
+        offset = segment_file.tell()
+        entries = []
+        if offset == 0 or since_index >= self.index_interval:
+            index_file.write(INDEX_ENTRY.pack(timestamp, offset))
+            entries.append((timestamp, offset))
+            since_index = 0
+        segment_file.write(RECORD_HEADER.pack(len(body), timestamp) + body)
+        writer[2], writer[3] = since_index + 1, timestamp
+        self.written_bytes += RECORD_HEADER.size + len(body)
+        return segment, entries, segment_file.tell()
+
+    def _open_segment(self, channel: str, timestamp: float) -> _Segment:
+        writer = self._writers.pop(channel, None)
+        if writer is not None:
+            writer[0].close()
+            writer[1].close()
+        directory = self.root / channel
+        directory.mkdir(parents=True, exist_ok=True)
+        key = int(timestamp * 1e6)
+        segments = self._segments.get(channel)
+        if segments and key <= segments[-1].key:
+            # Сегмент заполнился записями с одним временем: имя должно быть новым.
+            key = segments[-1].key + 1
+        segment = _Segment(directory / f"{key:020d}.log")
+        self._writers[channel] = [open(segment.path, "ab"), open(segment.index_path, "ab"), 0, timestamp]
+        with self._lock:
+            self._segments.setdefault(channel, []).append(segment)
+            self._starts.setdefault(channel, []).append(segment.start)
+        return segment
+
+    def _apply_retention(self):
+        """Удаляет сегменты, все записи которых старше retention (текущий сегмент не трогается)."""
+        cutoff = time.time() - self.retention
+        removed = []
+        with self._lock:
+            for channel, segments in self._segments.items():
+                # Записи сегмента не новее начала следующего.
+                while len(segments) > 1 and segments[1].start < cutoff:
+                    segment = segments.pop(0)
+                    self._starts[channel].pop(0)
+                    segment.close()
+                    removed.append(segment)
+        for segment in removed:
+            segment.path.unlink(missing_ok=True)
+            segment.index_path.unlink(missing_ok=True)
+        if removed:
+            self.logger.info(f"Журнал чата: удалено {len(removed)} устаревших сегментов")
@@ -0,0 +1,238 @@
+import logging
+import math
+import queue
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from panda3d.core import CardMaker, NodePath
+
+ChunkKey = Tuple[int, int]
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз повторяется загрузка чанка после ошибки построения.
+MAX_LOAD_RETRIES = 3
+
+
+def geometry_bytes(node: NodePath) -> int:
+    """Размер вершинных и индексных данных всей геометрии под узлом."""
+    total = 0
+    for geom_np in node.findAllMatches("**/+GeomNode"):
+        geom_node = geom_np.node()
+        for i in range(geom_node.getNumGeoms()):
+            geom = geom_node.getGeom(i)
+            vdata = geom.getVertexData()
+            total += sum(vdata.getArray(j).getDataSizeBytes() for j in range(vdata.getNumArrays()))
+            for j in range(geom.getNumPrimitives()):
+                primitive = geom.getPrimitive(j)
+                if primitive.isIndexed():
+                    total += primitive.getDataSizeBytes()
+    return total
+
+
+class ChunkStreamer:
+    """
+    Потоковая загрузка мира по чанкам вокруг игрока.
+
+    Описание мира приходит от сервера в welcome:
+    {"chunk_size", "bounds": [[min_x, min_y], [max_x, max_y]],
+     "chunks": {"cx,cy": {"color": [...], "props": [{"model", "pos", "hpr", "scale"}]}}}.
+
+    Геометрия чанков строится в фоновом потоке, к сцене подключается в основном
+    потоке не более attach_per_frame чанков за кадр. Число и суммарный размер
+    загруженных чанков ограничены, лишние выгружаются начиная с самых дальних.
+    """
+
+    def __init__(self, base, descriptor: dict, parent: NodePath, load_radius: int = 2,
+                 max_resident: Optional[int] = None, max_resident_bytes: int = 64 * 1024 * 1024,
+                 attach_per_frame: int = 2, log: logging.Logger = logger):
+        self.base = base
+        self.logger = log
+        self.parent = parent
+        self.chunk_size = float(descriptor.get("chunk_size", 25.0))
+        (min_x, min_y), (max_x, max_y) = [bound[:2] for bound in descriptor["bounds"]]
+        self.min_key = (math.floor(min_x / self.chunk_size), math.floor(min_y / self.chunk_size))
+        self.max_key = (math.ceil(max_x / self.chunk_size) - 1, math.ceil(max_y / self.chunk_size) - 1)
+        self.overrides: Dict[ChunkKey, dict] = {
+            tuple(int(part) for part in key.split(",")): spec
+            for key, spec in descriptor.get("chunks", {}).items()
+        }
+        self.load_radius = load_radius
+        self.max_resident = max_resident or (2 * load_radius + 3) ** 2
+        self.max_resident_bytes = max_resident_bytes
+        self.attach_per_frame = attach_per_frame
+
+        # key -> {"node", "bytes", "load_ms"}
+        self.resident: Dict[ChunkKey, dict] = {}
+        self.resident_bytes = 0
+        self._center: Optional[ChunkKey] = None
+        self._wanted: Set[ChunkKey] = set()
+        self._pending: Set[ChunkKey] = set()
+        # Число неудачных загрузок по чанкам; после MAX_LOAD_RETRIES чанк больше не запрашивается.
+        self._failures: Dict[ChunkKey, int] = {}
+
+        self.loaded_total = 0
+        self.unloaded_total = 0
+        self.total_load_ms = 0.0
+
+        self._requests: "queue.Queue[Optional[ChunkKey]]" = queue.Queue()
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = threading.Thread(target=self._loader_loop, name="nine-chunk-loader", daemon=True)
+        self._thread.start()
+
+    # --- Основной поток ---
+
+    def chunk_of(self, pos) -> ChunkKey:
+        return math.floor(pos[0] / self.chunk_size), math.floor(pos[1] / self.chunk_size)
+
+    def update(self, pos):
+        """Вызывается каждый кадр с позицией игрока."""
+        center = self.chunk_of(pos)
+        if center != self._center:
+            self._center = center
+            self._refresh_wanted()
+        self._attach_ready()
+        self._enforce_budget()
+
+    def _refresh_wanted(self):
+        cx, cy = self._center
+        radius = self.load_radius
+        wanted = [
+            (x, y)
+            for x in range(max(cx - radius, self.min_key[0]), min(cx + radius, self.max_key[0]) + 1)
+            for y in range(max(cy - radius, self.min_key[1]), min(cy + radius, self.max_key[1]) + 1)
+        ]
+        wanted.sort(key=self._distance)
+        self._wanted = set(wanted)
+        for key in [key for key in self._failures if key not in self._wanted]:
+            del self._failures[key]
+
+        for key in wanted:
+            if key not in self.resident and key not in self._pending \
+                    and self._failures.get(key, 0) <= MAX_LOAD_RETRIES:
+                self._request(key)
+
+        # Гистерезис: чанк выгружается, только когда игрок отошел на радиус + 1.
+        for key in list(self.resident):
+            if self._distance(key) > radius + 1:
+                self._unload(key)
+
+    def _request(self, key: ChunkKey):
+        self._pending.add(key)
+        self._requests.put(key)
+
+    def _distance(self, key: ChunkKey) -> int:
+        return max(abs(key[0] - self._center[0]), abs(key[1] - self._center[1]))
+
+    def _attach_ready(self):
+        for _ in range(self.attach_per_frame):
+            try:
+                key, node, size, load_ms, failed = self._results.get_nowait()
+            except queue.Empty:
+                return
+            self._pending.discard(key)
+            if node is None:
+                # Поток пропустил чанк (игрок ушел) или не смог его построить. Если
+                # игрок уже вернулся, чанк запрашивается снова: _refresh_wanted его
+                # пропустил, пока он был в _pending.
+                if failed:
+                    self._failures[key] = self._failures.get(key, 0) + 1
+                    if self._failures[key] > MAX_LOAD_RETRIES:
+                        self.logger.error(f"Чанк {key} не загружен после {MAX_LOAD_RETRIES} повторов")
+                        continue
+                if key in self._wanted and key not in self.resident:
+                    self._request(key)
+                continue
+            self._failures.pop(key, None)
+            if key not in self._wanted or key in self.resident:
+                node.removeNode()
+                continue
+            node.reparentTo(self.parent)
+            self.resident[key] = {"node": node, "bytes": size, "load_ms": load_ms}
+            self.resident_bytes += size
+            self.loaded_total += 1
+            self.total_load_ms += load_ms
+            self.logger.info(f"Чанк {key} загружен за {load_ms:.1f} мс, {size / 1024:.1f} КБ")
+
+    def _enforce_budget(self):
+        if len(self.resident) <= self.max_resident and self.resident_bytes <= self.max_resident_bytes:
+            return
+        for key in sorted(self.resident, key=self._distance, reverse=True):
+            if key == self._center:
+                break
+            self._unload(key)
+            if len(self.resident) <= self.max_resident and self.resident_bytes <= self.max_resident_bytes:
+                break
+
+    def _unload(self, key: ChunkKey):
+        chunk = self.resident.pop(key)
+        chunk["node"].removeNode()
+        self.resident_bytes -= chunk["bytes"]
+        self.unloaded_total += 1
+
+    def stats(self) -> dict:
+        return {
+            "resident": len(self.resident),
+            "resident_bytes": self.resident_bytes,
+            "pending": len(self._pending),
+            "loaded_total": self.loaded_total,
+            "unloaded_total": self.unloaded_total,
+            "avg_load_ms": self.total_load_ms / self.loaded_total if self.loaded_total else 0.0,
+            "chunks": {key: {"load_ms": chunk["load_ms"], "bytes": chunk["bytes"]}
+                       for key, chunk in self.resident.items()},
+        }
+
+    def destroy(self):
+        self._requests.put(None)
+        self._thread.join(timeout=1.0)
+        for key in list(self.resident):
+            self._unload(key)
+
+    # --- Фоновый поток ---
+
+    def _loader_loop(self):
+        while True:
+            key = self._requests.get()
+            if key is None:
+                return
+            if key not in self._wanted:
+                # Игрок ушел раньше, чем очередь дошла до чанка.
+                self._results.put((key, None, 0, 0.0, False))
+                continue
+            started = time.perf_counter()
+            try:
+                node = self._build(key)
+                size = geometry_bytes(node)
+            except Exception as e:
+                self.logger.error(f"Ошибка загрузки чанка {key}: {e}")
+                self._results.put((key, None, 0, 0.0, True))
+                continue
+            self._results.put((key, node, size, (time.perf_counter() - started) * 1000, False))
+
+    def _build(self, key: ChunkKey) -> NodePath:
+        spec = self.overrides.get(key, {})
+        x0, y0 = key[0] * self.chunk_size, key[1] * self.chunk_size
+        root = NodePath(f"chunk-{key[0]}-{key[1]}")
+
+        cm = CardMaker(f"ground-{key[0]}-{key[1]}")
+        cm.setFrame(x0, x0 + self.chunk_size, y0, y0 + self.chunk_size)
+        shade = 0.85 if (key[0] + key[1]) % 2 else 1.0
+        cm.setColor(*spec.get("color", (shade, shade, shade, 1)))
+        ground = root.attachNewNode(cm.generate())
+        # Карточка строится в плоскости XZ, поворот кладет ее на землю.
+        ground.setP(-90)
+        ground.setPos(0, 0, -1)
+
+        for prop in spec.get("props", []):
+            model = self.base.loader.loadModel(prop["model"], okMissing=True)
+            if model is None:
+                self.logger.warning(f"Модель {prop['model']} для чанка {key} не найдена")
+                continue
+            model.reparentTo(root)
+            model.setPos(*prop.get("pos", (x0, y0, 0)))
+            model.setHpr(*prop.get("hpr", (0, 0, 0)))
+            model.setScale(prop.get("scale", 1.0))
+
+        root.flattenStrong()
+        return root
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import ssl
+import struct
+import threading
+from typing import Optional
+
+from .decoder import NetworkDecoder
+
+logger = logging.getLogger(__name__)
+
+# Типы сообщений, которые можно потерять: следующий кадр пришлет новые.
+DROPPABLE_TYPES = frozenset({"input"})
+
+
+class ClientNetwork:
+    """
+    Сетевое соединение клиента в отдельном потоке со своим циклом asyncio.
+
+    Основной поток (Panda3D) только отправляет сообщения (send) и забирает
+    входящие из NetworkDecoder, поэтому чтение и отправка пакетов не ждут
+    очередного кадра: задержка сети не зависит от FPS, а долгий кадр не
+    задерживает пакеты. Все методы, кроме корутин, можно вызывать из любого потока.
+
+    Если сервер не успевает читать и в буфере отправки больше max_buffer_bytes,
+    сообщения DROPPABLE_TYPES (ввод 15+ раз в секунду) отбрасываются, а не
+    копятся без ограничения; сервер исправит позицию через ack.
+    """
+
+    def __init__(self, decoder: NetworkDecoder, cert_path: str = "certs/cert.pem",
+                 max_buffer_bytes: int = 256 * 1024, log: logging.Logger = logger):
+        self.decoder = decoder
+        self.cert_path = cert_path
+        self.max_buffer_bytes = max_buffer_bytes
+        self.logger = log
+        self.connected = False
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self._dropping = False
+
+        self.loop = asyncio.new_event_loop()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._session: Optional[asyncio.Task] = None
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="nine-network", daemon=True)
+        self._thread.start()
+
+    # --- Любой поток ---
+
+    def connect(self, host: str, port: int, hello: dict):
+        """Подключается к серверу и первым сообщением отправляет hello (аутентификацию)."""
+        self.loop.call_soon_threadsafe(self._start_session, host, port, hello)
+
+    def send(self, data: dict):
+        """JSON кодируется в вызывающем потоке, запись в сокет - в сетевом."""
+        self.loop.call_soon_threadsafe(self._write, self._frame(data), data.get("type") in DROPPABLE_TYPES)
+
+    def disconnect(self):
+        self.loop.call_soon_threadsafe(self._close)
+
+    def stop(self):
+        """Закрывает соединение и останавливает сетевой поток."""
+        if not self._thread.is_alive():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        try:
+            future.result(timeout=1.0)
+        except Exception as e:
+            self.logger.warning(f"Сетевой поток не остановился штатно: {e}")
+        self._thread.join(timeout=1.0)
+
+    def stats(self) -> dict:
+        return {"connected": self.connected, "sent": self.sent, "received": self.received, "dropped": self.dropped}
+
+    # --- Сетевой поток ---
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    @staticmethod
+    def _frame(data: dict) -> bytes:
+        payload = json.dumps(data).encode("utf-8")
+        return struct.pack("!I", len(payload)) + payload
+
+    def _start_session(self, host: str, port: int, hello: dict):
+        if self._session is not None and not self._session.done():
+            self.logger.warning("Соединение с сервером уже установлено.")
+            return
+        self._session = self.loop.create_task(self._connect_and_read(host, port, hello))
+
+    def _write(self, frame: bytes, droppable: bool = False):
+        if self._writer is None or self._writer.is_closing():
+            return
+        if droppable and self._writer.transport.get_write_buffer_size() > self.max_buffer_bytes:
+            if not self._dropping:
+                self._dropping = True
+                self.logger.warning("Сервер не успевает принимать данные, ввод отбрасывается.")
+            self.dropped += 1
+            return
+        self._dropping = False
+        self._writer.write(frame)
+        self.sent += 1
+
+    def _close(self):
+        if self._writer is not None:
+            self._closing = True
+            self._writer.close()
+
+    async def _shutdown(self):
+        if self._session is not None and not self._session.done():
+            self._closing = True
+            self._session.cancel()
+            try:
+                await self._session
+            except asyncio.CancelledError:
+                pass
+        self.loop.call_soon(self.loop.stop)
+
+    async def _connect_and_read(self, host: str, port: int, hello: dict):
+        ssl_context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+        try:
+            ssl_context.load_verify_locations(self.cert_path)
+        except FileNotFoundError:
+            self.logger.critical(f"КРИТИЧЕСКАЯ ОШИБКА: Файл сертификата '{self.cert_path}' не найден.")
+            self.decoder.end_session()
+            return
+
+        self._closing = False
+        try:
+            reader, self._writer = await asyncio.open_connection(
+                host, port, ssl=ssl_context, server_hostname=host if host != "localhost" else None
+            )
+            self.connected = True
+            self.logger.info("Успешно установлено TLS-соединение с сервером.")
+            self._write(self._frame(hello))
+            while True:
+                header = await reader.readexactly(4)
+                payload = await reader.readexactly(struct.unpack("!I", header)[0])
+                self.received += 1
+                self.decoder.feed(payload)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            if not self._closing:
+                self.logger.warning("Потеряно соединение с сервером.")
+        except Exception as e:
+            self.logger.error(f"Ошибка подключения: {e}")
+        finally:
+            self.connected = False
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self.decoder.end_session()
@@ -0,0 +1,136 @@
+from typing import Dict, Iterable
+
+import numpy as np
+
+# --- Схемы компонентов ---
+# Каждая схема - структурный dtype NumPy. Поля хранятся отдельными
+# колонками (structure of arrays), чтобы системы работали с целыми колонками.
+
+TRANSFORM = np.dtype([("pos", np.float64, (3,)), ("rot", np.float64, (3,))])
+ANIMATION = np.dtype([("state", np.uint8), ("last_move_time", np.float64)])
+PLAYER = np.dtype([("client_id", np.int64)])
+
+ANIM_STATES = ("idle", "walk")
+ANIM_IDLE = ANIM_STATES.index("idle")
+ANIM_WALK = ANIM_STATES.index("walk")
+
+
+def anim_state_code(name: str) -> int:
+    """Код анимации по имени (неизвестные имена считаются idle)."""
+    try:
+        return ANIM_STATES.index(name)
+    except ValueError:
+        return ANIM_IDLE
+
+
+class ComponentStorage:
+    """
+    Хранилище одного типа компонента.
+    Принадлежность сущностей - разреженное множество (sparse set):
+    sparse[entity] -> индекс в плотных массивах, dense[index] -> entity.
+    Значения лежат в плотных колонках без пропусков.
+    """
+
+    def __init__(self, name: str, dtype: np.dtype, capacity: int = 64):
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.size = 0
+        self.dense = np.empty(capacity, dtype=np.int64)
+        self.sparse = np.full(capacity, -1, dtype=np.int64)
+        self._columns: Dict[str, np.ndarray] = {
+            field: np.zeros((capacity,) + sub_dtype.shape, dtype=sub_dtype.base)
+            for field, (sub_dtype, _) in self.dtype.fields.items()
+        }
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, entity: int) -> bool:
+        return entity < len(self.sparse) and self.sparse[entity] >= 0
+
+    @property
+    def entities(self) -> np.ndarray:
+        """Сущности с этим компонентом (в порядке плотных массивов)."""
+        return self.dense[:self.size]
+
+    def column(self, field: str) -> np.ndarray:
+        """Представление колонки без копирования, только занятая часть."""
+        return self._columns[field][:self.size]
+
+    def index(self, entity: int) -> int:
+        """Плотный индекс сущности или -1."""
+        return int(self.sparse[entity]) if entity < len(self.sparse) else -1
+
+    def indices(self, entities: np.ndarray) -> np.ndarray:
+        """Плотные индексы для массива сущностей (-1, если компонента нет)."""
+        entities = np.asarray(entities, dtype=np.int64)
+        result = np.full(len(entities), -1, dtype=np.int64)
+        in_range = entities < len(self.sparse)
+        result[in_range] = self.sparse[entities[in_range]]
+        return result
+
+    def add(self, entity: int, **values):
+        if entity in self:
+            self.set(entity, **values)
+            return
+        self._reserve_entity(entity)
+        if self.size == len(self.dense):
+            self._grow_dense(self.size * 2)
+
+        index = self.size
+        self.size += 1
+        self.dense[index] = entity
+        self.sparse[entity] = index
+        for column in self._columns.values():
+            column[index] = 0
+        self.set(entity, **values)
+
+    def set(self, entity: int, **values):
+        index = self.sparse[entity]
+        for field, value in values.items():
+            self._columns[field][index] = value
+
+    def get(self, entity: int) -> dict:
+        """Значения компонента сущности в виде словаря Python."""
+        index = self.sparse[entity]
+        return {field: column[index].tolist() for field, column in self._columns.items()}
+
+    def remove(self, entity: int):
+        """Удаляет компонент, перенося последний элемент на освободившееся место."""
+        if entity not in self:
+            return
+        index = self.sparse[entity]
+        last = self.size - 1
+        if index != last:
+            moved = self.dense[last]
+            self.dense[index] = moved
+            self.sparse[moved] = index
+            for column in self._columns.values():
+                column[index] = column[last]
+        self.sparse[entity] = -1
+        self.size -= 1
+
+    def _reserve_entity(self, entity: int):
+        if entity >= len(self.sparse):
+            new_size = max(entity + 1, len(self.sparse) * 2)
+            sparse = np.full(new_size, -1, dtype=np.int64)
+            sparse[:len(self.sparse)] = self.sparse
+            self.sparse = sparse
+
+    def _grow_dense(self, capacity: int):
+        dense = np.empty(capacity, dtype=np.int64)
+        dense[:self.size] = self.dense[:self.size]
+        self.dense = dense
+        for field, column in self._columns.items():
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[field] = grown
+
+
+def intersect(storages: Iterable[ComponentStorage]) -> np.ndarray:
+    """Сущности, у которых есть все перечисленные компоненты."""
+    storages = sorted(storages, key=len)
+    entities = storages[0].entities
+    for storage in storages[1:]:
+        entities = entities[storage.indices(entities) >= 0]
+    return entities
@@ -0,0 +1,263 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from .archive import collect_files
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 32 * 1024
+SHA1_PATTERN = re.compile(r"[0-9a-f]{40}")
+
+
+def file_sha1(path: Path) -> Tuple[str, int]:
+    digest = hashlib.sha1()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+def plugin_asset_files(plugins) -> Iterable[Tuple[str, Path]]:
+    """Ресурсы плагинов-папок (всё, кроме кода)."""
+    roots = sorted({plugin.plugin_path for plugin in plugins if plugin.plugin_path.is_dir()})
+    return collect_files(roots)
+
+
+class AssetManifest:
+    """
+    Манифест ресурсов по содержимому: логический путь -> sha1 и размер.
+    Отправляется клиентам в welcome (to_dict()).
+    """
+
+    def __init__(self, files: Iterable[Tuple[str, Path]]):
+        self.files: Dict[str, dict] = {}
+        self._blobs: Dict[str, Path] = {}
+        for name, path in files:
+            sha1, size = file_sha1(path)
+            self.files[name] = {"sha1": sha1, "size": size}
+            self._blobs.setdefault(sha1, path)
+        summary = "".join(f"{name}:{entry['sha1']}" for name, entry in sorted(self.files.items()))
+        self.hash = hashlib.sha1(summary.encode("utf-8")).hexdigest()
+
+    def blob_path(self, sha1: str) -> Optional[Path]:
+        return self._blobs.get(sha1)
+
+    def to_dict(self) -> dict:
+        return {"hash": self.hash, "files": self.files}
+
+
+class AssetDistributor:
+    """
+    Сервер: отдает клиентам блобы по sha1 (сообщение asset_request) кусками
+    asset_chunk. Передача каждому клиенту идет отдельной задачей с ограничением
+    скорости, небольшими кусками между пакетами world_state, поэтому не
+    задерживает игровой трафик того же соединения.
+    """
+
+    def __init__(self, network, manifest: AssetManifest, chunk_size: int = CHUNK_SIZE,
+                 bytes_per_second: int = 512 * 1024, log: logging.Logger = logger):
+        self.network = network
+        self.manifest = manifest
+        self.chunk_size = chunk_size
+        self.bytes_per_second = bytes_per_second
+        self.logger = log
+
+        self._queues: Dict[int, Deque[str]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self.bytes_sent = 0
+        self.blobs_sent = 0
+
+    def request(self, client_id: int, hashes: list):
+        """Ставит в очередь клиента запрошенные блобы (неизвестные sha1 пропускаются)."""
+        known = [sha1 for sha1 in dict.fromkeys(hashes) if self.manifest.blob_path(sha1) is not None]
+        if len(known) != len(hashes):
+            self.logger.warning(f"Клиент {client_id} запросил {len(hashes) - len(known)} неизвестных блобов")
+        if not known:
+            return
+        self._queues.setdefault(client_id, deque()).extend(known)
+        task = self._tasks.get(client_id)
+        if task is None or task.done():
+            self._tasks[client_id] = asyncio.get_running_loop().create_task(self._stream(client_id))
+
+    def cancel(self, client_id: int):
+        self._queues.pop(client_id, None)
+        task = self._tasks.pop(client_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _stream(self, client_id: int):
+        queue = self._queues[client_id]
+        while queue and client_id in self.network.clients:
+            sha1 = queue.popleft()
+            path = self.manifest.blob_path(sha1)
+            size = path.stat().st_size
+            offset = 0
+            with open(path, "rb") as f:
+                while True:
+                    data = await asyncio.to_thread(f.read, self.chunk_size)
+                    await self.network.send_message(client_id, {
+                        "type": "asset_chunk",
+                        "sha1": sha1,
+                        "offset": offset,
+                        "size": size,
+                        "data": base64.b64encode(data).decode("ascii"),
+                    })
+                    offset += len(data)
+                    self.bytes_sent += len(data)
+                    await asyncio.sleep(len(data) / self.bytes_per_second)
+                    if offset >= size:
+                        break
+            self.blobs_sent += 1
+        self._queues.pop(client_id, None)
+        self._tasks.pop(client_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self.manifest.files),
+            "active_transfers": len(self._tasks),
+            "blobs_sent": self.blobs_sent,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+class BlobStore:
+    """Локальный кэш блобов по содержимому: <root>/<sha1[:2]>/<sha1><расширение>."""
+
+    def __init__(self, root: str = ".cache/blobs"):
+        self.root = Path(root)
+
+    def path(self, sha1: str, suffix: str = "") -> Path:
+        """
+        Путь блоба. sha1 и расширение приходят из манифеста сервера, поэтому
+        все, что может вывести путь за пределы root, отклоняется (ValueError).
+        """
+        if not isinstance(sha1, str) or not SHA1_PATTERN.fullmatch(sha1):
+            raise ValueError(f"Некорректный sha1 блоба: {sha1!r}")
+        if "/" in suffix or "\\" in suffix or ".." in suffix or "\0" in suffix:
+            raise ValueError(f"Некорректное расширение блоба: {suffix!r}")
+        path = self.root / sha1[:2] / f"{sha1}{suffix}"
+        if not path.resolve().is_relative_to(self.root.resolve()):
+            raise ValueError(f"Путь блоба вне кэша: {path}")
+        return path
+
+    def has(self, sha1: str, suffix: str = "") -> bool:
+        return self.path(sha1, suffix).is_file()
+
+
+class AssetDownloader:
+    """
+    Клиент: сверяет манифест сервера с BlobStore, запрашивает только
+    отсутствующие блобы и собирает их из asset_chunk. Готовые файлы
+    подключаются к AssetLibrary по логическим путям манифеста.
+
+    on_chunk вызывается в потоке NetworkDecoder, поэтому запись файлов и
+    проверка sha1 не занимают основной поток.
+    """
+
+    def __init__(self, store: BlobStore, library, send: Callable[[dict], None], log: logging.Logger = logger):
+        self.store = store
+        self.library = library
+        self.send = send
+        self.logger = log
+
+        # sha1 -> (расширение, логические пути)
+        self._wanted: Dict[str, Tuple[str, list]] = {}
+        self._partial: Dict[str, object] = {}
+        self._started = 0.0
+        self.bytes_received = 0
+        self.blobs_received = 0
+
+    def sync(self, manifest: dict):
+        """Манифест из welcome: подключает имеющиеся файлы и запрашивает недостающие."""
+        self.reset()
+        by_blob: Dict[str, Tuple[str, list]] = {}
+        for name, entry in manifest.get("files", {}).items():
+            suffix = "".join(Path(name).suffixes)
+            try:
+                self.store.path(entry["sha1"], suffix)
+            except (KeyError, TypeError, ValueError) as e:
+                self.logger.warning(f"Файл манифеста '{name}' пропущен: {e}")
+                continue
+            by_blob.setdefault(entry["sha1"], (suffix, []))[1].append(name)
+
+        present = {}
+        for sha1, (suffix, names) in by_blob.items():
+            if self.store.has(sha1, suffix):
+                present.update((name, self.store.path(sha1, suffix).as_posix()) for name in names)
+            else:
+                self._wanted[sha1] = (suffix, names)
+        self.library.add_files(present)
+
+        if not self._wanted:
+            self.logger.info(f"Ресурсы сервера актуальны ({len(present)} файлов), загрузка не нужна")
+            return
+        missing_bytes = sum(
+            manifest["files"][names[0]]["size"] for _, names in self._wanted.values()
+        )
+        self.logger.info(f"Загрузка ресурсов сервера: {len(self._wanted)} блобов, {missing_bytes / 1024:.1f} КБ")
+        self._started = time.perf_counter()
+        self.send({"type": "asset_request", "hashes": list(self._wanted)})
+
+    @property
+    def pending(self) -> int:
+        return len(self._wanted)
+
+    def on_chunk(self, data: dict) -> Optional[dict]:
+        """
+        Кусок блоба. Когда все блобы получены, возвращает сообщение
+        assets_synced для основного потока.
+        """
+        sha1 = data["sha1"]
+        if sha1 not in self._wanted:
+            return None
+        suffix, names = self._wanted[sha1]
+        target = self.store.path(sha1, suffix)
+        partial = target.with_name(target.name + ".part")
+
+        f = self._partial.get(sha1)
+        if f is None:
+            if data["offset"] != 0:
+                return None
+            target.parent.mkdir(parents=True, exist_ok=True)
+            f = self._partial[sha1] = open(partial, "wb")
+        chunk = base64.b64decode(data["data"])
+        f.write(chunk)
+        self.bytes_received += len(chunk)
+        if data["offset"] + len(chunk) < data["size"]:
+            return None
+
+        f.close()
+        del self._partial[sha1]
+        del self._wanted[sha1]
+        if file_sha1(partial)[0] != sha1:
+            self.logger.error(f"Блоб {sha1} поврежден при передаче")
+            partial.unlink(missing_ok=True)
+        else:
+            os.replace(partial, target)
+            self.library.add_files({name: target.as_posix() for name in names})
+            self.blobs_received += 1
+
+        if self._wanted:
+            return None
+        elapsed = time.perf_counter() - self._started
+        self.logger.info(f"Ресурсы сервера загружены: {self.bytes_received / 1024:.1f} КБ за {elapsed:.2f} с")
+        return {"type": "assets_synced", "blobs": self.blobs_received, "bytes": self.bytes_received}
+
+    def reset(self):
+        for f in self._partial.values():
+            f.close()
+        self._partial.clear()
+        self._wanted.clear()
+
+    def stats(self) -> dict:
+        return {"pending": self.pending, "blobs_received": self.blobs_received, "bytes_received": self.bytes_received}
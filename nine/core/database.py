@@ -2,17 +2,38 @@ import sqlite3
 import json
 import hashlib
 import os
+import functools
+import time
 from pathlib import Path
 from typing import Union, Any, List, Dict, Optional, Tuple
 
+from .metrics import MetricsRegistry
+
+
+def _timed(operation: str):
+    """Записывает длительность вызова метода в гистограмму nine_db_seconds{op}."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._db_seconds.labels(operation).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
 class DatabaseManager:
     """
     Управляет подключением и взаимодействием с базой данных SQLite.
     Использует реляционную схему, уникальные имена и безопасное хранение паролей.
     """
-    def __init__(self, db_path: Union[str, Path] = "nine.db"):
+    def __init__(self, db_path: Union[str, Path] = "nine.db", metrics: Optional[MetricsRegistry] = None):
         self.db_path = db_path
         self.conn = None
+        self._db_seconds = (metrics or MetricsRegistry()).histogram(
+            "nine_db_seconds", "Длительность операций с базой данных", ("op",))
         try:
             self.conn = sqlite3.connect(self.db_path)
             self.conn.row_factory = sqlite3.Row
@@ -101,6 +122,7 @@ class DatabaseManager:
 
     # --- Методы для аутентификации (по имени) ---
 
+    @_timed("get_player")
     def get_player_by_name(self, name: str) -> Optional[sqlite3.Row]:
         """Получает запись игрока по его имени."""
         if not self.conn: return None
@@ -108,6 +130,7 @@ class DatabaseManager:
         cursor.execute("SELECT * FROM players WHERE name=?", (name,))
         return cursor.fetchone()
 
+    @_timed("create_player")
     def create_player(self, player_uuid: str, name: str, password: str) -> bool:
         """Создает новую запись игрока. Возвращает True в случае успеха."""
         if not self.conn: return False
@@ -128,6 +151,7 @@ class DatabaseManager:
             print(f"Ошибка при создании игрока '{name}': {e}")
             return False
             
+    @_timed("verify_password")
     def verify_player_password_by_name(self, name: str, password: str) -> bool:
         """Проверяет пароль для игрока по его имени."""
         player_data = self.get_player_by_name(name)
@@ -139,6 +163,7 @@ class DatabaseManager:
         new_hash = self._hash_password(password, salt)
         return new_hash == stored_hash
 
+    @_timed("update_uuid")
     def update_player_uuid(self, name: str, new_uuid: str):
         """Обновляет UUID для игрока, найденного по имени.
         Может быть полезно, если пользователь заходит с новой машины.
@@ -153,6 +178,7 @@ class DatabaseManager:
 
     # --- Методы для работы с атрибутами ---
 
+    @_timed("get_attributes")
     def get_player_all_attributes(self, player_uuid: str) -> dict:
         """Получает все атрибуты игрока по UUID."""
         if not self.conn: return {}
@@ -173,6 +199,7 @@ class DatabaseManager:
             print(f"Ошибка при загрузке всех атрибутов для '{player_uuid}': {e}")
             return {}
 
+    @_timed("set_attribute")
     def set_player_attribute(self, player_uuid: str, attribute: str, value: Any):
         """Устанавливает значение атрибута для игрока по UUID."""
         if not self.conn: return
@@ -0,0 +1,216 @@
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Сообщение, которое декодер выдает после последнего пакета закрытого соединения.
+DISCONNECTED = "disconnected"
+
+
+class PlayerUpdate(NamedTuple):
+    """
+    Изменения одного удаленного игрока в world_state. None в pos/rot/anim_state
+    означает, что поле не изменилось с прошлого пакета.
+    hold - (время сервера, pos, rot) последнего положения перед началом
+    движения, чтобы интерполяция не растягивала шаг на все время стоянки.
+    """
+    id: int
+    pos: Optional[list]
+    rot: Optional[list]
+    anim_state: Optional[str]
+    hold: Optional[tuple]
+
+
+class _PlayerState:
+    __slots__ = ("pos", "rot", "anim_state", "moving")
+
+    def __init__(self, pos, rot, anim_state: str):
+        self.pos = pos
+        self.rot = rot
+        self.anim_state = anim_state
+        self.moving = False
+
+
+class NetworkDecoder:
+    """
+    Разбор входящих сообщений сервера в фоновом потоке.
+
+    Сетевой код отдает сюда сырые пакеты (feed), декодер разбирает JSON,
+    а world_state превращает в список изменившихся игроков (PlayerUpdate)
+    с целыми id. Готовые сообщения складываются в deque (append/popleft
+    потокобезопасны без блокировок), основной поток разбирает ее в drain
+    с ограничением времени на кадр. Порядок сообщений сохраняется.
+
+    side_handlers - обработчики типов сообщений, которые выполняются прямо
+    в потоке декодера и не попадают в очередь основного потока (например,
+    куски ресурсов). Если обработчик вернул сообщение, оно ставится в очередь.
+    """
+
+    def __init__(self, log: logging.Logger = logger):
+        self.logger = log
+        self.ready: Deque[dict] = deque()
+        self.side_handlers: Dict[str, Callable[[dict], Optional[dict]]] = {}
+        self._payloads: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+
+        # Состояние, относительно которого считаются изменения (только поток декодера).
+        self._players: Dict[int, _PlayerState] = {}
+        self._own_id: Optional[int] = None
+        self._last_time: Optional[float] = None
+
+        self.decoded = 0
+        self.decode_time = 0.0
+        self.players_seen = 0
+        self.players_changed = 0
+        self.deferred_frames = 0
+
+        self._thread = threading.Thread(target=self._decode_loop, name="nine-net-decoder", daemon=True)
+        self._thread.start()
+
+    # --- Сетевой поток ---
+
+    def feed(self, payload: bytes):
+        """Пакет от сервера; время получения нужно для оценки смещения часов."""
+        self._payloads.put((payload, time.monotonic()))
+
+    def end_session(self):
+        """Соединение закрыто: после уже принятых пакетов придет DISCONNECTED."""
+        self._payloads.put((None, time.monotonic()))
+
+    def stop(self):
+        self._payloads.put(None)
+        self._thread.join(timeout=1.0)
+
+    # --- Основной поток ---
+
+    def drain(self, handle: Callable[[dict], None], budget_ms: float) -> int:
+        """
+        Передает готовые сообщения в handle, пока не истечет budget_ms.
+        Хотя бы одно сообщение обрабатывается всегда, остальные ждут следующего кадра.
+        """
+        deadline = time.perf_counter() + budget_ms / 1000
+        handled = 0
+        while self.ready:
+            handle(self.ready.popleft())
+            handled += 1
+            if time.perf_counter() >= deadline:
+                break
+        if self.ready:
+            self.deferred_frames += 1
+        return handled
+
+    def stats(self) -> dict:
+        return {
+            "decoded": self.decoded,
+            "avg_decode_ms": self.decode_time / self.decoded * 1000 if self.decoded else 0.0,
+            "players_seen": self.players_seen,
+            "players_changed": self.players_changed,
+            "pending": len(self.ready),
+            "deferred_frames": self.deferred_frames,
+        }
+
+    # --- Поток декодера ---
+
+    def _decode_loop(self):
+        while True:
+            item = self._payloads.get()
+            if item is None:
+                return
+            payload, received_at = item
+            if payload is None:
+                self._reset()
+                self.ready.append({"type": DISCONNECTED})
+                continue
+            started = time.perf_counter()
+            try:
+                data = self.decode(payload, received_at)
+                handler = self.side_handlers.get(data.get("type"))
+                if handler is not None:
+                    data = handler(data)
+            except Exception as e:
+                self.logger.error(f"Ошибка разбора сообщения сервера: {e}")
+                continue
+            self.decode_time += time.perf_counter() - started
+            self.decoded += 1
+            if data is not None:
+                self.ready.append(data)
+
+    def _reset(self):
+        self._players.clear()
+        self._own_id = None
+        self._last_time = None
+
+    def decode(self, payload: bytes, received_at: float) -> dict:
+        data = json.loads(payload.decode("utf-8"))
+        msg_type = data.get("type")
+
+        if msg_type == "world_state":
+            return self._diff_world_state(data, received_at)
+        if msg_type == "welcome":
+            self._reset()
+            self._own_id = data["id"]
+            for p_id_str, p_info in data.get("players", {}).items():
+                self._remember(int(p_id_str), p_info)
+        elif msg_type == "player_joined":
+            self._remember(data["id"], data["player_info"])
+        elif msg_type == "player_left":
+            self._players.pop(data["id"], None)
+        return data
+
+    def _remember(self, p_id: int, p_info: dict):
+        if p_id != self._own_id:
+            self._players[p_id] = _PlayerState(p_info["pos"], p_info.get("rot"), p_info.get("anim_state", "idle"))
+
+    def _diff_world_state(self, data: dict, received_at: float) -> dict:
+        server_time = data.get("t")
+        previous_time = self._last_time
+        self._last_time = server_time
+
+        changed = []
+        players = data.get("players", {})
+        self.players_seen += len(players)
+        for p_id_str, p_info in players.items():
+            p_id = int(p_id_str)
+            if p_id == self._own_id:
+                continue
+            pos, rot = p_info["pos"], p_info["rot"]
+            anim_state = p_info.get("anim_state", "idle")
+
+            state = self._players.get(p_id)
+            if state is None:
+                state = self._players[p_id] = _PlayerState(pos, rot, anim_state)
+                changed.append(PlayerUpdate(p_id, pos, rot, anim_state, None))
+                continue
+
+            hold = None
+            if pos != state.pos or rot != state.rot:
+                if not state.moving and previous_time is not None and server_time is not None:
+                    hold = (previous_time, state.pos, state.rot)
+                state.pos, state.rot, state.moving = pos, rot, True
+            elif state.moving:
+                # Игрок остановился: повторный снимок закрепляет его на месте,
+                # иначе клиент продолжит экстраполировать движение.
+                state.moving = False
+            else:
+                pos = rot = None
+
+            if anim_state != state.anim_state:
+                state.anim_state = anim_state
+            else:
+                anim_state = None
+
+            if pos is not None or anim_state is not None:
+                changed.append(PlayerUpdate(p_id, pos, rot, anim_state, hold))
+
+        self.players_changed += len(changed)
+        return {
+            "type": "world_state",
+            "t": server_time,
+            "received_at": received_at,
+            "ack": data.get("ack"),
+            "changed": changed,
+        }
@@ -1,3 +1,4 @@
+import time
 from collections import defaultdict
 from typing import Callable, Any, Dict, List
 
@@ -6,6 +7,9 @@ class EventManager:
 
     def __init__(self):
         self._listeners: Dict[str, List[Callable]] = defaultdict(list)
+        # Гистограмма времени обработчиков (MetricsRegistry) с метками event и handler; None - без замеров.
+        self.handler_time = None
+        self._handler_metrics: Dict[tuple, Any] = {}
 
     def subscribe(self, event_type: str, listener: Callable):
         """Подписывает слушателя на тип события."""
@@ -16,12 +20,36 @@ class EventManager:
         """Отписывает слушателя от типа события."""
         if listener in self._listeners[event_type]:
             self._listeners[event_type].remove(listener)
+        self._handler_metrics.pop((event_type, listener), None)
 
     def post(self, event_type: str, data: Any = None):
         """Отправляет событие всем подписанным слушателям."""
+        if self.handler_time is not None:
+            self._post_timed(event_type, data)
+            return
         for listener in self._listeners[event_type]:
             try:
                 listener(data)
             except Exception as e:
                 print(f"Ошибка в обработчике события '{event_type}': {e}")
 
+    def _post_timed(self, event_type: str, data: Any):
+        for listener in self._listeners[event_type]:
+            started = time.perf_counter()
+            try:
+                listener(data)
+            except Exception as e:
+                print(f"Ошибка в обработчике события '{event_type}': {e}")
+            key = (event_type, listener)
+            histogram = self._handler_metrics.get(key)
+            if histogram is None:
+                histogram = self._handler_metrics[key] = self.handler_time.labels(event_type, _listener_name(listener))
+            histogram.observe(time.perf_counter() - started)
+
+
+def _listener_name(listener: Callable) -> str:
+    """Имя обработчика для метрик: Класс.метод (для плагинов - класс плагина)."""
+    owner = getattr(listener, "__self__", None)
+    if owner is not None:
+        return f"{type(owner).__name__}.{listener.__name__}"
+    return getattr(listener, "__qualname__", repr(listener))
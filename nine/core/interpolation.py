@@ -0,0 +1,94 @@
+from collections import deque
+from typing import Deque, Dict, Optional, Sequence, Tuple
+
+Vec3 = Tuple[float, float, float]
+
+
+def _lerp(a: Sequence[float], b: Sequence[float], t: float) -> Vec3:
+    return tuple(x + (y - x) * t for x, y in zip(a, b))
+
+
+def _lerp_angles(a: Sequence[float], b: Sequence[float], t: float) -> Vec3:
+    """Интерполяция углов в градусах по кратчайшему пути."""
+    return tuple(x + ((y - x + 180.0) % 360.0 - 180.0) * t for x, y in zip(a, b))
+
+
+class SnapshotBuffer:
+    """Буфер снимков (время сервера, позиция, вращение) одной удаленной сущности."""
+
+    def __init__(self, max_snapshots: int = 32):
+        self.snapshots: Deque[Tuple[float, Vec3, Vec3]] = deque(maxlen=max_snapshots)
+
+    def push(self, server_time: float, pos: Sequence[float], rot: Sequence[float]):
+        if self.snapshots and server_time <= self.snapshots[-1][0]:
+            return
+        self.snapshots.append((server_time, tuple(pos), tuple(rot)))
+
+    def sample(self, render_time: float, max_extrapolation: float) -> Optional[Tuple[Vec3, Vec3]]:
+        """
+        Состояние на момент render_time: интерполяция между соседними снимками,
+        ограниченная экстраполяция после последнего снимка.
+        """
+        snapshots = self.snapshots
+        if not snapshots:
+            return None
+
+        # Снимки старше предыдущего для render_time больше не нужны.
+        while len(snapshots) > 2 and snapshots[1][0] <= render_time:
+            snapshots.popleft()
+
+        first_time, first_pos, first_rot = snapshots[0]
+        if render_time <= first_time or len(snapshots) == 1:
+            return first_pos, first_rot
+
+        second_time, second_pos, second_rot = snapshots[1]
+        t = (render_time - first_time) / (second_time - first_time)
+        if t > 1.0:
+            # Новых снимков нет (потеря пакетов): продолжаем движение, но недолго.
+            overshoot = min(render_time - second_time, max_extrapolation)
+            t = 1.0 + overshoot / (second_time - first_time)
+        return _lerp(first_pos, second_pos, t), _lerp_angles(first_rot, second_rot, t)
+
+
+class SnapshotInterpolator:
+    """
+    Отрисовка удаленных сущностей с задержкой interpolation_delay относительно
+    времени сервера. Смещение часов клиента и сервера оценивается по меткам "t"
+    в world_state.
+    """
+
+    def __init__(self, delay: float = 0.2, max_extrapolation: float = 0.25):
+        self.delay = delay
+        self.max_extrapolation = max_extrapolation
+        self.buffers: Dict[int, SnapshotBuffer] = {}
+        self.clock_offset: Optional[float] = None
+
+    def observe_server_time(self, server_time: float, local_time: float):
+        """Обновляет оценку смещения часов по времени получения снимка."""
+        offset = local_time - server_time
+        if self.clock_offset is None or offset < self.clock_offset:
+            # Самый быстрый пакет лучше всего отражает смещение часов.
+            self.clock_offset = offset
+        else:
+            # Медленно догоняем, чтобы пережить дрейф часов и рост задержки.
+            self.clock_offset += (offset - self.clock_offset) * 0.01
+
+    def push(self, entity_id: int, server_time: float, pos: Sequence[float], rot: Sequence[float]):
+        buffer = self.buffers.get(entity_id)
+        if buffer is None:
+            buffer = self.buffers[entity_id] = SnapshotBuffer()
+        buffer.push(server_time, pos, rot)
+
+    def remove(self, entity_id: int):
+        self.buffers.pop(entity_id, None)
+
+    def clear(self):
+        self.buffers.clear()
+        self.clock_offset = None
+
+    def sample(self, entity_id: int, local_time: float) -> Optional[Tuple[Vec3, Vec3]]:
+        buffer = self.buffers.get(entity_id)
+        if buffer is None or self.clock_offset is None:
+            return None
+        render_time = local_time - self.clock_offset - self.delay
+        return buffer.sample(render_time, self.max_extrapolation)
@@ -0,0 +1,249 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Job:
+    """Периодическая или отложенная задача планировщика."""
+
+    def __init__(self, job_id: int, callback: Callable, interval: Optional[float],
+                 owner=None, name: Optional[str] = None, executor: Optional[str] = None):
+        self.id = job_id
+        self.callback = callback
+        self.interval = interval
+        self.owner = owner
+        self.owner_name = getattr(owner, "name", "core") if owner is not None else "core"
+        self.name = name or getattr(callback, "__name__", repr(callback))
+        self.executor = executor
+        self.deadline = 0
+        self.cancelled = False
+        self.running = False
+        self.started_at = 0.0
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_runtime = 0.0
+        self.total_runtime = 0.0
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.owner_name}:{self.name}>"
+
+
+class TimerWheel:
+    """
+    Иерархическое колесо таймеров.
+    Вставка и отмена - O(1), продвижение на один тик - O(1) плюс
+    количество истекших таймеров (и редкий перенос с верхних уровней).
+    """
+
+    def __init__(self, slot_bits: int = 6, levels: int = 4):
+        self.slot_bits = slot_bits
+        self.mask = (1 << slot_bits) - 1
+        self.levels = levels
+        self.max_delta = (1 << (slot_bits * levels)) - 1
+        self.wheels: List[List[list]] = [[[] for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self.current = 0
+
+    def add(self, job: Job):
+        """Размещает задачу в слоте по ее абсолютному тику job.deadline."""
+        delta = job.deadline - self.current
+        if delta < 0:
+            self.wheels[0][self.current & self.mask].append(job)
+            return
+        if delta > self.max_delta:
+            # Задача дальше горизонта колеса: ставим на край и переразмещаем при срабатывании.
+            delta = self.max_delta
+        target = self.current + delta
+        for level in range(self.levels):
+            if delta < 1 << (self.slot_bits * (level + 1)):
+                self.wheels[level][(target >> (self.slot_bits * level)) & self.mask].append(job)
+                return
+
+    def advance(self, target_tick: int) -> List[Job]:
+        """Продвигает колесо до target_tick включительно и возвращает истекшие задачи."""
+        expired = []
+        while self.current <= target_tick:
+            tick = self.current
+            if tick & self.mask == 0 and tick:
+                self._cascade(tick)
+            slot = self.wheels[0][tick & self.mask]
+            if slot:
+                self.wheels[0][tick & self.mask] = []
+                for job in slot:
+                    if job.cancelled:
+                        continue
+                    if job.deadline > tick:
+                        self.add(job)
+                    else:
+                        expired.append(job)
+            self.current = tick + 1
+        return expired
+
+    def _cascade(self, tick: int):
+        levels = []
+        for level in range(1, self.levels):
+            levels.append(level)
+            if (tick >> (self.slot_bits * level)) & self.mask:
+                break
+        for level in reversed(levels):
+            index = (tick >> (self.slot_bits * level)) & self.mask
+            slot = self.wheels[level][index]
+            if slot:
+                self.wheels[level][index] = []
+                for job in slot:
+                    if not job.cancelled:
+                        self.add(job)
+
+
+class JobScheduler:
+    """
+    Центральный планировщик периодических и отложенных задач.
+    Все таймеры живут в одном колесе, которое продвигается основным циклом,
+    вместо отдельной asyncio-задачи со sleep() на каждое поведение.
+    Задачу можно выполнить в пуле потоков ("thread") или процессов ("process").
+    """
+
+    def __init__(self, resolution: float = 0.01):
+        self.resolution = resolution
+        self.wheel = TimerWheel()
+        self.jobs: Dict[int, Job] = {}
+        self._ids = count(1)
+        # Источник времени в секундах; подменяется через set_clock (например, при воспроизведении записи).
+        self.clock: Callable[[], float] = time.monotonic
+        self._start = self.clock()
+        self._executors: Dict[str, Executor] = {}
+
+    def set_clock(self, clock: Callable[[], float]):
+        """Переводит планировщик на другие часы; уже запланированные задачи сохраняют оставшееся время."""
+        self.clock = clock
+        self._start = clock() - self.wheel.current * self.resolution
+
+    def _now_tick(self) -> int:
+        return int((self.clock() - self._start) / self.resolution)
+
+    def _ticks(self, seconds: float) -> int:
+        return max(1, round(seconds / self.resolution))
+
+    def schedule_interval(self, callback: Callable, interval: float, owner=None,
+                          name: Optional[str] = None, executor: Optional[str] = None,
+                          delay: Optional[float] = None) -> Job:
+        """Запускает callback каждые interval секунд (первый раз - через delay или interval)."""
+        job = Job(next(self._ids), callback, interval, owner, name, executor)
+        return self._add(job, interval if delay is None else delay)
+
+    def schedule_delay(self, callback: Callable, delay: float, owner=None,
+                       name: Optional[str] = None, executor: Optional[str] = None) -> Job:
+        """Однократно запускает callback через delay секунд."""
+        job = Job(next(self._ids), callback, None, owner, name, executor)
+        return self._add(job, delay)
+
+    def _add(self, job: Job, delay: float) -> Job:
+        if job.executor not in (None, "thread", "process"):
+            raise ValueError(f"Неизвестный исполнитель задачи: {job.executor}")
+        job.deadline = max(self.wheel.current, self._now_tick()) + self._ticks(delay)
+        self.jobs[job.id] = job
+        self.wheel.add(job)
+        return job
+
+    def cancel(self, job: Job):
+        """Отменяет задачу. Уже запущенное в пуле выполнение не прерывается."""
+        job.cancelled = True
+        self.jobs.pop(job.id, None)
+
+    def cancel_owner(self, owner) -> int:
+        """Отменяет все задачи владельца и возвращает их количество."""
+        owned = [job for job in self.jobs.values() if job.owner is owner]
+        for job in owned:
+            self.cancel(job)
+        return len(owned)
+
+    def advance(self):
+        """Запускает все задачи, срок которых истек. Вызывается из основного цикла."""
+        for job in self.wheel.advance(self._now_tick()):
+            if job.interval is not None:
+                job.deadline = max(job.deadline + self._ticks(job.interval), self.wheel.current)
+                self.wheel.add(job)
+            else:
+                self.jobs.pop(job.id, None)
+            self._run(job)
+
+    def _run(self, job: Job):
+        if job.running:
+            # Предыдущий запуск еще не завершился - не накладываем выполнения.
+            job.skipped += 1
+            return
+
+        job.running = True
+        job.started_at = time.perf_counter()
+
+        if job.executor is not None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_executor(job.executor), job.callback)
+            future.add_done_callback(lambda f, job=job: self._finish(job, f))
+            return
+
+        try:
+            result = job.callback()
+        except Exception as e:
+            self._finish(job, error=e)
+            return
+
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            task.add_done_callback(lambda f, job=job: self._finish(job, f))
+        else:
+            self._finish(job)
+
+    def _finish(self, job: Job, future: Optional[asyncio.Future] = None, error: Optional[Exception] = None):
+        job.running = False
+        job.last_runtime = time.perf_counter() - job.started_at
+        job.total_runtime += job.last_runtime
+        job.runs += 1
+        if future is not None and not future.cancelled():
+            error = future.exception()
+        if error is not None:
+            job.errors += 1
+            print(f"Ошибка в задаче '{job.name}' ({job.owner_name}): {error}")
+
+    def _get_executor(self, kind: str) -> Executor:
+        executor = self._executors.get(kind)
+        if executor is None:
+            if kind == "thread":
+                executor = ThreadPoolExecutor(thread_name_prefix="nine-jobs")
+            else:
+                executor = ProcessPoolExecutor()
+            self._executors[kind] = executor
+        return executor
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Список активных задач с данными о выполнении."""
+        now_tick = self._now_tick()
+        result = []
+        for job in self.jobs.values():
+            result.append({
+                "id": job.id,
+                "name": job.name,
+                "owner": job.owner_name,
+                "interval": job.interval,
+                "executor": job.executor or "loop",
+                "next_run_in": max(0, job.deadline - now_tick) * self.resolution,
+                "running": job.running,
+                "running_for": time.perf_counter() - job.started_at if job.running else 0.0,
+                "runs": job.runs,
+                "skipped": job.skipped,
+                "errors": job.errors,
+                "last_runtime": job.last_runtime,
+                "avg_runtime": job.total_runtime / job.runs if job.runs else 0.0,
+            })
+        return result
+
+    def shutdown(self):
+        """Отменяет все задачи и останавливает пулы исполнителей."""
+        for job in list(self.jobs.values()):
+            self.cancel(job)
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
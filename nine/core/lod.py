@@ -0,0 +1,122 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+BUCKETS = ("near", "mid", "far")
+
+
+class SimulationLOD:
+    """
+    Уровни детализации симуляции по расстоянию до ближайшего игрока.
+
+    near - ближе near_radius: системы обновляют сущность каждый такт;
+    mid  - ближе mid_radius: раз в mid_interval тактов с накопленным dt
+           (сущности разбиты на mid_interval фаз, чтобы нагрузка не шла рывками);
+           dt каждой сущности отсчитывается от ее последнего обновления, поэтому
+           сущность, только что ушедшая из near, не получает время повторно;
+    far  - дальше: сущность спит, пока к ней не подойдет игрок.
+
+    Расстояния считаются по пространственному индексу (SpatialIndex), если он
+    передан, иначе перебором массивов.
+    """
+
+    def __init__(self, spatial=None, near_radius: float = 30.0, mid_radius: float = 80.0,
+                 mid_interval: int = 4, observer: str = "player"):
+        self.spatial = spatial
+        self.near_radius = near_radius
+        self.mid_radius = mid_radius
+        self.mid_interval = max(1, int(mid_interval))
+        self.observer = observer
+
+        self.tick = 0
+        self.time = 0.0
+        self._phase_elapsed = np.zeros(self.mid_interval)
+        # Время последнего обновления по ID сущности (-inf - еще не обновлялась).
+        self._last_run = np.full(0, -np.inf)
+        self._batches: List[Tuple[str, np.ndarray, float]] = []
+        self.counts: Dict[str, int] = dict.fromkeys(BUCKETS, 0)
+        self.cpu_time: Dict[str, float] = dict.fromkeys(BUCKETS, 0.0)
+        self.updates: Dict[str, int] = dict.fromkeys(BUCKETS, 0)
+
+    def _within(self, world, observers: np.ndarray, radius: float) -> np.ndarray:
+        """Сущности с transform на расстоянии не больше radius от любого наблюдателя."""
+        if self.spatial is not None:
+            found = self.spatial.query_radius_batch(observers, radius)
+            return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+        transform = world.storage("transform")
+        pos = transform.column("pos")
+        close = np.zeros(len(pos), dtype=bool)
+        for center in observers:
+            offsets = pos - center
+            close |= np.einsum("ij,ij->i", offsets, offsets) <= radius * radius
+        return np.sort(transform.entities[close])
+
+    def update_buckets(self, world, dt: float):
+        """Раскладывает сущности по уровням на текущий такт."""
+        self.tick += 1
+        self.time += dt
+        self._phase_elapsed += dt
+
+        entities = world.storage("transform").entities
+        observers, indices = world.query(self.observer, "transform")
+        observer_pos = world.storage("transform").column("pos")[indices["transform"]]
+        if len(observers):
+            near = self._within(world, observer_pos, self.near_radius)
+            mid = np.setdiff1d(self._within(world, observer_pos, self.mid_radius), near, assume_unique=True)
+        else:
+            near = mid = np.empty(0, dtype=np.int64)
+
+        self.counts = {"near": len(near), "mid": len(mid), "far": len(entities) - len(near) - len(mid)}
+
+        phase = self.tick % self.mid_interval
+        phase_dt = float(self._phase_elapsed[phase])
+        self._phase_elapsed[phase] = 0.0
+        mid = mid[mid % self.mid_interval == phase]
+        # Не больше накопленного фазой: сущность, проспавшая в far, не догоняет пропущенное.
+        mid_dt = np.minimum(self.time - self._last_run_of(mid), phase_dt)
+        self._mark(near)
+        self._mark(mid)
+
+        self._batches = [("near", near, dt)]
+        # Обычно у всех сущностей фазы один dt; отдельные группы - у недавно бывших в near.
+        for value in np.unique(mid_dt):
+            self._batches.append(("mid", mid[mid_dt == value], float(value)))
+
+    def _last_run_of(self, entities: np.ndarray) -> np.ndarray:
+        last = np.full(len(entities), -np.inf)
+        known = entities < len(self._last_run)
+        last[known] = self._last_run[entities[known]]
+        return last
+
+    def _mark(self, entities: np.ndarray):
+        if not len(entities):
+            return
+        size = int(entities.max()) + 1
+        if size > len(self._last_run):
+            grown = np.full(max(size, 2 * len(self._last_run)), -np.inf)
+            grown[:len(self._last_run)] = self._last_run
+            self._last_run = grown
+        self._last_run[entities] = self.time
+
+    def run(self, system, world):
+        """Вызывает LOD-систему для активных на этом такте сущностей."""
+        for bucket, entities, bucket_dt in self._batches:
+            if not len(entities):
+                continue
+            started = time.perf_counter()
+            system(world, bucket_dt, entities)
+            self.cpu_time[bucket] += time.perf_counter() - started
+            self.updates[bucket] += len(entities)
+
+    def stats(self) -> dict:
+        """Сущности в каждом уровне и среднее время систем на такт (мс)."""
+        ticks = max(self.tick, 1)
+        return {
+            bucket: {
+                "entities": self.counts[bucket],
+                "entity_updates": self.updates[bucket],
+                "avg_ms_per_tick": self.cpu_time[bucket] / ticks * 1000,
+            }
+            for bucket in BUCKETS
+        }
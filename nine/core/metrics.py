@@ -0,0 +1,220 @@
+import asyncio
+import bisect
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм длительностей, секунды.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Наборы меток сверх этого числа (например, типы сообщений от клиентов) попадают в "other".
+MAX_LABEL_SETS = 64
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricFamily:
+    """
+    Метрика с именем и метками. labels(...) возвращает дочерний счетчик для
+    набора значений меток; его стоит сохранить, если запись идет часто.
+    """
+
+    def __init__(self, kind: str, name: str, help_text: str, labelnames: Sequence[str], factory: Callable):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self.children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self.children[()] = factory()
+
+    def labels(self, *values) -> object:
+        child = self.children.get(values)
+        if child is None:
+            if len(self.children) >= MAX_LABEL_SETS:
+                values = ("other",) * len(self.labelnames)
+                child = self.children.get(values)
+                if child is not None:
+                    return child
+            child = self.children[values] = self._factory()
+        return child
+
+    def remove(self, *values):
+        self.children.pop(values, None)
+
+    # Метрика без меток пишется напрямую через семейство.
+    def inc(self, amount: float = 1.0):
+        self.children[()].inc(amount)
+
+    def set(self, value: float):
+        self.children[()].set(value)
+
+    def observe(self, value: float):
+        self.children[()].observe(value)
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик сервера: счетчики, датчики и гистограммы с метками.
+
+    Запись - изменение числа в объекте без блокировок и форматирования, поэтому
+    ее можно делать на каждое сообщение. Датчики с функцией (gauge_callback)
+    вычисляются только при выгрузке render() в текстовом формате Prometheus.
+    """
+
+    def __init__(self):
+        self.families: Dict[str, MetricFamily] = {}
+        self._callbacks: List[Tuple[str, str, Sequence[str], Callable]] = []
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        existing = self.families.get(family.name)
+        if existing is not None:
+            return existing
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily("counter", name, help_text, labelnames, Counter))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily("gauge", name, help_text, labelnames, Gauge))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        bounds = tuple(sorted(buckets))
+        return self._register(MetricFamily("histogram", name, help_text, labelnames, lambda: Histogram(bounds)))
+
+    def gauge_callback(self, name: str, help_text: str, callback: Callable, labelnames: Sequence[str] = ()):
+        """
+        Датчик, значение которого считается при выгрузке: callback возвращает
+        число или (при labelnames) словарь {кортеж значений меток: число}.
+        """
+        self._callbacks.append((name, help_text, tuple(labelnames), callback))
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, child in list(family.children.items()):
+                labels = _format_labels(family.labelnames, values)
+                if family.kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(child.bounds, child.counts):
+                        cumulative += count
+                        lines.append(f"{family.name}_bucket{_format_labels(family.labelnames, values, le=_number(bound))} {cumulative}")
+                    lines.append(f"{family.name}_bucket{_format_labels(family.labelnames, values, le='+Inf')} {child.count}")
+                    lines.append(f"{family.name}_sum{labels} {_number(child.sum)}")
+                    lines.append(f"{family.name}_count{labels} {child.count}")
+                else:
+                    lines.append(f"{family.name}{labels} {_number(child.value)}")
+
+        for name, help_text, labelnames, callback in self._callbacks:
+            try:
+                value = callback()
+            except Exception as e:
+                logger.warning(f"Метрика {name} не вычислена: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            if labelnames:
+                for values, item in value.items():
+                    lines.append(f"{name}{_format_labels(labelnames, values)} {_number(item)}")
+            else:
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, le: Optional[str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsServer:
+    """
+    HTTP-точка /metrics для Prometheus на localhost. Отвечает на любой GET
+    текущим render() реестра; другие запросы не обрабатываются.
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9100, log: logging.Logger = logger):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = log
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.logger.info(f"Метрики Prometheus: http://{self.host}:{self.port}/metrics")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+            if request.startswith(b"GET "):
+                body = self.registry.render().encode("utf-8")
+                status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body, status, content_type = b"", "405 Method Not Allowed", "text/plain"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
@@ -0,0 +1,365 @@
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .components import ANIM_WALK
+from .world import World
+
+MOVEMENT = np.dtype([("last_accept_time", np.float64)])
+
+CorrectionCallback = Callable[[np.ndarray, np.ndarray], None]
+
+
+class MovementValidator:
+    """
+    Проверяет присланные клиентами позиции раз в такт, целиком массивами.
+
+    Сообщение move только запоминает перемещение в словаре (последнее побеждает).
+    На такте для всех ожидающих сущностей сразу проверяются (той же проверкой
+    check InputSimulation пропускает позиции, рассчитанные по командам ввода):
+    - скорость относительно времени с последней принятой позиции;
+    - границы мира;
+    - порог телепортации (такие перемещения отклоняются целиком).
+    Слишком быстрые перемещения укорачиваются до допустимой дистанции,
+    выход за границы - прижимается к границе. Всем, чья позиция отличается
+    от присланной, отправляется коррекция через on_corrections(entities, positions).
+    """
+
+    def __init__(self, world: World, max_speed: float = 10.0, tolerance: float = 1.5,
+                 teleport_distance: float = 25.0,
+                 bounds: Sequence[Sequence[float]] = ((-50, -50, -10), (50, 50, 100)),
+                 max_elapsed: float = 1.0,
+                 on_corrections: Optional[CorrectionCallback] = None):
+        self.world = world
+        self.max_speed = max_speed
+        self.tolerance = tolerance
+        self.teleport_distance = teleport_distance
+        self.bounds_min = np.asarray(bounds[0], dtype=np.float64)
+        self.bounds_max = np.asarray(bounds[1], dtype=np.float64)
+        self.max_elapsed = max_elapsed
+        self.on_corrections = on_corrections
+        # Источник времени в секундах; подменяется, например, при воспроизведении записи.
+        self.clock: Callable[[], float] = time.monotonic
+
+        # entity_id -> (pos, rot, received_at)
+        self.pending: Dict[int, Tuple[Sequence[float], Sequence[float], float]] = {}
+        self.movement = world.register_component("movement", MOVEMENT)
+
+        self.accepted = 0
+        self.corrected = 0
+        self.rejected = 0
+
+        # ID сущностей переиспользуются: перемещение ушедшего игрока не должно достаться новому.
+        world.event_manager.subscribe("entity_destroyed", self._forget)
+
+    def _forget(self, entity_id: int):
+        self.pending.pop(entity_id, None)
+
+    def track(self, entity_id: int, now: Optional[float] = None):
+        """Начинает учет перемещений сущности (например, при появлении игрока)."""
+        self.movement.add(entity_id, last_accept_time=self.clock() if now is None else now)
+
+    def submit(self, entity_id: int, pos, rot, now: Optional[float] = None):
+        """Ставит перемещение в очередь на проверку в ближайшем такте."""
+        self.pending[entity_id] = (pos, rot, self.clock() if now is None else now)
+
+    def validate(self, world: World, dt: float):
+        """Система мира: проверяет и применяет все ожидающие перемещения."""
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, {}
+        entities = np.fromiter(pending.keys(), dtype=np.int64, count=len(pending))
+        moves = list(pending.values())
+        try:
+            requested = np.array([move[0] for move in moves], dtype=np.float64)
+            rotations = np.array([move[1] for move in moves], dtype=np.float64)
+            if requested.shape != (len(moves), 3) or rotations.shape != (len(moves), 3):
+                raise ValueError("неверная форма данных перемещения")
+            received_at = np.array([move[2] for move in moves], dtype=np.float64)
+        except (TypeError, ValueError):
+            requested, rotations, received_at = self._parse_slow(moves)
+
+        entities, result, corrected = self.check(world, entities, requested, rotations, received_at)
+        if self.on_corrections is not None and corrected.any():
+            self.on_corrections(entities[corrected], result[corrected])
+
+    def check(self, world: World, entities: np.ndarray, requested: np.ndarray, rotations: np.ndarray,
+              received_at) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Проверяет и применяет перемещения сущностей entities в позиции requested.
+
+        Возвращает (entities, result, corrected) для сущностей с компонентами
+        transform и movement: итоговые позиции и маску тех, чья позиция
+        отличается от запрошенной. Коррекции клиентам не отправляются.
+        """
+        received_at = np.broadcast_to(np.asarray(received_at, dtype=np.float64), entities.shape)
+        transform = world.storage("transform")
+        t_idx = transform.indices(entities)
+        m_idx = self.movement.indices(entities)
+        known = (t_idx >= 0) & (m_idx >= 0)
+        if not known.all():
+            entities, requested, rotations, received_at = (
+                entities[known], requested[known], rotations[known], received_at[known]
+            )
+            t_idx, m_idx = t_idx[known], m_idx[known]
+        if not len(entities):
+            return entities, requested, np.zeros(0, dtype=bool)
+
+        positions = transform.column("pos")
+        last_accept = self.movement.column("last_accept_time")
+        current = positions[t_idx]
+
+        elapsed = np.clip(received_at - last_accept[m_idx], 0.0, self.max_elapsed)
+        delta = requested - current
+        distance = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+        allowed = self.max_speed * self.tolerance * elapsed
+
+        finite = np.isfinite(requested).all(axis=1) & np.isfinite(rotations).all(axis=1)
+        rejected = ~finite | (distance > self.teleport_distance)
+        too_fast = ~rejected & (distance > allowed)
+
+        result = requested.copy()
+        scale = np.divide(allowed, distance, out=np.zeros_like(distance), where=distance > 0)
+        result[too_fast] = current[too_fast] + delta[too_fast] * scale[too_fast, None]
+        result[rejected] = current[rejected]
+        np.clip(result, self.bounds_min, self.bounds_max, out=result)
+
+        accepted = ~rejected
+        positions[t_idx] = result
+        transform.column("rot")[t_idx[accepted]] = rotations[accepted]
+        last_accept[m_idx[accepted]] = received_at[accepted]
+
+        animation = world.storage("animation")
+        a_idx = animation.indices(entities[accepted])
+        a_idx = a_idx[a_idx >= 0]
+        animation.column("state")[a_idx] = ANIM_WALK
+        animation.column("last_move_time")[a_idx] = time.time()
+
+        corrected = (result != requested).any(axis=1)
+        self.rejected += int(rejected.sum())
+        self.corrected += int((corrected & accepted).sum())
+        self.accepted += int((~corrected & accepted).sum())
+        return entities, result, corrected
+
+    @staticmethod
+    def _parse_slow(moves):
+        """Разбор по одному перемещению, если в пакете есть некорректные данные."""
+        requested = np.full((len(moves), 3), np.nan)
+        rotations = np.full((len(moves), 3), np.nan)
+        received_at = np.zeros(len(moves))
+        for i, (pos, rot, now) in enumerate(moves):
+            received_at[i] = now
+            try:
+                requested[i] = pos
+                rotations[i] = rot
+            except (TypeError, ValueError):
+                pass
+        return requested, rotations, received_at
+
+    def stats(self) -> dict:
+        return {"accepted": self.accepted, "corrected": self.corrected, "rejected": self.rejected}
+
+
+INPUT_STATE = np.dtype([("last_seq", np.int64)])
+
+
+def apply_move_input(pos: list, dx: float, dy: float, speed: float, dt: float):
+    """Один шаг симуляции движения (общий для сервера и предсказания на клиенте)."""
+    length = math.hypot(dx, dy)
+    if length > 1.0:
+        dx, dy = dx / length, dy / length
+    pos[0] += dx * speed * dt
+    pos[1] += dy * speed * dt
+
+
+class InputSimulation:
+    """
+    Серверная симуляция движения по командам ввода клиента.
+
+    Клиент присылает пронумерованные команды [seq, dx, dy, heading], по одной
+    на шаг симуляции длиной 1/sim_rate. Каждой сущности за такт начисляется
+    бюджет dt * sim_rate шагов (запас сверх одного такта - не больше
+    max_burst_steps), и применяется не больше команд, чем накоплено в бюджете:
+    клиент, присылающий команды чаще sim_rate, не движется быстрее move_speed.
+    Команды применяются раундами, каждый раунд одной операцией над массивами.
+    Если задан validator, итоговые позиции проходят его проверку check
+    (скорость, границы, телепортация) так же, как устаревшие сообщения move.
+    Номер последней примененной команды возвращается клиенту вместе с
+    позицией для сверки предсказания, поэтому отдельная коррекция не нужна.
+    """
+
+    def __init__(self, world: World, sim_rate: int = 30, move_speed: float = 10.0,
+                 max_burst_steps: float = 2.0, max_queue: int = 60,
+                 bounds: Sequence[Sequence[float]] = ((-50, -50, -10), (50, 50, 100)),
+                 validator: Optional[MovementValidator] = None):
+        self.world = world
+        self.sim_rate = sim_rate
+        self.step_dt = 1.0 / sim_rate
+        self.move_speed = move_speed
+        self.max_burst_steps = max_burst_steps
+        self.max_queue = max_queue
+        self.bounds_min = np.asarray(bounds[0], dtype=np.float64)
+        self.bounds_max = np.asarray(bounds[1], dtype=np.float64)
+        self.validator = validator
+
+        self.input_state = world.register_component("input_state", INPUT_STATE)
+        self.queues: Dict[int, Deque[Tuple[int, float, float, float]]] = {}
+        self._last_queued: Dict[int, int] = {}
+        # Накопленный бюджет шагов симуляции каждой сущности (может быть дробным).
+        self.budget: Dict[int, float] = {}
+        self.dropped = 0
+
+        world.event_manager.subscribe("entity_destroyed", self._forget)
+
+    def track(self, entity_id: int):
+        self.input_state.add(entity_id, last_seq=0)
+        self.queues[entity_id] = deque()
+        self._last_queued[entity_id] = 0
+        self.budget[entity_id] = 0.0
+
+    def _forget(self, entity_id: int):
+        self.queues.pop(entity_id, None)
+        self._last_queued.pop(entity_id, None)
+        self.budget.pop(entity_id, None)
+
+    def submit(self, entity_id: int, commands):
+        """Добавляет команды ввода в очередь сущности (повторы и мусор отбрасываются)."""
+        queue = self.queues.get(entity_id)
+        if queue is None:
+            return
+        last_seq = self._last_queued[entity_id]
+        for command in commands:
+            try:
+                seq, dx, dy, heading = int(command[0]), float(command[1]), float(command[2]), float(command[3])
+            except (TypeError, ValueError, IndexError):
+                continue
+            if seq <= last_seq or not (math.isfinite(dx) and math.isfinite(dy) and math.isfinite(heading)):
+                continue
+            if len(queue) >= self.max_queue:
+                queue.popleft()
+                self.dropped += 1
+            queue.append((seq, dx, dy, heading))
+            last_seq = seq
+        self._last_queued[entity_id] = last_seq
+
+    def simulate(self, world: World, dt: float):
+        """Система мира: применяет накопленные команды ввода."""
+        allowance = dt * self.sim_rate
+        limit = allowance + self.max_burst_steps
+        budget = self.budget
+        active = []
+        for entity, queue in self.queues.items():
+            value = min(budget[entity] + allowance, limit)
+            steps = min(int(value), len(queue))
+            budget[entity] = value - steps
+            if steps:
+                active.append((entity, queue, steps))
+        if not active:
+            return
+
+        transform = world.storage("transform")
+        entities = np.fromiter((entity for entity, _, _ in active), dtype=np.int64, count=len(active))
+        t_idx = transform.indices(entities)
+        if not (t_idx >= 0).all():
+            known = (t_idx >= 0).tolist()
+            active = [item for item, ok in zip(active, known) if ok]
+            entities, t_idx = entities[t_idx >= 0], t_idx[t_idx >= 0]
+            if not active:
+                return
+
+        queues = [queue for _, queue, _ in active]
+        steps = np.fromiter((steps for _, _, steps in active), dtype=np.int64, count=len(active))
+        positions = transform.column("pos")[t_idx]
+        rotations = transform.column("rot")[t_idx]
+        last_seq = np.zeros(len(active), dtype=np.int64)
+        for step in range(int(steps.max())):
+            rows = np.flatnonzero(steps > step)
+            commands = np.array([queues[row].popleft() for row in rows.tolist()], dtype=np.float64)
+
+            directions = commands[:, 1:3]
+            length = np.sqrt(np.einsum("ij,ij->i", directions, directions))
+            directions /= np.maximum(length, 1.0)[:, None]
+
+            positions[rows, :2] += directions * (self.move_speed * self.step_dt)
+            rotations[rows, 0] = commands[:, 3]
+            last_seq[rows] = commands[:, 0]
+
+        self.input_state.column("last_seq")[self.input_state.indices(entities)] = last_seq
+        np.clip(positions, self.bounds_min, self.bounds_max, out=positions)
+        if self.validator is not None:
+            self.validator.check(world, entities, positions, rotations, self.validator.clock())
+            return
+
+        transform.column("pos")[t_idx] = positions
+        transform.column("rot")[t_idx] = rotations
+        animation = world.storage("animation")
+        a_idx = animation.indices(entities)
+        a_idx = a_idx[a_idx >= 0]
+        animation.column("state")[a_idx] = ANIM_WALK
+        animation.column("last_move_time")[a_idx] = time.time()
+
+    def last_seq(self, entity_id: int) -> int:
+        """Номер последней примененной команды (0, если команд не было)."""
+        index = self.input_state.index(entity_id)
+        return int(self.input_state.column("last_seq")[index]) if index >= 0 else 0
+
+
+class MovementPredictor:
+    """
+    Предсказание движения локального игрока на клиенте.
+
+    Ввод дискретизируется шагами 1/sim_rate независимо от частоты кадров.
+    Каждый шаг с движением применяется локально и запоминается до
+    подтверждения сервером; при подтверждении позиция берется с сервера,
+    а неподтвержденные шаги проигрываются заново.
+    """
+
+    def __init__(self, pos, sim_rate: int = 30, move_speed: float = 10.0):
+        self.step_dt = 1.0 / sim_rate
+        self.move_speed = move_speed
+        self.pos = [float(v) for v in pos]
+        self.previous = list(self.pos)
+        self.accumulator = 0.0
+        self.seq = 0
+        self.pending: Deque[list] = deque()
+
+    def update(self, frame_dt: float, direction: Tuple[float, float], heading: float) -> List[list]:
+        """Продвигает симуляцию на время кадра. Возвращает новые команды для отправки."""
+        self.accumulator += min(frame_dt, 0.25)
+        commands = []
+        while self.accumulator >= self.step_dt:
+            self.accumulator -= self.step_dt
+            self.previous = list(self.pos)
+            if direction[0] or direction[1]:
+                self.seq += 1
+                command = [self.seq, direction[0], direction[1], heading]
+                apply_move_input(self.pos, direction[0], direction[1], self.move_speed, self.step_dt)
+                self.pending.append(command)
+                commands.append(command)
+        return commands
+
+    def reconcile(self, ack_seq: int, server_pos):
+        """Применяет подтвержденное сервером состояние и проигрывает неподтвержденный ввод."""
+        while self.pending and self.pending[0][0] <= ack_seq:
+            self.pending.popleft()
+        pos = [float(v) for v in server_pos]
+        previous = list(pos)
+        for _, dx, dy, _ in self.pending:
+            previous = list(pos)
+            apply_move_input(pos, dx, dy, self.move_speed, self.step_dt)
+        self.pos, self.previous = pos, previous
+
+    def reset(self, pos):
+        """Принудительно устанавливает позицию (например, после коррекции сервером)."""
+        self.pending.clear()
+        self.pos = [float(v) for v in pos]
+        self.previous = list(self.pos)
+
+    def render_pos(self) -> List[float]:
+        """Позиция для отрисовки: интерполяция между двумя последними шагами."""
+        alpha = self.accumulator / self.step_dt
+        return [p + (c - p) * alpha for p, c in zip(self.previous, self.pos)]
@@ -0,0 +1,298 @@
+import heapq
+import math
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache import Cache
+
+Cell = Tuple[int, int]
+
+_DIAGONAL = math.sqrt(2.0)
+_NEIGHBOURS = (
+    (1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+    (1, 1, _DIAGONAL), (1, -1, _DIAGONAL), (-1, 1, _DIAGONAL), (-1, -1, _DIAGONAL),
+)
+
+
+class NavGrid:
+    """
+    Статическая сетка проходимости карты в плоскости X/Y.
+    blocked[ix, iy] == True - ячейка непроходима.
+    """
+
+    def __init__(self, origin: Sequence[float], cell_size: float, blocked: np.ndarray):
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.cell_size = float(cell_size)
+        self.blocked = np.asarray(blocked, dtype=bool)
+        self.width, self.height = self.blocked.shape
+
+    @classmethod
+    def from_bounds(cls, bounds: Sequence[Sequence[float]], cell_size: float = 1.0,
+                    obstacles: Sequence[Sequence[float]] = ()) -> "NavGrid":
+        """
+        Сетка по границам мира [[min_x, min_y, ...], [max_x, max_y, ...]]
+        с прямоугольными препятствиями [x0, y0, x1, y1].
+        """
+        low, high = bounds
+        width = max(1, math.ceil((high[0] - low[0]) / cell_size))
+        height = max(1, math.ceil((high[1] - low[1]) / cell_size))
+        grid = cls((low[0], low[1]), cell_size, np.zeros((width, height), dtype=bool))
+        for x0, y0, x1, y1 in obstacles:
+            (ix0, iy0), (ix1, iy1) = grid.cell_of((min(x0, x1), min(y0, y1))), grid.cell_of((max(x0, x1), max(y0, y1)))
+            grid.blocked[ix0:ix1 + 1, iy0:iy1 + 1] = True
+        return grid
+
+    def cell_of(self, pos: Sequence[float]) -> Cell:
+        """Ячейка, содержащая точку (с ограничением по краям сетки)."""
+        ix = int((pos[0] - self.origin[0]) // self.cell_size)
+        iy = int((pos[1] - self.origin[1]) // self.cell_size)
+        return min(max(ix, 0), self.width - 1), min(max(iy, 0), self.height - 1)
+
+    def cell_centers(self, cells: Sequence[Cell]) -> np.ndarray:
+        """Центры ячеек в мировых координатах, массив формы (n, 2)."""
+        cells = np.asarray(cells, dtype=np.float64).reshape(-1, 2)
+        return (cells + 0.5) * self.cell_size + self.origin
+
+    def is_walkable(self, cell: Cell) -> bool:
+        ix, iy = cell
+        return 0 <= ix < self.width and 0 <= iy < self.height and not self.blocked[ix, iy]
+
+    def random_walkable(self, rng: np.random.Generator, near: Optional[Cell] = None, radius: int = 10,
+                        attempts: int = 16) -> Optional[Cell]:
+        """Случайная проходимая ячейка (в квадрате radius вокруг near, если задан)."""
+        for _ in range(attempts):
+            if near is None:
+                cell = (int(rng.integers(self.width)), int(rng.integers(self.height)))
+            else:
+                cell = (int(near[0] + rng.integers(-radius, radius + 1)),
+                        int(near[1] + rng.integers(-radius, radius + 1)))
+            if self.is_walkable(cell):
+                return cell
+        return None
+
+
+def find_path(grid: NavGrid, start: Cell, goal: Cell) -> Tuple[Optional[List[Cell]], float]:
+    """
+    A* по 8 направлениям без срезания углов препятствий.
+    Возвращает (ячейки пути без промежуточных точек на прямых участках, стоимость в
+    единицах мира) или (None, 0.0), если цель недостижима.
+    """
+    if not grid.is_walkable(goal):
+        return None, 0.0
+    if start == goal:
+        return [goal], 0.0
+
+    blocked = grid.blocked
+    width, height = grid.width, grid.height
+    gx, gy = goal
+
+    def heuristic(x, y):
+        dx, dy = abs(x - gx), abs(y - gy)
+        return (dx + dy) + (_DIAGONAL - 2.0) * min(dx, dy)
+
+    open_heap = [(heuristic(*start), 0.0, start)]
+    came_from: Dict[Cell, Cell] = {}
+    best_cost = {start: 0.0}
+
+    while open_heap:
+        _, cost, cell = heapq.heappop(open_heap)
+        if cell == goal:
+            break
+        if cost > best_cost[cell]:
+            continue
+        x, y = cell
+        for dx, dy, step in _NEIGHBOURS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height) or blocked[nx, ny]:
+                continue
+            if dx and dy and (blocked[x + dx, y] or blocked[x, y + dy]):
+                continue
+            new_cost = cost + step
+            neighbour = (nx, ny)
+            if new_cost < best_cost.get(neighbour, math.inf):
+                best_cost[neighbour] = new_cost
+                came_from[neighbour] = cell
+                heapq.heappush(open_heap, (new_cost + heuristic(nx, ny), new_cost, neighbour))
+    else:
+        return None, 0.0
+
+    path = [goal]
+    while path[-1] != start:
+        path.append(came_from[path[-1]])
+    path.reverse()
+    return _prune_collinear(path), best_cost[goal] * grid.cell_size
+
+
+def _prune_collinear(path: List[Cell]) -> List[Cell]:
+    """Оставляет только точки поворота пути (и конечную точку)."""
+    if len(path) < 3:
+        return path[1:] or path
+    result = []
+    for prev, cell, nxt in zip(path, path[1:], path[2:]):
+        if (cell[0] - prev[0], cell[1] - prev[1]) != (nxt[0] - cell[0], nxt[1] - cell[1]):
+            result.append(cell)
+    result.append(path[-1])
+    return result
+
+
+# --- Рабочие процессы ---
+# Сетка передается в процесс один раз через initializer, пакеты запросов
+# содержат только пары ячеек.
+
+_worker_grid: Optional[NavGrid] = None
+
+
+def _init_worker(grid: NavGrid):
+    global _worker_grid
+    _worker_grid = grid
+
+
+def _solve_batch(pairs: List[Tuple[Cell, Cell]], grid: Optional[NavGrid] = None) -> List[tuple]:
+    """Решает пакет запросов: [(path, cost, seconds), ...] в порядке pairs."""
+    grid = grid or _worker_grid
+    results = []
+    for start, goal in pairs:
+        started = time.perf_counter()
+        path, cost = find_path(grid, start, goal)
+        results.append((path, cost, time.perf_counter() - started))
+    return results
+
+
+class PathService:
+    """
+    Очередь запросов A* с пакетным решением в пуле процессов.
+
+    request() ставит запрос в очередь (или сразу отвечает из кэша путей),
+    dispatch() на такте отправляет в пул пакеты уникальных пар ячеек,
+    poll() забирает готовые результаты - основной цикл никогда не ждет поиска.
+    При workers=0 пакеты решаются в основном потоке (для отладки).
+    """
+
+    def __init__(self, grid: NavGrid, workers: int = 2, batch_size: int = 32,
+                 max_in_flight: Optional[int] = None, cache_size: int = 4096):
+        self.grid = grid
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight or max(1, workers * 2)
+        self.cache = Cache("navigation.paths", max_entries=cache_size, weigher=None)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Deque[Tuple[Cell, Cell]] = deque()
+        # (start, goal) -> ожидающие этот путь
+        self._waiting: Dict[Tuple[Cell, Cell], List[Hashable]] = {}
+        self._latest: Dict[Hashable, Tuple[Cell, Cell]] = {}
+        self._in_flight: List[Tuple[Future, List[Tuple[Cell, Cell]]]] = []
+        self._ready: List[Tuple[Hashable, Tuple[Cell, Cell], tuple]] = []
+
+        self.requests = 0
+        self.solved = 0
+        self.failed = 0
+        self.batches = 0
+        self.total_cost = 0.0
+        self.total_solve_time = 0.0
+
+    def request(self, requester: Hashable, start: Sequence[float], goal: Sequence[float]):
+        """
+        Запрашивает путь между мировыми точками. Новый запрос того же
+        requester заменяет предыдущий; результат придет через poll().
+        """
+        key = (self.grid.cell_of(start), self.grid.cell_of(goal))
+        self.requests += 1
+        self._latest[requester] = key
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._ready.append((requester, key, cached))
+            return
+
+        waiting = self._waiting.get(key)
+        if waiting is None:
+            self._waiting[key] = [requester]
+            self._queue.append(key)
+        elif requester not in waiting:
+            waiting.append(requester)
+
+    def cancel(self, requester: Hashable):
+        self._latest.pop(requester, None)
+
+    def dispatch(self):
+        """Отправляет накопленные запросы в пул пакетами по batch_size."""
+        while self._queue and len(self._in_flight) < self.max_in_flight:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if self.workers <= 0:
+                future = Future()
+                future.set_result(_solve_batch(batch, self.grid))
+            else:
+                future = self._get_executor().submit(_solve_batch, batch)
+            self._in_flight.append((future, batch))
+            self.batches += 1
+
+    def poll(self) -> List[Tuple[Hashable, Optional[np.ndarray], float]]:
+        """
+        Готовые результаты: [(requester, waypoints, cost)], waypoints - массив
+        мировых точек (n, 2) или None, если пути нет. Устаревшие ответы
+        (requester успел запросить другой путь) отбрасываются.
+        """
+        still_running = []
+        for future, batch in self._in_flight:
+            if not future.done():
+                still_running.append((future, batch))
+                continue
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"Ошибка поиска пути: {e}")
+                results = [(None, 0.0, 0.0)] * len(batch)
+            for key, (path, cost, seconds) in zip(batch, results):
+                self.total_solve_time += seconds
+                if path is None:
+                    self.failed += 1
+                else:
+                    self.solved += 1
+                    self.total_cost += cost
+                self.cache.set(key, (path, cost))
+                for requester in self._waiting.pop(key, []):
+                    self._ready.append((requester, key, (path, cost)))
+        self._in_flight = still_running
+
+        ready, self._ready = self._ready, []
+        delivered = []
+        for requester, key, (path, cost) in ready:
+            # Ответ актуален, только если он для последнего запроса requester.
+            if self._latest.get(requester) != key:
+                continue
+            del self._latest[requester]
+            delivered.append((requester, None if path is None else self.grid.cell_centers(path), cost))
+        return delivered
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.grid,))
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        finished = self.solved + self.failed
+        return {
+            "requests": self.requests,
+            "queue_depth": self.queue_depth,
+            "in_flight": sum(len(batch) for _, batch in self._in_flight),
+            "batches": self.batches,
+            "solved": self.solved,
+            "failed": self.failed,
+            "avg_cost": self.total_cost / self.solved if self.solved else 0.0,
+            "avg_solve_ms": self.total_solve_time / finished * 1000 if finished else 0.0,
+            "cache_hit_rate": self.cache.hit_rate,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -4,7 +4,9 @@ import ssl
 import struct
 from typing import NamedTuple, Optional
 
+from .capture import CaptureWriter
 from .events import EventManager
+from .metrics import MetricsRegistry
 
 
 class ClientConnectedEvent(NamedTuple):
@@ -27,11 +29,27 @@ class NetworkManager:
     Управляет сетевым взаимодействием (клиент/сервер) на базе asyncio.
     """
 
-    def __init__(self, event_manager: EventManager):
+    def __init__(self, event_manager: EventManager, metrics: Optional[MetricsRegistry] = None):
         self.event_manager = event_manager
         self.clients: dict[int, asyncio.StreamWriter] = {}
+        # Кадры, отложенные до ближайшего такта (flush): {client_id: [кадр, ...]}
+        self._outgoing: dict[int, list[bytes]] = {}
         self._next_client_id = 1
         self._server_task: Optional[asyncio.Task] = None
+        # Запись входящего трафика для воспроизведения (tools/replay.py); None - выключена.
+        self.capture: Optional[CaptureWriter] = None
+
+        metrics = metrics or MetricsRegistry()
+        self._frames_in = metrics.counter("nine_frames_received_total", "Принятые кадры по типам сообщений", ("type",))
+        self._bytes_in = metrics.counter("nine_bytes_received_total", "Принятые байты по типам сообщений", ("type",))
+        self._frames_out = metrics.counter("nine_frames_sent_total", "Отправленные кадры по типам сообщений", ("type",))
+        self._bytes_out = metrics.counter("nine_bytes_sent_total", "Отправленные байты по типам сообщений", ("type",))
+        metrics.gauge_callback("nine_connected_clients", "Открытые соединения клиентов", lambda: len(self.clients))
+        metrics.gauge_callback("nine_client_write_buffer_bytes", "Байты в буфере отправки соединения",
+                               self._write_buffers, ("client",))
+        metrics.gauge_callback("nine_client_queued_frames", "Кадры, отложенные до ближайшего такта",
+                               lambda: {(client_id,): len(frames) for client_id, frames in self._outgoing.items()},
+                               ("client",))
 
     async def start_server(self, host: str, port: int):
         """Запускает TCP сервер с TLS-шифрованием."""
@@ -68,6 +86,8 @@ class NetworkManager:
 
         addr = writer.get_extra_info("peername")
         print(f"Новое TLS-подключение от {addr}, назначен ID {client_id}")
+        if self.capture is not None:
+            self.capture.connect(client_id)
 
         self.event_manager.post("network_client_connected", ClientConnectedEvent(client_id, reader, writer))
 
@@ -78,6 +98,11 @@ class NetworkManager:
 
                 payload = await reader.readexactly(msg_len)
                 data = json.loads(payload.decode("utf-8"))
+                msg_type = str(data.get("type")) if isinstance(data, dict) else "invalid"
+                self._frames_in.labels(msg_type).inc()
+                self._bytes_in.labels(msg_type).inc(msg_len + 4)
+                if self.capture is not None:
+                    self.capture.message(client_id, payload, data)
 
                 self.event_manager.post("network_message_received", MessageReceivedEvent(client_id, data))
 
@@ -86,21 +111,81 @@ class NetworkManager:
         except Exception as e:
             print(f"Ошибка клиента {client_id}: {e}")
         finally:
-            del self.clients[client_id]
+            self.detach(client_id)
             writer.close()
             await writer.wait_closed()
             self.event_manager.post("network_client_disconnected", ClientDisconnectedEvent(client_id))
 
+    def detach(self, client_id: int):
+        """Забывает соединение клиента и его отложенные кадры."""
+        if self.capture is not None:
+            self.capture.disconnect(client_id)
+        self.clients.pop(client_id, None)
+        self._outgoing.pop(client_id, None)
+
+    def start_capture(self, path) -> CaptureWriter:
+        """Начинает запись входящих сообщений, подключений и отключений в файл path."""
+        self.stop_capture()
+        self.capture = CaptureWriter(path)
+        print(f"Запись входящего трафика: {self.capture.path}")
+        return self.capture
+
+    def stop_capture(self):
+        if self.capture is not None:
+            self.capture.close()
+            print(f"Запись трафика завершена: {self.capture.records} записей в {self.capture.path}")
+            self.capture = None
+
     async def send_message(self, client_id: int, data: dict):
         """Отправляет сообщение определенному клиенту."""
+        await self.send_payload(client_id, json.dumps(data).encode("utf-8"), data.get("type"))
+
+    async def send_payload(self, client_id: int, payload: bytes, msg_type: str = "other"):
+        """Отправляет клиенту уже закодированное сообщение."""
         writer = self.clients.get(client_id)
         if writer:
-            payload = json.dumps(data).encode("utf-8")
             header = struct.pack("!I", len(payload))
             
             writer.write(header + payload)
+            self._count_sent(msg_type, len(payload) + 4)
             await writer.drain()
 
+    def _count_sent(self, msg_type: str, size: int, frames: int = 1):
+        self._frames_out.labels(msg_type).inc(frames)
+        self._bytes_out.labels(msg_type).inc(size)
+
+    def _write_buffers(self) -> dict:
+        sizes = {}
+        for client_id, writer in self.clients.items():
+            transport = getattr(writer, "transport", None)
+            if transport is not None:
+                sizes[(client_id,)] = transport.get_write_buffer_size()
+        return sizes
+
+    def queue_payload(self, client_id: int, payload: bytes, msg_type: str = "other"):
+        """Откладывает закодированное сообщение до ближайшего flush."""
+        if client_id in self.clients:
+            self._outgoing.setdefault(client_id, []).append(struct.pack("!I", len(payload)) + payload)
+            self._count_sent(msg_type, len(payload) + 4)
+
+    async def flush(self, payloads: Optional[dict[int, bytes]] = None, msg_type: str = "world_state"):
+        """
+        Отправляет отложенные кадры вместе с payloads (пакеты такта типа msg_type):
+        все кадры клиента записываются в сокет одним вызовом write.
+        """
+        outgoing, self._outgoing = self._outgoing, {}
+        for client_id, payload in (payloads or {}).items():
+            outgoing.setdefault(client_id, []).append(struct.pack("!I", len(payload)) + payload)
+            self._count_sent(msg_type, len(payload) + 4)
+
+        writers = []
+        for client_id, frames in outgoing.items():
+            writer = self.clients.get(client_id)
+            if writer:
+                writer.write(b"".join(frames))
+                writers.append(writer)
+        await asyncio.gather(*(writer.drain() for writer in writers), return_exceptions=True)
+
     async def broadcast(self, data: dict, exclude_ids: Optional[list[int]] = None):
         """Рассылает сообщение всем клиентам, с возможностью исключений."""
         if exclude_ids is None:
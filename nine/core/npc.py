@@ -0,0 +1,149 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .components import ANIM_IDLE, ANIM_WALK
+from .navigation import PathService
+
+NPC = np.dtype([
+    ("speed", np.float64),
+    ("target", np.float64, (2,)),
+    ("moving", np.bool_),
+    ("waiting_path", np.bool_),
+    ("idle_until", np.float64),
+])
+
+
+class NPCSystem:
+    """
+    NPC поверх World: компоненты transform, animation и npc.
+
+    Пути запрашиваются у PathService и применяются на такте, когда готовы,
+    движение к текущей точке пути считается массивами для всех NPC сразу.
+    NPC без цели бродят: после паузы выбирают случайную проходимую ячейку рядом.
+    Поддерживает уровни детализации (World.add_system(..., lod=True)).
+    """
+
+    def __init__(self, world, paths: PathService, wander_radius: int = 10,
+                 idle_time: Sequence[float] = (1.0, 4.0), seed: Optional[int] = None):
+        self.world = world
+        self.paths = paths
+        self.wander_radius = wander_radius
+        self.idle_time = idle_time
+        self.rng = np.random.default_rng(seed)
+        self._polled_at = None
+
+        # entity -> (точки пути (n, 2), индекс текущей точки)
+        self._routes: Dict[int, list] = {}
+
+        self.storage = world.register_component("npc", NPC)
+        world.event_manager.subscribe("entity_destroyed", self._on_entity_destroyed)
+
+    def spawn(self, pos: Sequence[float], speed: float = 3.0) -> int:
+        """Создает NPC в точке pos."""
+        entity = self.world.create_entity()
+        self.world.add_component(entity, "transform", pos=pos, rot=(0, 0, 0))
+        self.world.add_component(entity, "animation", state=ANIM_IDLE)
+        self.world.add_component(entity, "npc", speed=speed, idle_until=self.world.time)
+        return entity
+
+    def move_to(self, entity: int, goal: Sequence[float]):
+        """Отправляет NPC к точке goal (путь будет найден асинхронно)."""
+        pos = self.world.get_component(entity, "transform")["pos"]
+        self.paths.request(entity, pos, goal)
+        self.storage.set(entity, waiting_path=True)
+
+    def _on_entity_destroyed(self, entity_id: int):
+        self._routes.pop(entity_id, None)
+        self.paths.cancel(entity_id)
+
+    def update(self, world, dt: float, entities: Optional[np.ndarray] = None):
+        """
+        Система мира: применяет готовые пути, двигает NPC и раздает новые цели.
+        entities - NPC, обновляемые на этом такте (None - все).
+        """
+        # При LOD система вызывается несколько раз за такт, пути забираются один раз.
+        if self._polled_at != world.time:
+            self._polled_at = world.time
+            self._apply_paths()
+        self._move(dt, entities)
+        self._wander(entities)
+        self.paths.dispatch()
+
+    def _apply_paths(self):
+        npc = self.storage
+        for entity, waypoints, _ in self.paths.poll():
+            if entity not in npc:
+                continue
+            index = npc.index(entity)
+            npc.column("waiting_path")[index] = False
+            if waypoints is None:
+                npc.column("moving")[index] = False
+                npc.column("idle_until")[index] = self.world.time + self.rng.uniform(*self.idle_time)
+                continue
+            self._routes[entity] = [waypoints, 0]
+            npc.column("target")[index] = waypoints[0]
+            npc.column("moving")[index] = True
+
+    def _move(self, dt: float, entities: Optional[np.ndarray]):
+        entities, indices = self.world.query("npc", "transform", "animation", entities=entities)
+        if not len(entities):
+            return
+        npc_i, transform_i, animation_i = indices["npc"], indices["transform"], indices["animation"]
+        moving = self.storage.column("moving")[npc_i]
+
+        state = self.world.storage("animation").column("state")
+        state[animation_i] = np.where(moving, ANIM_WALK, ANIM_IDLE)
+        if not moving.any():
+            return
+
+        npc_i, transform_i, entities = npc_i[moving], transform_i[moving], entities[moving]
+        pos = self.world.storage("transform").column("pos")
+        rot = self.world.storage("transform").column("rot")
+
+        offsets = self.storage.column("target")[npc_i] - pos[transform_i, :2]
+        distance = np.hypot(offsets[:, 0], offsets[:, 1])
+        step = self.storage.column("speed")[npc_i] * dt
+        arrived = distance <= step
+        scale = np.divide(step, distance, out=np.ones_like(distance), where=~arrived)
+        pos[transform_i, :2] += offsets * scale[:, None]
+
+        heading = distance > 1e-6
+        rot[transform_i[heading], 0] = np.degrees(np.arctan2(-offsets[heading, 0], offsets[heading, 1]))
+
+        # Переход к следующей точке пути нужен только прибывшим NPC.
+        for entity, index in zip(entities[arrived].tolist(), npc_i[arrived].tolist()):
+            route = self._routes.get(entity)
+            if route is not None and route[1] + 1 < len(route[0]):
+                route[1] += 1
+                self.storage.column("target")[index] = route[0][route[1]]
+            else:
+                self._routes.pop(entity, None)
+                self.storage.column("moving")[index] = False
+                self.storage.column("idle_until")[index] = self.world.time + self.rng.uniform(*self.idle_time)
+
+    def _wander(self, entities: Optional[np.ndarray]):
+        npc = self.storage
+        ready = (~npc.column("moving")) & (~npc.column("waiting_path")) & (npc.column("idle_until") <= self.world.time)
+        if entities is not None:
+            ready &= np.isin(npc.entities, entities)
+        if not ready.any():
+            return
+        transform = self.world.storage("transform")
+        grid = self.paths.grid
+        for entity in npc.entities[ready].tolist():
+            pos = transform.column("pos")[transform.index(entity)]
+            cell = grid.random_walkable(self.rng, grid.cell_of(pos), self.wander_radius)
+            if cell is None:
+                npc.set(entity, idle_until=self.world.time + self.idle_time[1])
+                continue
+            self.move_to(entity, grid.cell_centers([cell])[0])
+
+    def stats(self) -> dict:
+        moving = self.storage.column("moving")
+        return {
+            "npcs": len(self.storage),
+            "moving": int(np.count_nonzero(moving)),
+            "waiting_path": int(np.count_nonzero(self.storage.column("waiting_path"))),
+            **self.paths.stats(),
+        }
@@ -3,6 +3,7 @@ import importlib.util
 from pathlib import Path
 from typing import List
 
+from .cache import Cache, db_write_through
 from .events import EventManager
 
 class BasePlugin:
@@ -26,6 +27,90 @@ class BasePlugin:
         """Вызывается при выгрузке плагина."""
         pass
 
+    def enqueue_work(self, item):
+        """
+        Ставит порцию работы в очередь, выполняемую в пределах бюджета такта.
+        item - функция без аргументов или генератор, каждый next() которого
+        выполняет небольшой шаг работы.
+        """
+        self.app.work_scheduler.enqueue(self, item)
+
+    def pending_work(self) -> int:
+        """Возвращает количество невыполненных элементов работы плагина."""
+        return self.app.work_scheduler.pending(self)
+
+    def schedule_interval(self, callback, interval: float, executor: str = None, name: str = None, delay: float = None):
+        """
+        Запускает callback каждые interval секунд через планировщик ядра.
+        executor: None (в основном цикле), "thread" или "process".
+        Для "process" callback должен быть сериализуемым (функция уровня модуля).
+        Задачи плагина отменяются автоматически при выгрузке.
+        """
+        return self.app.job_scheduler.schedule_interval(callback, interval, owner=self, name=name, executor=executor, delay=delay)
+
+    def schedule_delay(self, callback, delay: float, executor: str = None, name: str = None):
+        """Однократно запускает callback через delay секунд."""
+        return self.app.job_scheduler.schedule_delay(callback, delay, owner=self, name=name, executor=executor)
+
+    def cancel_job(self, job):
+        """Отменяет задачу, созданную schedule_interval/schedule_delay."""
+        self.app.job_scheduler.cancel(job)
+
+    def create_cache(self, name: str, max_entries: int = None, ttl: float = None, max_weight: int = None,
+                     write_through: str = None, **kwargs) -> Cache:
+        """
+        Создает ограниченный кэш плагина (LRU, TTL, вес в байтах).
+        write_through - имя атрибута игрока: промахи загружаются из DatabaseManager,
+        записи сразу сохраняются в него (ключ кэша - UUID игрока).
+        Изменяемые значения после правки нужно записать заново через cache[key] = value.
+        """
+        db = getattr(self.app, "db", None)
+        if write_through and db is not None:
+            kwargs["loader"], kwargs["writer"] = db_write_through(db, write_through)
+
+        cache = Cache(f"{self.name}.{name}", max_entries=max_entries, ttl=ttl, max_weight=max_weight, **kwargs)
+        if hasattr(self.app, "caches"):
+            self.app.caches.register(self, cache)
+        if ttl is not None and hasattr(self.app, "job_scheduler"):
+            self.schedule_interval(cache.purge_expired, ttl, name=f"purge {cache.name}")
+        return cache
+
+    def resource_path(self, name: str) -> str:
+        """
+        Путь к ресурсу плагина (относительно папки плагина) для загрузчиков
+        Panda3D. Если ресурс упакован в архив (AssetLibrary), возвращается путь в архиве.
+        """
+        root = self.plugin_path if self.plugin_path.is_dir() else self.plugin_path.parent
+        path = (root / name).as_posix()
+        archives = getattr(self.app, "archives", None)
+        return archives.resolve(path) if archives is not None else path
+
+    def read_resource(self, name: str) -> bytes:
+        """Содержимое ресурса плагина из архива или с диска."""
+        root = self.plugin_path if self.plugin_path.is_dir() else self.plugin_path.parent
+        archives = getattr(self.app, "archives", None)
+        if archives is not None:
+            return archives.read_bytes(root / name)
+        return (root / name).read_bytes()
+
+    @property
+    def spatial(self):
+        """
+        Пространственный индекс сервера (SpatialIndex) или None на клиенте.
+        Запросы query_radius/query_box/query_nearest и их пакетные версии
+        возвращают массивы ID сущностей мира.
+        """
+        return getattr(self.app, "spatial", None)
+
+    def players_near(self, center, radius: float) -> List[int]:
+        """ID клиентов, чьи персонажи находятся не дальше radius от center."""
+        if self.spatial is None:
+            return []
+        entities = self.spatial.query_radius(center, radius)
+        player = self.app.world.storage("player")
+        indices = player.indices(entities)
+        return player.column("client_id")[indices[indices >= 0]].tolist()
+
 class PluginManager:
     """
     Загружает и выгружает плагины.
@@ -114,5 +199,11 @@ class PluginManager:
                 plugin.on_unload()
             except Exception as e:
                 print(f"Ошибка выгрузки плагина {plugin.name}: {e}")
+            if hasattr(self.app, "work_scheduler"):
+                self.app.work_scheduler.discard(plugin)
+            if hasattr(self.app, "job_scheduler"):
+                self.app.job_scheduler.cancel_owner(plugin)
+            if hasattr(self.app, "caches"):
+                self.app.caches.discard(plugin)
         self.plugins = []
 
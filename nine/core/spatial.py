@@ -0,0 +1,221 @@
+import math
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+_EMPTY = np.empty(0, dtype=np.int64)
+_NO_CELL = np.iinfo(np.int64).min
+
+
+class SpatialIndex:
+    """
+    Пространственный индекс сущностей с компонентом transform.
+
+    Основа - равномерная сетка по осям X/Y: ячейки пересчитываются раз в такт
+    и только для сущностей, сменивших ячейку. Если установлен SciPy и
+    use_kdtree включен, на каждом такте дополнительно перестраивается KD-дерево,
+    которое обслуживает пакетные запросы и поиск ближайших соседей.
+
+    Все запросы возвращают массивы NumPy с ID сущностей. Данные соответствуют
+    состоянию мира на момент последнего update().
+    """
+
+    def __init__(self, world, cell_size: float = 8.0, use_kdtree: bool = True):
+        self.world = world
+        self.cell_size = float(cell_size)
+        self.use_kdtree = use_kdtree and cKDTree is not None
+
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._entity_cell = np.full((64, 2), _NO_CELL, dtype=np.int64)
+        self._positions = np.zeros((64, 3), dtype=np.float64)
+        self._count = 0
+        # Порядок точек KD-дерева: индекс точки -> ID сущности.
+        self._entities = _EMPTY
+        self._tree = None
+
+        self.cell_moves = 0
+
+        world.event_manager.subscribe("entity_destroyed", self._on_entity_destroyed)
+
+    def __len__(self):
+        return self._count
+
+    # --- Обновление ---
+
+    def update(self, world=None, dt: float = 0.0):
+        """Система мира: синхронизирует индекс с колонкой transform.pos."""
+        transform = self.world.storage("transform")
+        entities = transform.entities.copy()
+        positions = transform.column("pos").copy()
+
+        self._reserve(entities)
+        if self._count > np.count_nonzero(self._entity_cell[entities, 0] != _NO_CELL):
+            self._drop_missing(entities)
+
+        if len(entities):
+            self._positions[entities] = positions
+            cells = np.floor(positions[:, :2] / self.cell_size).astype(np.int64)
+            moved = np.any(cells != self._entity_cell[entities], axis=1)
+            for entity, cell in zip(entities[moved].tolist(), map(tuple, cells[moved].tolist())):
+                self._move(entity, cell)
+            self._entity_cell[entities[moved]] = cells[moved]
+            self.cell_moves += int(np.count_nonzero(moved))
+
+        self._entities = entities
+        self._tree = cKDTree(positions) if self.use_kdtree and len(entities) else None
+
+    def _reserve(self, entities: np.ndarray):
+        needed = int(entities.max()) + 1 if len(entities) else 0
+        if needed > len(self._entity_cell):
+            size = max(needed, len(self._entity_cell) * 2)
+            cells = np.full((size, 2), _NO_CELL, dtype=np.int64)
+            cells[:len(self._entity_cell)] = self._entity_cell
+            positions = np.zeros((size, 3), dtype=np.float64)
+            positions[:len(self._positions)] = self._positions
+            self._entity_cell, self._positions = cells, positions
+
+    def _move(self, entity: int, cell: Tuple[int, int]):
+        old = self._entity_cell[entity]
+        if old[0] == _NO_CELL:
+            self._count += 1
+        else:
+            self._discard_from_cell(entity, (int(old[0]), int(old[1])))
+        self._cells.setdefault(cell, set()).add(entity)
+
+    def _discard_from_cell(self, entity: int, cell: Tuple[int, int]):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(entity)
+            if not bucket:
+                del self._cells[cell]
+
+    def remove(self, entity: int):
+        if entity >= len(self._entity_cell) or self._entity_cell[entity, 0] == _NO_CELL:
+            return
+        cell = self._entity_cell[entity]
+        self._discard_from_cell(entity, (int(cell[0]), int(cell[1])))
+        self._entity_cell[entity] = _NO_CELL
+        self._count -= 1
+
+    def _drop_missing(self, entities: np.ndarray):
+        """Убирает сущности, у которых пропал компонент transform."""
+        indexed = np.flatnonzero(self._entity_cell[:, 0] != _NO_CELL)
+        for entity in np.setdiff1d(indexed, entities, assume_unique=True).tolist():
+            self.remove(entity)
+
+    def _on_entity_destroyed(self, entity_id: int):
+        self.remove(entity_id)
+
+    # --- Запросы ---
+
+    def _cell_range(self, low: Sequence[float], high: Sequence[float]):
+        x0, y0 = math.floor(low[0] / self.cell_size), math.floor(low[1] / self.cell_size)
+        x1, y1 = math.floor(high[0] / self.cell_size), math.floor(high[1] / self.cell_size)
+        return x0, y0, x1, y1
+
+    def _candidates(self, low: Sequence[float], high: Sequence[float]) -> np.ndarray:
+        x0, y0, x1, y1 = self._cell_range(low, high)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            # Область больше занятой части сетки: дешевле перебрать занятые ячейки.
+            buckets = [
+                bucket for (cx, cy), bucket in self._cells.items()
+                if x0 <= cx <= x1 and y0 <= cy <= y1
+            ]
+        else:
+            cells = self._cells
+            buckets = [
+                cells[(cx, cy)] for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)
+                if (cx, cy) in cells
+            ]
+        if not buckets:
+            return _EMPTY
+        return np.fromiter((entity for bucket in buckets for entity in bucket), dtype=np.int64,
+                           count=sum(len(bucket) for bucket in buckets))
+
+    def query_radius(self, center: Sequence[float], radius: float) -> np.ndarray:
+        """Сущности на расстоянии не больше radius от center (в 3D)."""
+        center = np.asarray(center, dtype=np.float64)
+        candidates = self._candidates(center[:2] - radius, center[:2] + radius)
+        if not len(candidates):
+            return candidates
+        offsets = self._positions[candidates] - center
+        return candidates[np.einsum("ij,ij->i", offsets, offsets) <= radius * radius]
+
+    def query_box(self, low: Sequence[float], high: Sequence[float]) -> np.ndarray:
+        """Сущности внутри осевого параллелепипеда [low, high]."""
+        low = np.asarray(low, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        candidates = self._candidates(low, high)
+        if not len(candidates):
+            return candidates
+        positions = self._positions[candidates]
+        return candidates[np.all((positions >= low) & (positions <= high), axis=1)]
+
+    def query_nearest(self, center: Sequence[float], k: int, max_radius: Optional[float] = None) -> np.ndarray:
+        """До k ближайших к center сущностей, отсортированных по расстоянию."""
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        center = np.asarray(center, dtype=np.float64)
+        if self._tree is not None:
+            found = self.query_nearest_batch(center[None, :], k, max_radius)[0]
+            return found[found >= 0]
+
+        # Расширяем радиус поиска по сетке, пока k-я найденная точка не окажется внутри него.
+        radius = self.cell_size
+        limit = max_radius if max_radius is not None else math.inf
+        while True:
+            search = min(radius, limit)
+            candidates = self.query_radius(center, search)
+            exhausted = search >= limit or len(candidates) == self._count
+            if len(candidates) >= k or exhausted:
+                offsets = self._positions[candidates] - center
+                distances = np.einsum("ij,ij->i", offsets, offsets)
+                order = np.argsort(distances, kind="stable")[:k]
+                if exhausted or distances[order[-1]] <= search * search:
+                    return candidates[order]
+            radius *= 2
+
+    def query_radius_batch(self, centers: Sequence[Sequence[float]], radius: float) -> List[np.ndarray]:
+        """query_radius для массива центров формы (n, 3)."""
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        if self._tree is None:
+            return [self.query_radius(center, radius) for center in centers]
+        return [self._entities[np.asarray(found, dtype=np.int64)]
+                for found in self._tree.query_ball_point(centers, radius)]
+
+    def query_nearest_batch(self, centers: Sequence[Sequence[float]], k: int,
+                            max_radius: Optional[float] = None) -> np.ndarray:
+        """
+        k ближайших сущностей для каждого центра: массив формы (n, k),
+        недостающие соседи помечены -1.
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        if k <= 0:
+            return np.empty((len(centers), 0), dtype=np.int64)
+        result = np.full((len(centers), k), -1, dtype=np.int64)
+        if self._tree is None:
+            for row, center in enumerate(centers):
+                found = self.query_nearest(center, k, max_radius)
+                result[row, :len(found)] = found
+            return result
+        if not len(self._entities):
+            return result
+        upper = max_radius if max_radius is not None else np.inf
+        _, indices = self._tree.query(centers, k=k, distance_upper_bound=upper)
+        indices = np.asarray(indices).reshape(len(centers), k)
+        found = indices < len(self._entities)
+        result[found] = self._entities[indices[found]]
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "entities": self._count,
+            "cells": len(self._cells),
+            "cell_moves": self.cell_moves,
+            "kdtree": self._tree is not None,
+        }
@@ -1,57 +1,141 @@
-from typing import Dict
-from .events import EventManager
+from typing import Callable, Dict, List, Optional, Tuple
 
-class Entity:
-    """
-    Базовый класс для любого объекта в игровом мире.
-    В полноценной реализации это будет часть ECS.
-    """
-    def __init__(self, entity_id: int):
-        self.id = entity_id
-        self.position = (0, 0, 0)
+import numpy as np
 
-    def __repr__(self):
-        return f"<Entity {self.id}>"
+from .components import ANIMATION, PLAYER, TRANSFORM, ComponentStorage, intersect
+from .events import EventManager
+
+System = Callable[["World", float], None]
 
 
 class World:
     """
-    Управляет состоянием всех сущностей в игровом мире.
+    Управляет состоянием всех сущностей в игровом мире (ECS).
+    Сущность - целочисленный индекс, компоненты хранятся в колонках NumPy
+    (ComponentStorage), системы обрабатывают целые колонки за такт.
     """
 
     def __init__(self, event_manager: EventManager):
         self.event_manager = event_manager
-        self.entities: Dict[int, Entity] = {}
-        self._next_entity_id = 1
-        
+        self.components: Dict[str, ComponentStorage] = {}
+        self.systems: List[System] = []
+        self._lod_systems: List[System] = []
+        # SimulationLOD (nine/core/lod.py) или None - все системы обновляют все сущности.
+        self.lod = None
+        self.time = 0.0
+        self.alive = np.zeros(64, dtype=bool)
+        self._next_entity_id = 0
+        self._free_ids: List[int] = []
+
+        self.register_component("transform", TRANSFORM)
+        self.register_component("animation", ANIMATION)
+        self.register_component("player", PLAYER)
+
         self.event_manager.subscribe("app_tick", self.update)
 
-    def create_entity(self) -> Entity:
-        """Создает новую сущность и добавляет ее в мир."""
-        entity_id = self._next_entity_id
-        self._next_entity_id += 1
-        
-        entity = Entity(entity_id)
-        self.entities[entity_id] = entity
-        
-        self.event_manager.post("entity_created", entity)
-        print(f"Создана сущность {entity.id}")
-        return entity
+    # --- Компоненты ---
+
+    def register_component(self, name: str, dtype: np.dtype) -> ComponentStorage:
+        """Регистрирует тип компонента по его структурному dtype."""
+        if name not in self.components:
+            self.components[name] = ComponentStorage(name, dtype)
+        return self.components[name]
+
+    def storage(self, name: str) -> ComponentStorage:
+        return self.components[name]
+
+    def add_component(self, entity_id: int, name: str, **values):
+        self.components[name].add(entity_id, **values)
+
+    def set_component(self, entity_id: int, name: str, **values):
+        self.components[name].set(entity_id, **values)
+
+    def get_component(self, entity_id: int, name: str) -> Optional[dict]:
+        storage = self.components[name]
+        return storage.get(entity_id) if entity_id in storage else None
+
+    def remove_component(self, entity_id: int, name: str):
+        self.components[name].remove(entity_id)
+
+    def query(self, *names: str, entities: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Возвращает сущности со всеми указанными компонентами и
+        плотные индексы в каждом хранилище для индексации колонок.
+        entities ограничивает выборку заданными сущностями.
+        """
+        storages = [self.components[name] for name in names]
+        if entities is None:
+            entities = intersect(storages)
+        else:
+            entities = np.asarray(entities, dtype=np.int64)
+            for storage in storages:
+                entities = entities[storage.indices(entities) >= 0]
+        return entities, {name: storage.indices(entities) for name, storage in zip(names, storages)}
+
+    # --- Сущности ---
+
+    def create_entity(self) -> int:
+        """Создает новую сущность и возвращает ее ID."""
+        if self._free_ids:
+            entity_id = self._free_ids.pop()
+        else:
+            entity_id = self._next_entity_id
+            self._next_entity_id += 1
+            if entity_id >= len(self.alive):
+                alive = np.zeros(len(self.alive) * 2, dtype=bool)
+                alive[:len(self.alive)] = self.alive
+                self.alive = alive
+        self.alive[entity_id] = True
+
+        self.event_manager.post("entity_created", entity_id)
+        return entity_id
 
     def destroy_entity(self, entity_id: int):
-        """Удаляет сущность из мира."""
-        if entity_id in self.entities:
-            entity = self.entities.pop(entity_id)
-            self.event_manager.post("entity_destroyed", entity)
-            print(f"Удалена сущность {entity.id}")
+        """Удаляет сущность и все ее компоненты из мира."""
+        if entity_id < len(self.alive) and self.alive[entity_id]:
+            for storage in self.components.values():
+                storage.remove(entity_id)
+            self.alive[entity_id] = False
+            self._free_ids.append(entity_id)
+            self.event_manager.post("entity_destroyed", entity_id)
 
-    def get_entity(self, entity_id: int) -> Entity:
-        """Возвращает сущность по ее ID."""
-        return self.entities.get(entity_id)
+    def has_entity(self, entity_id: int) -> bool:
+        return entity_id < len(self.alive) and bool(self.alive[entity_id])
 
-    def update(self, dt: float):
+    # --- Системы ---
+
+    def add_system(self, system: System, lod: bool = False):
         """
-        Основной цикл обновления мира.
+        Добавляет систему: system(world, dt) вызывается каждый такт.
+        Система с lod=True вызывается как system(world, dt, entities) только для
+        сущностей, активных на этом такте по уровню детализации (entities=None - все).
         """
-        pass
+        if system not in self.systems:
+            self.systems.append(system)
+        if lod and system not in self._lod_systems:
+            self._lod_systems.append(system)
+
+    def remove_system(self, system: System):
+        if system in self.systems:
+            self.systems.remove(system)
+        if system in self._lod_systems:
+            self._lod_systems.remove(system)
 
+    def update(self, data=None):
+        """
+        Основной цикл обновления мира.
+        """
+        dt = data.get("delta_time", 0.0) if isinstance(data, dict) else 0.0
+        self.time += dt
+        if self.lod is not None:
+            self.lod.update_buckets(self, dt)
+        for system in self.systems:
+            try:
+                if system not in self._lod_systems:
+                    system(self, dt)
+                elif self.lod is not None:
+                    self.lod.run(system, self)
+                else:
+                    system(self, dt, None)
+            except Exception as e:
+                print(f"Ошибка в системе мира '{getattr(system, '__name__', system)}': {e}")
@@ -1,19 +1,199 @@
+import json
+import time
+from typing import Dict, Iterable, Optional
+
+from nine.core.chatlog import ChatLog, parse_cursor
 from nine.core.plugins import BasePlugin
 
+GLOBAL = "global"
+LOCAL = "local"
+PRIVATE = "private"
+SYSTEM = "system"
+
+# Короткие команды в тексте сообщения: "/l текст", "/w имя текст".
+COMMANDS = {"/g": GLOBAL, "/l": LOCAL, "/w": PRIVATE}
+
+
+class TokenBucket:
+    """Ограничение частоты: burst сообщений подряд, затем rate сообщений в секунду."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
 class ChatPlugin(BasePlugin):
     """
-    Плагин для кастомизации чата.
-    Основная логика чата теперь находится в server.py.
-    Этот плагин можно использовать для изменения цветов,
-    добавления команд или другой кастомизации.
+    Серверный чат: каналы global (все игроки), local (игроки в радиусе
+    proximity_radius от отправителя, через пространственный индекс) и
+    private (отправитель и адресат по имени).
+
+    Клиент присылает {"type": "chat_message", "message", "channel", "to"};
+    канал можно выбрать и командой в начале текста (COMMANDS). У каждого
+    игрока свой TokenBucket. Сообщение канала кодируется в JSON один раз,
+    и те же байты ставятся в очередь всем получателям: кадры chat_broadcast
+    уходят вместе с world_state ближайшего такта (NetworkManager.queue_payload).
+
+    Сообщения каналов сохраняются в ChatLog. Запрос {"type": "chat_history",
+    "channel", "before", "after", "limit", "cursor"} возвращает страницу
+    истории (chat_history) с курсором следующей страницы; global доступен
+    всем, остальные каналы - модераторам.
+    Настройки - секция "chat" в server_config.json.
     """
     name = "Chat"
+    plugin_type = "server"
 
     def on_load(self):
-        # В будущем здесь можно будет подписаться на события,
-        # например, 'chat_message_broadcasted', чтобы изменить сообщение
-        # или добавить префикс.
-        print(f"Плагин '{self.name}' загружен (логика в ядре).")
+        config = getattr(self.app, "chat_config", {})
+        self.rate = config.get("rate", 1.0)
+        self.burst = config.get("burst", 5)
+        self.proximity_radius = config.get("proximity_radius", 30.0)
+        self.max_length = config.get("max_length", 256)
+        self.page_size = config.get("history_page_size", 50)
+        self.moderators = set(config.get("moderators", []))
+        self.history = ChatLog(
+            config.get("history_dir", "chat_history"),
+            segment_bytes=config.get("history_segment_kb", 4096) * 1024,
+            retention_days=config.get("history_retention_days", 30),
+            log=self.app.logger,
+        )
+        self.buckets: Dict[int, TokenBucket] = {}
+        self.sent = 0
+        self.delivered = 0
+        self.rejected = 0
+
+        self.event_manager.subscribe("server_on_chat_message", self.on_chat_message)
+        self.event_manager.subscribe("server_on_chat_history", self.on_chat_history)
+        self.event_manager.subscribe("network_client_disconnected", self.on_client_disconnected)
+        print(f"Плагин '{self.name}' загружен.")
 
     def on_unload(self):
-        pass
+        self.event_manager.unsubscribe("server_on_chat_message", self.on_chat_message)
+        self.event_manager.unsubscribe("server_on_chat_history", self.on_chat_history)
+        self.event_manager.unsubscribe("network_client_disconnected", self.on_client_disconnected)
+        self.buckets.clear()
+        self.history.close()
+
+    def on_client_disconnected(self, event):
+        self.buckets.pop(event.client_id, None)
+
+    def on_chat_message(self, event_data: dict):
+        client_id = event_data["client_id"]
+        data = event_data["data"]
+        player_info = self.app.players.get(client_id)
+        if player_info is None:
+            return
+
+        text = str(data.get("message", "")).strip()
+        channel = data.get("channel", GLOBAL)
+        target = data.get("to")
+        command, _, rest = text.partition(" ")
+        if command in COMMANDS:
+            channel = COMMANDS[command]
+            text = rest.strip()
+            if channel == PRIVATE:
+                target, _, text = text.partition(" ")
+                text = text.strip()
+        if not text:
+            return
+
+        if not self.allow(client_id):
+            return
+
+        message = {
+            "type": "chat_broadcast",
+            "channel": channel,
+            "t": time.time(),
+            "from_id": client_id,
+            "from_name": player_info["name"],
+            "message": text[:self.max_length],
+        }
+        if channel == GLOBAL:
+            recipients = self.app.players.keys()
+        elif channel == LOCAL:
+            recipients = self.players_near(self.app.get_player_pos(client_id), self.proximity_radius)
+        elif channel == PRIVATE:
+            target_id = self.find_player(target)
+            if target_id is None:
+                self.notify(client_id, f"Игрок '{target}' не в сети.")
+                return
+            message["to_name"] = self.app.players[target_id]["name"]
+            recipients = {client_id, target_id}
+        else:
+            self.notify(client_id, f"Неизвестный канал '{channel}'.")
+            return
+        self.sent += 1
+        self.deliver(message, recipients)
+        self.history.append(channel, message)
+
+    def on_chat_history(self, event_data: dict):
+        """Страница истории канала: до limit сообщений со временем в [after, before) перед записью cursor."""
+        client_id = event_data["client_id"]
+        data = event_data["data"]
+        player_info = self.app.players.get(client_id)
+        channel = data.get("channel", GLOBAL)
+        if player_info is None or not self.allow(client_id):
+            return
+        if channel != GLOBAL and player_info["name"] not in self.moderators:
+            self.notify(client_id, f"Нет доступа к истории канала '{channel}'.")
+            return
+        try:
+            before = float(data["before"]) if data.get("before") is not None else None
+            after = float(data.get("after") or 0.0)
+            limit = max(1, min(int(data.get("limit", self.page_size)), self.page_size))
+            cursor = data.get("cursor")
+            if cursor is not None:
+                parse_cursor(str(cursor))
+        except (TypeError, ValueError):
+            return
+        messages, next_cursor = self.history.read_page(
+            channel, before=before, after=after, limit=limit, cursor=str(cursor) if cursor is not None else None)
+        self.deliver({
+            "type": "chat_history",
+            "channel": channel,
+            "messages": messages,
+            # Курсор следующей (более старой) страницы.
+            "cursor": next_cursor,
+        }, [client_id])
+
+    def allow(self, client_id: int) -> bool:
+        """Берет жетон из TokenBucket игрока; при превышении частоты сообщает об этом игроку."""
+        bucket = self.buckets.get(client_id)
+        if bucket is None:
+            bucket = self.buckets[client_id] = TokenBucket(self.rate, self.burst)
+        if bucket.take():
+            return True
+        self.rejected += 1
+        self.notify(client_id, "Слишком много сообщений, подождите немного.")
+        return False
+
+    def find_player(self, name: Optional[str]) -> Optional[int]:
+        if not name:
+            return None
+        return next((cid for cid, info in self.app.players.items() if info["name"] == name), None)
+
+    def deliver(self, message: dict, recipients: Iterable[int]):
+        """Кодирует сообщение один раз и ставит его в очередь такта всем получателям."""
+        payload = json.dumps(message).encode("utf-8")
+        for client_id in recipients:
+            self.app.network.queue_payload(client_id, payload, message["type"])
+            self.delivered += 1
+
+    def notify(self, client_id: int, text: str):
+        self.deliver({"type": "chat_broadcast", "channel": SYSTEM, "from_name": "Сервер", "message": text}, [client_id])
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "delivered": self.delivered, "rejected": self.rejected, "history": self.history.stats()}
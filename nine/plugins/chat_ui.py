@@ -2,6 +2,9 @@ from direct.showbase.DirectObject import DirectObject
 from nine.core.plugins import BasePlugin
 from nine.ui.chat_window import ChatWindow
 
+# Подписи каналов серверного чата (плагин Chat); global показывается без подписи.
+CHANNEL_LABELS = {"local": "Рядом", "private": "ЛС", "system": "Сервер"}
+
 class ChatUIPlugin(BasePlugin, DirectObject):
     name = "Chat UI"
     plugin_type = "client"
@@ -35,7 +38,14 @@ class ChatUIPlugin(BasePlugin, DirectObject):
 
     def add_incoming_message(self, data: dict):
         """Called by the EventManager when a network message arrives."""
-        self.ui_window.add_message(data['sender'], data['message'])
+        sender = data['sender']
+        label = CHANNEL_LABELS.get(data.get('channel'))
+        if data.get('channel') == "system":
+            sender = f"[{label}]"
+        elif label:
+            to = f" -> {data['to']}" if data.get('to') else ""
+            sender = f"[{label}] {sender}{to}"
+        self.ui_window.add_message(sender, data['message'])
     
     def is_active(self) -> bool:
         """Is the chat input currently active?"""
@@ -15,7 +15,9 @@ class HealthPlugin(BasePlugin):
     DEFAULT_HEALTH = 100
 
     def on_load(self):
-        self.health_data = {}  # {player_uuid: int}
+        self.health_data = self.create_cache(
+            "health", max_entries=1024, ttl=3600, write_through="health"
+        )  # {player_uuid: int}
         print(f"Плагин '{self.name}' загружен (функциональность отключена).")
 
     # def on_message_received(self, event: MessageReceivedEvent):
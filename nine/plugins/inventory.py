@@ -14,7 +14,9 @@ class InventoryPlugin(BasePlugin):
     name = "Inventory"
 
     def on_load(self):
-        self.inventories = {}  # {player_uuid: [items]}
+        self.inventories = self.create_cache(
+            "inventories", max_entries=1024, max_weight=8 * 1024 * 1024, write_through="inventory"
+        )  # {player_uuid: [items]}
         print(f"Плагин '{self.name}' загружен (функциональность отключена).")
 
     # def on_message_received(self, event: MessageReceivedEvent):
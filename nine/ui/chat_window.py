@@ -1,8 +1,9 @@
 # nine/ui/chat_window.py
+import heapq
 import time
 import logging
 from collections import deque
-from typing import Callable
+from typing import Callable, List, Tuple
 
 from direct.gui.DirectGui import DirectScrolledFrame, DirectEntry
 from panda3d.core import TextNode, LColor, NodePath
@@ -12,18 +13,31 @@ from .base_component import BaseUIComponent
 logger = logging.getLogger(__name__)
 
 class ChatMessage:
-    """Обертка для одного сообщения в чате, хранящая NodePath и метаданные."""
-    def __init__(self, text_node_path: NodePath, created_at: float):
+    """
+    Обертка для одного сообщения в чате, хранящая NodePath и метаданные.
+    step - измеренная один раз высота строки вместе с отступом до следующей.
+    """
+    def __init__(self, text_node_path: NodePath, created_at: float, step: float):
         self.node_path = text_node_path
         self.created_at = created_at
+        self.step = step
+        self.fading = False
+        self.removed = False
 
     def destroy(self):
+        self.removed = True
         self.node_path.removeNode()
 
 class ChatWindow(BaseUIComponent):
     """
     Управляет отображением окна чата, сообщений и поля ввода.
     Использует DirectScrolledFrame для надежной прокрутки.
+
+    Раскладка инкрементальная: высота сообщения измеряется один раз при
+    добавлении, новое сообщение ставится под последним, а при удалении
+    старейшего весь список сдвигается одним узлом lines. Исчезновение
+    управляется очередью сроков (heapq): пока ближайший срок не наступил и
+    ничего не исчезает, задача кадра ограничивается одним сравнением.
     """
     def __init__(self, ui_manager):
         super().__init__(ui_manager)
@@ -39,6 +53,13 @@ class ChatWindow(BaseUIComponent):
 
         # --- Состояние ---
         self.messages: deque[ChatMessage] = deque()
+        # (время начала исчезновения, номер, сообщение)
+        self._deadlines: List[Tuple[float, int, ChatMessage]] = []
+        self._fading: List[ChatMessage] = []
+        self._sequence = 0
+        # Позиция следующей строки и сдвиг списка после удаления старых сообщений.
+        self._next_z = -self.line_height
+        self._scroll_offset = 0.0
         self._is_input_visible = False
         self.on_send_callback: Callable[[str], None] = None
 
@@ -56,6 +77,7 @@ class ChatWindow(BaseUIComponent):
             autoHideScrollBars=True,
         ))
         self.canvas = self.history_frame.getCanvas()
+        self.lines = self.canvas.attach_new_node("chat_lines")
 
         self.input = self._add_element('input', DirectEntry(
             parent=self.root,
@@ -90,8 +112,7 @@ class ChatWindow(BaseUIComponent):
 
         # Удаляем старые сообщения из истории, если превышен лимит
         if len(self.messages) >= self.max_messages:
-            old_chat_message = self.messages.popleft()
-            old_chat_message.destroy()
+            self._remove_oldest()
 
         # Создаем TextNode
         text = f"{sender}: {message_text}"
@@ -101,41 +122,59 @@ class ChatWindow(BaseUIComponent):
         tn.set_wordwrap((self.chat_width - 0.05) / self.text_scale)
         tn.setText(text)
         
-        text_node_path = self.canvas.attach_new_node(tn)
+        text_node_path = self.lines.attach_new_node(tn)
         text_node_path.set_scale(self.text_scale)
-        text_node_path.set_pos(0.02, 0, 0)
-        
-        new_chat_message = ChatMessage(text_node_path, time.time())
+        text_node_path.set_pos(0.02, 0, self._next_z)
+        min_b, max_b = text_node_path.get_tight_bounds()
+        step = max_b.z - min_b.z + self.line_height * 0.2  # already scaled
+
+        now = time.time()
+        new_chat_message = ChatMessage(text_node_path, now, step)
         self.messages.append(new_chat_message)
-        
-        self._redraw_messages()
-
-    def _redraw_messages(self):
-        y_pos = -self.line_height
-        for chat_message in self.messages:
-            chat_message.node_path.set_z(y_pos)
-            min_b, max_b = chat_message.node_path.get_tight_bounds()
-            height = max_b.z - min_b.z # already scaled
-            y_pos -= height + self.line_height * 0.2
-        
-        self.history_frame['canvasSize'] = (0, self.chat_width - 0.05, y_pos, 0)
+        self._sequence += 1
+        heapq.heappush(self._deadlines, (now + self.message_lifetime, self._sequence, new_chat_message))
+
+        self._next_z -= step
+        self._update_canvas()
+
+    def _remove_oldest(self):
+        chat_message = self.messages.popleft()
+        chat_message.destroy()
+        if chat_message.fading:
+            self._fading.remove(chat_message)
+        # Остальные сообщения поднимаются на высоту удаленного одним сдвигом узла.
+        self._scroll_offset += chat_message.step
+        self.lines.set_z(self._scroll_offset)
+        if not self.messages:
+            self._next_z = -self.line_height
+            self._scroll_offset = 0.0
+            self.lines.set_z(0)
+        self._update_canvas()
+
+    def _update_canvas(self):
+        self.history_frame['canvasSize'] = (0, self.chat_width - 0.05, self._next_z + self._scroll_offset, 0)
         self.history_frame.verticalScroll.setValue(0)
 
     def _update_fade(self, task):
         now = time.time()
-        # Создаем копию списка, чтобы безопасно изменять его во время итерации
-        for chat_message in list(self.messages):
-            age = now - chat_message.created_at
-            if age > self.message_lifetime:
-                fade_progress = (age - self.message_lifetime) / self.fade_duration
-                alpha = max(0, 1.0 - fade_progress)
-                chat_message.node_path.set_alpha_scale(alpha)
-                if alpha == 0: # Полностью исчезнувшее сообщение
-                    self.messages.remove(chat_message)
-                    chat_message.destroy()
-                    self._redraw_messages() # Перерисовать, так как сообщение удалено
-            else:
-                chat_message.node_path.set_alpha_scale(1) # Убедимся, что новые сообщения непрозрачны
+        deadlines = self._deadlines
+        if not self._fading and (not deadlines or deadlines[0][0] > now):
+            return task.cont
+
+        while deadlines and deadlines[0][0] <= now:
+            chat_message = heapq.heappop(deadlines)[2]
+            if not chat_message.removed:
+                chat_message.fading = True
+                self._fading.append(chat_message)
+
+        for chat_message in self._fading:
+            fade_progress = (now - chat_message.created_at - self.message_lifetime) / self.fade_duration
+            chat_message.node_path.set_alpha_scale(max(0.0, 1.0 - fade_progress))
+
+        # Время жизни у всех сообщений одинаковое, поэтому исчезают они по порядку, начиная со старейшего.
+        while self.messages and self.messages[0].fading and \
+                now - self.messages[0].created_at >= self.message_lifetime + self.fade_duration:
+            self._remove_oldest()
         return task.cont
 
     def toggle_input(self):
@@ -156,5 +195,7 @@ class ChatWindow(BaseUIComponent):
         self.base.taskMgr.remove("chat_fade_task")
         while self.messages:
             self.messages.popleft().destroy()
+        self._deadlines.clear()
+        self._fading.clear()
         super().destroy()
         logger.info("Компонент ChatWindow уничтожен.")
\ No newline at end of file
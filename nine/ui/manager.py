@@ -18,6 +18,7 @@ class UIManager:
         self.base = base
         self.callbacks = callbacks # Callbacks из client.py
         self.loader = base.loader
+        self.archives = getattr(base, "archives", None)
         
         # Настройка стилей по умолчанию
         self.font = self._load_font()
@@ -32,9 +33,13 @@ class UIManager:
         """Создает компоненты, которые должны существовать всегда."""
         pass
 
+    def resolve_asset(self, path: str) -> str:
+        """Путь ресурса с учетом упакованных архивов (AssetLibrary)."""
+        return self.archives.resolve(path) if self.archives is not None else path
+
     def _load_font(self):
         """Загружает кастомный шрифт."""
-        font_path = "nine/assets/fonts/DejaVuSans.ttf"
+        font_path = self.resolve_asset("nine/assets/fonts/DejaVuSans.ttf")
         try:
             font = self.loader.loadFont(font_path)
             font.setPixelsPerUnit(100)
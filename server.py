@@ -4,12 +4,22 @@ import logging
 import time
 import uuid
 from itertools import cycle
+from pathlib import Path
 
 from nine.core.app import Application
+from nine.core.components import ANIM_IDLE, ANIM_STATES, ANIM_WALK
+from nine.core.content import AssetDistributor, AssetManifest, plugin_asset_files
 from nine.core.database import DatabaseManager
+from nine.core.lod import SimulationLOD
+from nine.core.metrics import MetricsServer
+from nine.core.movement import InputSimulation, MovementValidator
+from nine.core.navigation import NavGrid, PathService
 from nine.core.network import (ClientConnectedEvent, ClientDisconnectedEvent,
                                MessageReceivedEvent, NetworkManager)
+from nine.core.npc import NPCSystem
 from nine.core.plugins import PluginManager
+from nine.core.spatial import SpatialIndex
+from nine.core.world import World
 
 
 class ServerApp(Application):
@@ -29,13 +39,111 @@ class ServerApp(Application):
 
         self.host = config.get("host", "localhost")
         self.port = config.get("port", 9009)
-        self.tick_rate = config.get("tick_rate", 20)
+        self.tick_rate = config.get("tick_rate", 10)
         self.allow_dev_client = config.get("allow_dev_client", False)
-
-        self.network = NetworkManager(self.event_manager)
-        self.db = DatabaseManager()
+        self.work_scheduler.budget = config.get("tick_budget_ms", 5) / 1000
+        self.auto_save_interval = config.get("auto_save_interval", 300)
+
+        self.metrics_config = config.get("metrics", {})
+        self.metrics_server = None
+        self.event_manager.handler_time = self.metrics.histogram(
+            "nine_event_handler_seconds", "Длительность обработчиков событий", ("event", "handler"))
+        self.tick_seconds = self.metrics.histogram("nine_tick_seconds", "Длительность такта сервера (app_tick и бюджетные задачи)")
+        self.tick_overruns = self.metrics.counter("nine_tick_overruns_total", "Такты, которые длились дольше интервала такта")
+        self.tick_interval_seconds = self.metrics.histogram("nine_tick_interval_seconds", "Фактический интервал между тактами")
+        self.loop_lag_seconds = self.metrics.histogram(
+            "nine_event_loop_lag_seconds", "Задержка цикла asyncio: насколько позже срока просыпается основной цикл")
+        self.auth_seconds = self.metrics.histogram("nine_auth_seconds", "Длительность обработки входа", ("type",))
+        self.autosave_seconds = self.metrics.histogram(
+            "nine_autosave_seconds", "Длительность автосохранения игроков в базу", buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+        self.world_state_seconds = self.metrics.histogram(
+            "nine_world_state_seconds", "Сборка и отправка world_state за такт")
+
+        self.network = NetworkManager(self.event_manager, self.metrics)
+        capture_config = config.get("capture", {})
+        if capture_config.get("enabled"):
+            self.network.start_capture(
+                Path(capture_config.get("dir", "captures")) / f"{time.strftime('%Y%m%d-%H%M%S')}.ncap")
+        self.db = DatabaseManager(metrics=self.metrics)
         self.plugin_manager = PluginManager(self, self.event_manager)
-
+        self.world = World(self.event_manager)
+
+        movement_config = config.get("movement", {})
+        world_bounds = movement_config.get("world_bounds", [[-50, -50, -10], [50, 50, 100]])
+        # Проверка скорости, границ и телепортаций: для позиций, рассчитанных
+        # InputSimulation по командам ввода, и для устаревших сообщений move.
+        self.movement_validator = MovementValidator(
+            self.world,
+            max_speed=movement_config.get("max_speed", 10.0),
+            tolerance=movement_config.get("speed_tolerance", 1.5),
+            teleport_distance=movement_config.get("teleport_distance", 25.0),
+            bounds=world_bounds,
+            on_corrections=self.send_position_corrections,
+        )
+        self.input_simulation = InputSimulation(
+            self.world,
+            sim_rate=movement_config.get("sim_rate", 30),
+            move_speed=movement_config.get("max_speed", 10.0),
+            max_burst_steps=movement_config.get("input_burst_steps", 2),
+            bounds=world_bounds,
+            validator=self.movement_validator,
+        )
+        world_config = config.get("world", {})
+        # Описание мира для потоковой загрузки чанков на клиенте (отправляется в welcome).
+        self.world_descriptor = {
+            "chunk_size": world_config.get("chunk_size", 25.0),
+            "bounds": world_bounds,
+            "chunks": world_config.get("chunks", {}),
+        }
+
+        spatial_config = config.get("spatial", {})
+        self.spatial = SpatialIndex(
+            self.world,
+            cell_size=spatial_config.get("cell_size", 8.0),
+            use_kdtree=spatial_config.get("use_kdtree", True),
+        )
+        npc_config = config.get("npc", {})
+        self.path_service = PathService(
+            NavGrid.from_bounds(world_bounds, npc_config.get("cell_size", 1.0), npc_config.get("obstacles", [])),
+            workers=npc_config.get("path_workers", 2),
+            batch_size=npc_config.get("path_batch_size", 32),
+        )
+        self.caches.register("navigation", self.path_service.cache)
+        self.npcs = NPCSystem(self.world, self.path_service)
+        self.npc_report_interval = npc_config.get("report_interval", 60)
+        self.metrics.gauge_callback("nine_npcs", "NPC по состоянию", self._npc_counts, ("state",))
+        self.metrics.gauge_callback("nine_path_queue_depth", "Запросы путей, ожидающие отправки в пул процессов",
+                                    lambda: self.path_service.queue_depth)
+        self.metrics.gauge_callback("nine_path_cache_hit_rate", "Доля запросов путей, найденных в кэше",
+                                    lambda: self.path_service.cache.hit_rate)
+        self.metrics.gauge_callback("nine_path_solve_seconds", "Среднее время поиска пути A*",
+                                    lambda: self.path_service.stats()["avg_solve_ms"] / 1000)
+
+        self.world.add_system(self.input_simulation.simulate)
+        self.world.add_system(self.movement_validator.validate)
+        self.world.add_system(self.check_idle_players)
+        self.world.add_system(self.npcs.update, lod=True)
+        self.world.add_system(self.spatial.update)
+        self.spawn_npcs(npc_config.get("count", 0))
+
+        lod_config = config.get("lod", {})
+        if lod_config.get("enabled", True):
+            self.world.lod = SimulationLOD(
+                self.spatial,
+                near_radius=lod_config.get("near_radius", 30.0),
+                mid_radius=lod_config.get("mid_radius", 80.0),
+                mid_interval=lod_config.get("mid_interval", 4),
+            )
+        self.lod_report_interval = lod_config.get("report_interval", 60)
+
+        # Раздача ресурсов плагинов клиентам; манифест строится после загрузки плагинов.
+        self.assets_config = config.get("assets", {})
+        self.asset_distributor = None
+        # Настройки чата для плагина Chat.
+        self.chat_config = config.get("chat", {})
+
+        # {client_id: {"name", "uuid", "entity", "is_dev"}}; позиция, вращение
+        # и анимация игрока хранятся в компонентах self.world.
         self.players = {}
         self.client_id_to_uuid = {}
         
@@ -58,6 +166,8 @@ class ServerApp(Application):
 
     def on_client_disconnected(self, event: ClientDisconnectedEvent):
         client_id = event.client_id
+        if self.asset_distributor is not None:
+            self.asset_distributor.cancel(client_id)
         player_uuid = self.client_id_to_uuid.get(client_id)
         
         if player_uuid and client_id in self.players:
@@ -67,18 +177,27 @@ class ServerApp(Application):
             is_dev_client = player_info.get("is_dev", False)
 
             if not is_dev_client:
-                self.db.set_player_attribute(player_uuid, "pos", player_info["pos"])
-                self.db.set_player_attribute(player_uuid, "name", player_name)
+                self._save_player(client_id)
                 print(f"Данные для игрока '{player_name}' ({player_uuid}) сохранены.")
             
-            del self.players[client_id]
-            del self.client_id_to_uuid[client_id]
+            self._remove_player(client_id)
             
             leave_data = {"type": "player_left", "id": client_id}
             self.asyncio_loop.create_task(self.network.broadcast(leave_data))
             print(f"Игрок {player_name} ({client_id}) отключился.")
 
     def on_message_received(self, event: MessageReceivedEvent):
+        msg_type = event.data.get("type")
+        if msg_type not in ("auth", "dev_auth"):
+            self._handle_message(event)
+            return
+        started = time.perf_counter()
+        try:
+            self._handle_message(event)
+        finally:
+            self.auth_seconds.labels(msg_type).observe(time.perf_counter() - started)
+
+    def _handle_message(self, event: MessageReceivedEvent):
         client_id = event.client_id
         data = event.data
         msg_type = data.get("type")
@@ -118,24 +237,27 @@ class ServerApp(Application):
                 old_writer = self.network.clients.get(old_client_id)
                 if old_writer:
                     old_writer.close()
-                if old_client_id in self.players: del self.players[old_client_id]
-                if old_client_id in self.client_id_to_uuid: del self.client_id_to_uuid[old_client_id]
+                self._remove_player(old_client_id)
 
             db_attributes = self.db.get_player_all_attributes(player_uuid)
             spawn_pos = db_attributes.get("pos", next(self.spawn_points))
 
-            self.players[client_id] = {"name": player_name, "pos": spawn_pos, "uuid": player_uuid, "rot": (0, 0, 0), "anim_state": "idle", "last_move_time": time.time()}
-            self.client_id_to_uuid[client_id] = player_uuid
+            self._add_player(client_id, player_name, player_uuid, spawn_pos)
 
             welcome_data = {
                 "type": "welcome",
                 "id": client_id,
                 "pos": spawn_pos,
-                "players": {cid: p_info for cid, p_info in self.players.items() if cid != client_id}
+                "sim_rate": self.input_simulation.sim_rate,
+                "move_speed": self.input_simulation.move_speed,
+                "tick_rate": self.tick_rate,
+                "world": self.world_descriptor,
+                "assets": self.asset_manifest(),
+                "players": {cid: self.player_state(cid) for cid in self.players if cid != client_id}
             }
             self.asyncio_loop.create_task(self.network.send_message(client_id, welcome_data))
 
-            join_data = {"type": "player_joined", "id": client_id, "player_info": self.players[client_id]}
+            join_data = {"type": "player_joined", "id": client_id, "player_info": self.player_state(client_id)}
             self.asyncio_loop.create_task(self.network.broadcast(join_data, exclude_ids=[client_id]))
 
         elif msg_type == "dev_auth" and self.allow_dev_client:
@@ -143,26 +265,33 @@ class ServerApp(Application):
             player_uuid = str(uuid.uuid4())
 
             spawn_pos = next(self.spawn_points)
-            self.players[client_id] = {"name": player_name, "pos": spawn_pos, "uuid": player_uuid, "is_dev": True, "rot": (0, 0, 0), "anim_state": "idle", "last_move_time": time.time()}
-            self.client_id_to_uuid[client_id] = player_uuid
+            self._add_player(client_id, player_name, player_uuid, spawn_pos, is_dev=True)
 
             welcome_data = {
                 "type": "welcome",
                 "id": client_id,
                 "pos": spawn_pos,
-                "players": {cid: p_info for cid, p_info in self.players.items() if cid != client_id},
+                "sim_rate": self.input_simulation.sim_rate,
+                "move_speed": self.input_simulation.move_speed,
+                "tick_rate": self.tick_rate,
+                "world": self.world_descriptor,
+                "assets": self.asset_manifest(),
+                "players": {cid: self.player_state(cid) for cid in self.players if cid != client_id},
             }
             self.asyncio_loop.create_task(self.network.send_message(client_id, welcome_data))
 
-            join_data = {"type": "player_joined", "id": client_id, "player_info": self.players[client_id]}
+            join_data = {"type": "player_joined", "id": client_id, "player_info": self.player_state(client_id)}
             self.asyncio_loop.create_task(self.network.broadcast(join_data, exclude_ids=[client_id]))
 
         elif client_id in self.players:
-            if msg_type == "move":
-                self.players[client_id]["pos"] = data.get("pos", (0,0,0))
-                self.players[client_id]["rot"] = data.get("rot", (0,0,0))
-                self.players[client_id]["anim_state"] = "walk"
-                self.players[client_id]["last_move_time"] = time.time()
+            if msg_type == "input":
+                self.input_simulation.submit(self.players[client_id]["entity"], data.get("commands", []))
+            elif msg_type == "asset_request":
+                if self.asset_distributor is not None:
+                    self.asset_distributor.request(client_id, data.get("hashes", []))
+            elif msg_type == "move":
+                entity = self.players[client_id]["entity"]
+                self.movement_validator.submit(entity, data.get("pos", (0,0,0)), data.get("rot", (0,0,0)))
             else:
                 event_name = f"server_on_{msg_type}"
                 event_data = {
@@ -172,67 +301,250 @@ class ServerApp(Application):
                 }
                 self.event_manager.post(event_name, event_data)
 
-    async def check_idle_players(self):
-        while self.running:
-            now = time.time()
-            for player_info in self.players.values():
-                if player_info.get("anim_state") == "walk" and now - player_info.get("last_move_time", 0) > 0.2:
-                    player_info["anim_state"] = "idle"
-            await asyncio.sleep(1)
+    def _add_player(self, client_id: int, name: str, player_uuid: str, pos, is_dev: bool = False):
+        self._remove_player(client_id)
+        entity = self.world.create_entity()
+        self.world.add_component(entity, "transform", pos=pos, rot=(0, 0, 0))
+        self.world.add_component(entity, "animation", state=ANIM_IDLE, last_move_time=time.time())
+        self.world.add_component(entity, "player", client_id=client_id)
+        self.movement_validator.track(entity)
+        self.input_simulation.track(entity)
+
+        self.players[client_id] = {"name": name, "uuid": player_uuid, "entity": entity}
+        if is_dev:
+            self.players[client_id]["is_dev"] = True
+        self.client_id_to_uuid[client_id] = player_uuid
+
+    def _remove_player(self, client_id: int):
+        player_info = self.players.pop(client_id, None)
+        if player_info:
+            self.world.destroy_entity(player_info["entity"])
+        self.client_id_to_uuid.pop(client_id, None)
+
+    def _save_player(self, client_id: int):
+        player_info = self.players[client_id]
+        self.db.set_player_attribute(player_info["uuid"], "pos", self.get_player_pos(client_id))
+        self.db.set_player_attribute(player_info["uuid"], "name", player_info.get("name"))
+
+    def asset_manifest(self) -> dict:
+        """Манифест ресурсов плагинов для welcome (пустой, пока плагины не загружены)."""
+        if self.asset_distributor is None:
+            return {"hash": None, "files": {}}
+        return self.asset_distributor.manifest.to_dict()
+
+    def get_player_pos(self, client_id: int) -> list:
+        """Текущая позиция игрока из компонента transform."""
+        return self.world.get_component(self.players[client_id]["entity"], "transform")["pos"]
+
+    def player_state(self, client_id: int) -> dict:
+        """Полное состояние одного игрока для welcome/player_joined."""
+        player_info = self.players[client_id]
+        transform = self.world.get_component(player_info["entity"], "transform")
+        animation = self.world.get_component(player_info["entity"], "animation")
+        return {
+            "name": player_info["name"],
+            "uuid": player_info["uuid"],
+            "pos": transform["pos"],
+            "rot": transform["rot"],
+            "anim_state": ANIM_STATES[animation["state"]],
+        }
+
+    def players_state(self) -> dict:
+        """Позиции, вращения и анимации всех игроков, собранные из колонок мира."""
+        _, indices = self.world.query("player", "transform", "animation")
+        client_ids = self.world.storage("player").column("client_id")[indices["player"]].tolist()
+        positions = self.world.storage("transform").column("pos")[indices["transform"]].tolist()
+        rotations = self.world.storage("transform").column("rot")[indices["transform"]].tolist()
+        anim_states = self.world.storage("animation").column("state")[indices["animation"]].tolist()
+        return {
+            client_id: {"pos": pos, "rot": rot, "anim_state": ANIM_STATES[anim]}
+            for client_id, pos, rot, anim in zip(client_ids, positions, rotations, anim_states)
+        }
+
+    def send_position_corrections(self, entities, positions):
+        """Отправляет игрокам исправленные сервером позиции."""
+        player = self.world.storage("player")
+        indices = player.indices(entities)
+        client_ids = player.column("client_id")[indices[indices >= 0]].tolist()
+        for client_id, pos in zip(client_ids, positions[indices >= 0].tolist()):
+            self.asyncio_loop.create_task(self.network.send_message(
+                client_id, {"type": "position_correction", "pos": pos}
+            ))
+
+    def spawn_npcs(self, count: int):
+        """Создает count бродящих NPC в случайных проходимых точках карты."""
+        grid = self.path_service.grid
+        for _ in range(count):
+            cell = grid.random_walkable(self.npcs.rng)
+            if cell is not None:
+                x, y = grid.cell_centers([cell])[0]
+                self.npcs.spawn((x, y, 0))
+
+    def check_idle_players(self, world: World, dt: float):
+        animation = world.storage("animation")
+        state = animation.column("state")
+        idle = (state == ANIM_WALK) & (time.time() - animation.column("last_move_time") > 0.2)
+        state[idle] = ANIM_IDLE
+
+    def world_state_payloads(self) -> dict:
+        """
+        Пакеты world_state для каждого клиента: время сервера "t" для буфера
+        интерполяции, состояние остальных игроков и подтверждение последнего
+        примененного ввода самого клиента.
+        Состояние каждого игрока кодируется в JSON один раз.
+        """
+        # Фрагменты всех игроков склеиваются один раз; пакет клиента - это общая
+        # строка без его собственного фрагмента (копия байтов, а не цикл по игрокам).
+        spans = {}
+        parts = []
+        position = 0
+        for client_id, state in self.players_state().items():
+            fragment = f'"{client_id}":{json.dumps(state)}'.encode("utf-8")
+            if parts:
+                position += 1
+            spans[client_id] = (position, position + len(fragment))
+            parts.append(fragment)
+            position += len(fragment)
+        everyone = memoryview(b",".join(parts))
+
+        header = f'{{"type":"world_state","t":{time.monotonic():.4f},"players":{{'.encode("utf-8")
+        payloads = {}
+        for client_id in self.network.clients:
+            span = spans.get(client_id)
+            if span is None:
+                before, after = everyone, b""
+            elif span[0]:
+                before, after = everyone[:span[0] - 1], everyone[span[1]:]
+            else:
+                before, after = b"", everyone[span[1] + 1:]
+            ack = b""
+            player_info = self.players.get(client_id)
+            if player_info:
+                entity = player_info["entity"]
+                ack = (',"ack":' + json.dumps({
+                    "seq": self.input_simulation.last_seq(entity),
+                    "pos": self.world.get_component(entity, "transform")["pos"],
+                })).encode("utf-8")
+            # Срезы memoryview не копируют данные: байты копируются один раз, в join.
+            payloads[client_id] = b"".join((header, before, after, b"}", ack, b"}"))
+        return payloads
 
     async def broadcast_world_state(self):
         while self.running:
             await asyncio.sleep(1 / self.tick_rate)
-            if not self.players:
-                continue
-            
-            state_data = {"type": "world_state", "players": self.players}
-            await self.network.broadcast(state_data)
-
-    async def auto_save_world(self):
-        auto_save_interval = 300
-        while self.running:
-            await asyncio.sleep(auto_save_interval)
-            
-            if not self.players:
-                continue
-
-            print(f"[{time.strftime('%H:%M:%S')}] Начало автосохранения мира...")
-            saved_count = 0
-            for client_id, player_info in self.players.items():
-                if not player_info.get("is_dev", False):
-                    player_uuid = player_info.get("uuid")
-                    try:
-                        self.db.set_player_attribute(player_uuid, "pos", player_info["pos"])
-                        self.db.set_player_attribute(player_uuid, "name", player_info.get("name"))
-                        saved_count += 1
-                    except Exception as e:
-                        print(f"Error autosaving player {player_uuid}: {e}")
-            
-            if saved_count > 0:
-                print(f"[{time.strftime('%H:%M:%S')}] Автосохранение завершено. Сохранено {saved_count} игроков.")
+            await self.send_world_state()
+
+    async def send_world_state(self):
+        if not self.players:
+            return
+        # Кадры, отложенные за такт (например, чат), уходят вместе с world_state.
+        started = time.perf_counter()
+        await self.network.flush(self.world_state_payloads())
+        self.world_state_seconds.observe(time.perf_counter() - started)
+
+    def auto_save_world(self):
+        if not self.players:
+            return
+
+        print(f"[{time.strftime('%H:%M:%S')}] Начало автосохранения мира...")
+        started = time.perf_counter()
+        saved_count = 0
+        for client_id, player_info in self.players.items():
+            if not player_info.get("is_dev", False):
+                player_uuid = player_info.get("uuid")
+                try:
+                    self._save_player(client_id)
+                    saved_count += 1
+                except Exception as e:
+                    print(f"Error autosaving player {player_uuid}: {e}")
+        self.autosave_seconds.observe(time.perf_counter() - started)
+
+        if saved_count > 0:
+            print(f"[{time.strftime('%H:%M:%S')}] Автосохранение завершено. Сохранено {saved_count} игроков.")
+
+    def report_lod(self):
+        """Пишет в лог число сущностей и время систем по уровням детализации."""
+        parts = [
+            f"{bucket}: {info['entities']} ({info['avg_ms_per_tick']:.3f} мс/такт)"
+            for bucket, info in self.world.lod.stats().items()
+        ]
+        self.logger.info("LOD симуляции - " + ", ".join(parts))
+
+    def _npc_counts(self) -> dict:
+        stats = self.npcs.stats()
+        return {
+            ("moving",): stats["moving"],
+            ("waiting_path",): stats["waiting_path"],
+            ("idle",): stats["npcs"] - stats["moving"] - stats["waiting_path"],
+        }
+
+    def report_npcs(self):
+        """Пишет в лог состояние NPC и службы поиска путей."""
+        stats = self.npcs.stats()
+        self.logger.info(
+            f"NPC: {stats['npcs']} (в движении {stats['moving']}, ждут путь {stats['waiting_path']}); "
+            f"пути: запросов {stats['requests']}, в очереди {stats['queue_depth']}, в работе {stats['in_flight']}, "
+            f"найдено {stats['solved']}, не найдено {stats['failed']}, "
+            f"попаданий в кэш {stats['cache_hit_rate']:.0%}, поиск {stats['avg_solve_ms']:.2f} мс"
+        )
 
-    async def main_loop(self):
+    async def start_systems(self, plugin_dirs=None):
+        """Загружает плагины и запускает службы сервера; сокеты здесь не открываются."""
         self.running = True
         self.event_manager.post("app_start")
-        self.plugin_manager.load_plugins()
+        self.plugin_manager.load_plugins(plugin_dirs)
+        manifest = AssetManifest(plugin_asset_files(self.plugin_manager.plugins))
+        self.asset_distributor = AssetDistributor(
+            self.network, manifest,
+            chunk_size=self.assets_config.get("chunk_size", 32 * 1024),
+            bytes_per_second=self.assets_config.get("bytes_per_second", 512 * 1024),
+            log=self.logger,
+        )
+        self.logger.info(f"Манифест ресурсов плагинов: {len(manifest.files)} файлов, хэш {manifest.hash}")
+        self.job_scheduler.schedule_interval(self.auto_save_world, self.auto_save_interval)
+        if self.world.lod is not None and self.lod_report_interval:
+            self.job_scheduler.schedule_interval(self.report_lod, self.lod_report_interval)
+        if len(self.npcs.storage) and self.npc_report_interval:
+            self.job_scheduler.schedule_interval(self.report_npcs, self.npc_report_interval)
+        if self.metrics_config.get("port"):
+            self.metrics_server = MetricsServer(
+                self.metrics, self.metrics_config.get("host", "127.0.0.1"), self.metrics_config["port"], log=self.logger)
+            await self.metrics_server.start()
+
+    def run_tick(self, delta_time: float):
+        """Один такт мира: app_tick и задачи плагинов в пределах бюджета."""
+        started = time.perf_counter()
+        self.event_manager.post('app_tick', {'delta_time': delta_time})
+        self.work_scheduler.run()
+        duration = time.perf_counter() - started
+        self.tick_seconds.observe(duration)
+        self.tick_interval_seconds.observe(delta_time)
+        if duration > 1.0 / self.tick_rate:
+            self.tick_overruns.inc()
+
+    async def main_loop(self):
+        await self.start_systems()
         self.asyncio_loop.create_task(self.broadcast_world_state())
-        self.asyncio_loop.create_task(self.auto_save_world())
-        self.asyncio_loop.create_task(self.check_idle_players())
 
         last_tick_time = time.time()
         tick_interval = 1.0 / self.tick_rate
 
         try:
             while self.running:
+                self.job_scheduler.advance()
+
                 now = time.time()
                 delta_time = now - last_tick_time
                 
                 if delta_time >= tick_interval:
-                    self.event_manager.post('app_tick', {'delta_time': delta_time})
+                    self.run_tick(delta_time)
                     last_tick_time = now
 
+                # Опоздание пробуждения после sleep - время, которое задачи
+                # цикла (прием сообщений, вход игроков) ждали своей очереди.
+                sleep_started = time.perf_counter()
                 await asyncio.sleep(0.01)
+                self.loop_lag_seconds.observe(max(0.0, time.perf_counter() - sleep_started - 0.01))
 
         except KeyboardInterrupt:
             print("Сервер завершает работу...")
@@ -243,11 +555,13 @@ class ServerApp(Application):
         if self.running:
             for client_id, player_info in self.players.items():
                 if not player_info.get("is_dev", False):
-                    player_uuid = player_info.get("uuid")
-                    self.db.set_player_attribute(player_uuid, "pos", player_info["pos"])
-                    self.db.set_player_attribute(player_uuid, "name", player_info.get("name"))
+                    self._save_player(client_id)
             
             self.plugin_manager.unload_plugins()
+            self.path_service.shutdown()
+            if self.metrics_server is not None:
+                self.metrics_server.close()
+            self.network.stop_capture()
             super().stop()
             self.db.shutdown()
 
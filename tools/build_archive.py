@@ -0,0 +1,38 @@
+"""
+Сборка упакованного архива ресурсов (Panda3D Multifile с индексом) из
+nine/assets и ресурсов плагинов-папок. Одинаковые файлы хранятся один раз.
+
+Запуск: python -m tools.build_archive --output archives/base.mf
+"""
+import argparse
+from pathlib import Path
+
+from nine.core.archive import build_archive, collect_files
+
+PLUGIN_DIRS = ("nine/plugins", "plugins")
+
+
+def plugin_sources():
+    """Папки плагинов: в них кроме кода могут лежать ресурсы."""
+    for directory in PLUGIN_DIRS:
+        root = Path(directory)
+        if root.is_dir():
+            yield from (item for item in sorted(root.iterdir()) if (item / "__init__.py").exists())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", type=Path, default=Path("archives/base.mf"))
+    parser.add_argument("--source", action="append", default=None,
+                        help="каталог с ресурсами (можно несколько; по умолчанию nine/assets и папки плагинов)")
+    args = parser.parse_args()
+
+    sources = args.source or ["nine/assets", *plugin_sources()]
+    stats = build_archive(args.output, collect_files(sources))
+    saved = stats["bytes"] - stats["stored_bytes"]
+    print(f"{args.output}: {stats['files']} файлов, {stats['blobs']} уникальных, "
+          f"{stats['stored_bytes'] / 1024:.1f} КБ (дубликаты сэкономили {saved / 1024:.1f} КБ)")
+
+
+if __name__ == "__main__":
+    main()
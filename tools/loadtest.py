@@ -0,0 +1,389 @@
+"""
+Нагрузочный тест сервера: боты с быстрым входом (dev_auth) в одном или
+нескольких процессах двигаются по сценарию и пишут в общий чат.
+
+Замеряются задержка ответа сервера (ввод -> ack в world_state, сообщение
+чата -> его рассылка), трафик каждого клиента и стабильность такта
+(интервалы времени сервера "t" и приема world_state). Отчет каждого запуска
+пишется в JSON.
+
+Сценарии: walk (случайное блуждание), crowd (все идут в одну точку),
+teleport (блуждание и периодические прыжки через устаревший move, которые
+сервер должен отклонить), mixed (60% walk, 30% crowd, 10% teleport).
+
+Запуск: python -m tools.loadtest --clients 200 --processes 2 --duration 60
+Сервер должен разрешать dev_auth (allow_dev_client в server_config.json).
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import random
+import ssl
+import statistics
+import struct
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+SCENARIOS = ("walk", "crowd", "teleport", "mixed")
+MIXED = ("walk",) * 6 + ("crowd",) * 3 + ("teleport",)
+CHAT_PREFIX = "loadtest"
+
+# world_state разбирается без json.loads всего пакета: у ботов тысячи игроков
+# в каждом пакете, а нужны только "t" и "ack".
+WORLD_STATE_PREFIX = b'{"type":"world_state","t":'
+ACK_MARKER = b',"ack":'
+
+
+def summary(samples) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class Bot:
+    """Один клиент: соединение, сценарий движения и счетчики."""
+
+    def __init__(self, index: int, behaviour: str, args: argparse.Namespace, rng: random.Random, observer: bool):
+        self.index = index
+        self.name = f"bot{index}"
+        self.behaviour = behaviour
+        self.args = args
+        self.rng = rng
+        # Интервалы времени сервера одинаковы для всех ботов, их пишет один бот процесса.
+        self.observer = observer
+
+        self.writer = None
+        self.connected = False
+        self.closed = False
+        self.error = None
+        self.bytes_in = self.bytes_out = 0
+        self.frames_in = self.frames_out = 0
+        self.corrections = 0
+        self.connected_for = 0.0
+
+        self.pos = [0.0, 0.0, 0.0]
+        self.seq = 0
+        self.sim_rate = 30
+        self.expected_tick = None
+        self.direction = (0.0, 0.0)
+        self.sent_inputs = deque()  # (seq, время отправки)
+        self.sent_chat = {}  # текст -> время отправки
+
+        self.input_ack_ms = []
+        self.chat_ms = []
+        self.tick_intervals_ms = []
+        self.arrival_intervals_ms = []
+
+    def send(self, data: dict):
+        payload = json.dumps(data).encode("utf-8")
+        self.writer.write(struct.pack("!I", len(payload)) + payload)
+        self.bytes_out += len(payload) + 4
+        self.frames_out += 1
+
+    async def run(self, ssl_context, start_at: float, stop_at: float):
+        await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+        try:
+            reader, self.writer = await asyncio.wait_for(asyncio.open_connection(
+                self.args.host, self.args.port, ssl=ssl_context,
+                server_hostname=self.args.host if self.args.host != "localhost" else None,
+            ), timeout=10)
+            self.send({"type": "dev_auth", "name": self.name})
+            welcome = await asyncio.wait_for(self.read_until_welcome(reader), timeout=10)
+        except Exception as e:
+            self.error = type(e).__name__ if not str(e) else f"{type(e).__name__}: {e}"
+            return
+
+        self.connected = True
+        connected_at = time.monotonic()
+        self.pos = [float(v) for v in welcome["pos"]]
+        self.sim_rate = welcome.get("sim_rate", 30)
+        self.expected_tick = 1000.0 / welcome.get("tick_rate", 10)
+        read_task = asyncio.create_task(self.read_loop(reader))
+        try:
+            await self.drive(stop_at)
+        except (ConnectionError, OSError) as e:
+            self.error = type(e).__name__
+        finally:
+            self.connected_for = time.monotonic() - connected_at
+            read_task.cancel()
+            self.writer.close()
+
+    async def read_frame(self, reader) -> bytes:
+        header = await reader.readexactly(4)
+        payload = await reader.readexactly(struct.unpack("!I", header)[0])
+        self.bytes_in += len(payload) + 4
+        self.frames_in += 1
+        return payload
+
+    async def read_until_welcome(self, reader) -> dict:
+        while True:
+            data = json.loads(await self.read_frame(reader))
+            if data.get("type") == "welcome":
+                return data
+
+    async def read_loop(self, reader):
+        last_time = last_arrival = None
+        try:
+            while True:
+                payload = await self.read_frame(reader)
+                now = time.monotonic()
+                if payload.startswith(WORLD_STATE_PREFIX):
+                    start = len(WORLD_STATE_PREFIX)
+                    server_time = float(payload[start:payload.index(b",", start)])
+                    if last_arrival is not None:
+                        self.arrival_intervals_ms.append((now - last_arrival) * 1000)
+                        if self.observer:
+                            self.tick_intervals_ms.append((server_time - last_time) * 1000)
+                    last_time, last_arrival = server_time, now
+                    ack_at = payload.rfind(ACK_MARKER)
+                    if ack_at >= 0:
+                        self.on_ack(json.loads(payload[ack_at + len(ACK_MARKER):-1]), now)
+                    continue
+
+                data = json.loads(payload)
+                msg_type = data.get("type")
+                if msg_type == "position_correction":
+                    self.corrections += 1
+                    self.pos = [float(v) for v in data["pos"]]
+                elif msg_type == "chat_broadcast" and data.get("from_name") == self.name:
+                    sent_at = self.sent_chat.pop(data.get("message"), None)
+                    if sent_at is not None:
+                        self.chat_ms.append((now - sent_at) * 1000)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            if not self.error:
+                self.error = "disconnected"
+        finally:
+            self.closed = True
+
+    def on_ack(self, ack: dict, now: float):
+        seq = ack.get("seq")
+        if seq is None:
+            return
+        self.pos = [float(v) for v in ack["pos"]]
+        while self.sent_inputs and self.sent_inputs[0][0] <= seq:
+            _, sent_at = self.sent_inputs.popleft()
+            self.input_ack_ms.append((now - sent_at) * 1000)
+
+    def steer(self):
+        if self.behaviour == "crowd":
+            dx, dy = -self.pos[0], -self.pos[1]
+            distance = math.hypot(dx, dy)
+            if distance > 2.0:
+                self.direction = (dx / distance, dy / distance)
+            else:
+                angle = self.rng.uniform(0, 2 * math.pi)
+                self.direction = (math.cos(angle), math.sin(angle))
+        elif self.rng.random() < 1.0 / (self.args.input_rate * 2):
+            # Блуждание: новое направление в среднем раз в две секунды, иногда стоим.
+            if self.rng.random() < 0.2:
+                self.direction = (0.0, 0.0)
+            else:
+                angle = self.rng.uniform(0, 2 * math.pi)
+                self.direction = (math.cos(angle), math.sin(angle))
+
+    async def drive(self, stop_at: float):
+        interval = 1.0 / self.args.input_rate
+        steps = max(1, round(self.sim_rate / self.args.input_rate))
+        next_chat = time.monotonic() + self.rng.uniform(0, self.args.chat_interval) if self.args.chat_interval else None
+        next_teleport = time.monotonic() + self.args.teleport_interval
+        chat_count = 0
+
+        while time.monotonic() < stop_at and not self.closed:
+            self.steer()
+            dx, dy = self.direction
+            if dx or dy:
+                heading = math.degrees(math.atan2(-dx, dy))
+                commands = []
+                for _ in range(steps):
+                    self.seq += 1
+                    commands.append([self.seq, dx, dy, heading])
+                self.send({"type": "input", "commands": commands})
+                self.sent_inputs.append((self.seq, time.monotonic()))
+
+            now = time.monotonic()
+            if next_chat is not None and now >= next_chat:
+                chat_count += 1
+                text = f"{CHAT_PREFIX} {self.name} {chat_count}"
+                self.sent_chat[text] = now
+                self.send({"type": "chat_message", "message": text})
+                next_chat = now + self.args.chat_interval
+            if self.behaviour == "teleport" and now >= next_teleport:
+                jump = self.args.teleport_distance
+                self.send({"type": "move", "pos": [self.pos[0] + jump, self.pos[1] + jump, self.pos[2]], "rot": [0, 0, 0]})
+                next_teleport = now + self.args.teleport_interval
+
+            await self.writer.drain()
+            await asyncio.sleep(interval)
+
+    def result(self) -> dict:
+        return {
+            "name": self.name,
+            "behaviour": self.behaviour,
+            "connected": self.connected,
+            "error": self.error,
+            "seconds": round(self.connected_for, 3),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "corrections": self.corrections,
+        }
+
+
+def raise_file_limit():
+    """Тысячам соединений не хватает стандартного лимита открытых файлов."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+async def run_bots(indices, args: argparse.Namespace) -> dict:
+    ssl_context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    ssl_context.load_verify_locations(args.cert)
+
+    bots = []
+    for position, index in enumerate(indices):
+        behaviour = MIXED[index % len(MIXED)] if args.scenario == "mixed" else args.scenario
+        bots.append(Bot(index, behaviour, args, random.Random(args.seed + index), observer=position == 0))
+
+    now = time.monotonic()
+    ramp = args.ramp / max(1, args.clients)
+    stop_at = now + args.ramp + args.duration
+    await asyncio.gather(*(bot.run(ssl_context, now + index * ramp, stop_at) for bot, index in zip(bots, indices)))
+
+    return {
+        "bots": [bot.result() for bot in bots],
+        "input_ack_ms": [v for bot in bots for v in bot.input_ack_ms],
+        "chat_ms": [v for bot in bots for v in bot.chat_ms],
+        "tick_intervals_ms": [v for bot in bots for v in bot.tick_intervals_ms],
+        "arrival_intervals_ms": [v for bot in bots for v in bot.arrival_intervals_ms],
+        "expected_tick_ms": next((bot.expected_tick for bot in bots if bot.expected_tick), None),
+    }
+
+
+def run_process(indices, args: argparse.Namespace) -> dict:
+    raise_file_limit()
+    return asyncio.run(run_bots(indices, args))
+
+
+def build_report(args: argparse.Namespace, results, started: float, elapsed: float) -> dict:
+    bots = [bot for result in results for bot in result["bots"]]
+    connected = [bot for bot in bots if bot["connected"]]
+    expected = next((result["expected_tick_ms"] for result in results if result["expected_tick_ms"]), None)
+    tick_intervals = [v for result in results for v in result["tick_intervals_ms"]]
+
+    def rate(bot, field):
+        return bot[field] / bot["seconds"] / 1024 if bot["seconds"] else 0.0
+
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "elapsed_s": round(elapsed, 3),
+        "config": {key: value for key, value in vars(args).items() if key != "report"},
+        "clients": {
+            "requested": args.clients,
+            "connected": len(connected),
+            "errors": dict(Counter(bot["error"] for bot in bots if bot["error"])),
+            "by_behaviour": dict(Counter(bot["behaviour"] for bot in connected)),
+        },
+        "latency_ms": {
+            "input_ack": summary([v for result in results for v in result["input_ack_ms"]]),
+            "chat": summary([v for result in results for v in result["chat_ms"]]),
+        },
+        "traffic": {
+            "bytes_in_total": sum(bot["bytes_in"] for bot in bots),
+            "bytes_out_total": sum(bot["bytes_out"] for bot in bots),
+            "bytes_in_per_client": summary([bot["bytes_in"] for bot in connected]),
+            "bytes_out_per_client": summary([bot["bytes_out"] for bot in connected]),
+            "kib_in_per_second_per_client": summary([rate(bot, "bytes_in") for bot in connected]),
+            "kib_out_per_second_per_client": summary([rate(bot, "bytes_out") for bot in connected]),
+            "frames_in_per_client": summary([bot["frames_in"] for bot in connected]),
+        },
+        "ticks": {
+            "expected_interval_ms": expected,
+            "server_interval_ms": summary(tick_intervals),
+            "arrival_interval_ms": summary([v for result in results for v in result["arrival_intervals_ms"]]),
+            # Такт, который пришел позже чем через полтора ожидаемых интервала.
+            "overruns": sum(1 for v in tick_intervals if expected and v > expected * 1.5),
+        },
+        "position_corrections": sum(bot["corrections"] for bot in bots),
+        "clients_detail": bots if args.per_client else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=None, help="по умолчанию из server_config.json")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--cert", default="certs/cert.pem")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=30.0, help="секунд после подключения всех ботов")
+    parser.add_argument("--ramp", type=float, default=5.0, help="за сколько секунд подключаются все боты")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--input-rate", type=float, default=15.0, help="пакетов ввода в секунду на бота")
+    parser.add_argument("--chat-interval", type=float, default=30.0, help="секунд между сообщениями чата бота (0 - без чата)")
+    parser.add_argument("--teleport-interval", type=float, default=5.0)
+    parser.add_argument("--teleport-distance", type=float, default=40.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--per-client", action="store_true", help="добавить в отчет счетчики каждого бота")
+    parser.add_argument("--report", type=Path, default=None, help="по умолчанию loadtest-reports/<время>.json")
+    args = parser.parse_args()
+
+    config_path = Path("server_config.json")
+    config = json.loads(config_path.read_text()) if config_path.exists() else {}
+    args.host = args.host or config.get("host", "localhost")
+    args.port = args.port or config.get("port", 9009)
+
+    processes = max(1, min(args.processes, args.clients))
+    groups = [list(range(i, args.clients, processes)) for i in range(processes)]
+    print(f"Нагрузочный тест: {args.clients} ботов ({args.scenario}) в {processes} процессах, "
+          f"{args.host}:{args.port}, {args.ramp:.0f} с подключение + {args.duration:.0f} с нагрузка")
+
+    started = time.time()
+    began = time.perf_counter()
+    if processes == 1:
+        results = [run_process(groups[0], args)]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(run_process, [(group, args) for group in groups])
+    report = build_report(args, results, started, time.perf_counter() - began)
+
+    report_path = args.report or Path("loadtest-reports") / f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+    clients, latency, ticks = report["clients"], report["latency_ms"], report["ticks"]
+    print(f"Подключено: {clients['connected']}/{clients['requested']}, ошибки: {clients['errors'] or 'нет'}")
+    for name, stats in latency.items():
+        if stats["count"]:
+            print(f"Задержка {name}: p50 {stats['p50']} мс, p99 {stats['p99']} мс ({stats['count']} замеров)")
+    traffic = report["traffic"]
+    if traffic["kib_in_per_second_per_client"]["count"]:
+        print(f"Трафик на клиента: вход {traffic['kib_in_per_second_per_client']['mean']} КиБ/с, "
+              f"выход {traffic['kib_out_per_second_per_client']['mean']} КиБ/с")
+    if ticks["server_interval_ms"]["count"]:
+        print(f"Такт: ожидается {ticks['expected_interval_ms']:.1f} мс, p99 {ticks['server_interval_ms']['p99']} мс, "
+              f"задержанных тактов {ticks['overruns']}")
+    print(f"Отчет: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
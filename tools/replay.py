@@ -0,0 +1,220 @@
+"""
+Воспроизведение записанного входящего трафика (NetworkManager.start_capture,
+секция "capture" в server_config.json) на сервере в этом же процессе, без сокетов.
+
+Подключения, сообщения и отключения из файла передаются в ServerApp теми же
+событиями, что и от NetworkManager, а такты мира и рассылка world_state
+идут по времени записи с частотой tick_rate. Планировщик задач
+(автосохранение, отчеты LOD, очистка кэшей) тоже переводится на время
+записи, поэтому и без пауз задачи срабатывают так же часто, как на сервере.
+Проверка перемещений (MovementValidator) тоже идет по времени записи.
+Ответы клиентам пишутся в подставные соединения, которые только считают байты.
+
+С --speed 0 запись проигрывается без пауз, и время тактов показывает
+стоимость этой нагрузки.
+
+Запуск из каталога сервера (нужны server_config.json и плагины):
+    python -m tools.replay captures/20260101-200000.ncap --speed 0 --profile replay.prof
+Сервер работает во временном каталоге со своей базой, боевая nine.db не меняется.
+"""
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from nine.core.capture import CONNECT, DISCONNECT, MESSAGE, capture_info, read_capture
+from nine.core.network import ClientConnectedEvent, ClientDisconnectedEvent, MessageReceivedEvent
+from tools.loadtest import summary
+
+
+class NullWriter:
+    """Соединение клиента без сокета: считает отправленные байты."""
+
+    transport = None
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, data: bytes):
+        self.written += len(data)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Replay:
+    def __init__(self, app, speed: float):
+        self.app = app
+        self.speed = speed
+        self.interval = 1.0 / app.tick_rate
+        self.tick_ms = []
+        self.lag_ms = []
+        self.counts = {CONNECT: 0, MESSAGE: 0, DISCONNECT: 0}
+        self.bytes_sent = 0
+        self.duration = 0.0
+        # Текущее время записи: часы планировщика задач сервера.
+        self.now = 0.0
+        self._started = 0.0
+        app.job_scheduler.set_clock(lambda: self.now)
+        app.movement_validator.clock = lambda: self.now
+
+    async def wait(self, t: float):
+        """Ждет момента t записи (с учетом speed); без паузы при speed 0."""
+        if not self.speed:
+            return
+        delay = self._started + t / self.speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            self.lag_ms.append(-delay * 1000)
+
+    async def tick(self):
+        self.app.job_scheduler.advance()
+        started = time.perf_counter()
+        self.app.run_tick(self.interval)
+        await self.app.send_world_state()
+        # Даем выполниться задачам отправки, созданным обработчиками сообщений.
+        await asyncio.sleep(0)
+        self.tick_ms.append((time.perf_counter() - started) * 1000)
+
+    def apply(self, record):
+        app = self.app
+        self.counts[record.kind] += 1
+        if record.kind == CONNECT:
+            writer = NullWriter()
+            app.network.clients[record.client_id] = writer
+            app.event_manager.post("network_client_connected", ClientConnectedEvent(record.client_id, None, writer))
+        elif record.kind == MESSAGE:
+            if record.client_id in app.network.clients:
+                app.event_manager.post("network_message_received", MessageReceivedEvent(record.client_id, record.data))
+        elif record.kind == DISCONNECT:
+            writer = app.network.clients.get(record.client_id)
+            if writer is not None:
+                self.bytes_sent += writer.written
+                app.network.detach(record.client_id)
+                app.event_manager.post("network_client_disconnected", ClientDisconnectedEvent(record.client_id))
+
+    async def run(self, records, until: float = None):
+        self._started = time.perf_counter()
+        next_tick = self.interval
+        for record in records:
+            if until is not None and record.t > until:
+                break
+            while record.t >= next_tick:
+                await self.wait(next_tick)
+                self.now = next_tick
+                await self.tick()
+                next_tick += self.interval
+            await self.wait(record.t)
+            self.now = record.t
+            self.apply(record)
+            self.duration = record.t
+        await self.tick()
+        for writer in self.app.network.clients.values():
+            self.bytes_sent += writer.written
+        return time.perf_counter() - self._started
+
+
+def prepare_directory(server_dir: Path) -> Path:
+    """Временный каталог сервера с копией server_config.json без записи трафика и метрик."""
+    directory = Path(tempfile.mkdtemp(prefix="nine-replay-"))
+    config_path = server_dir / "server_config.json"
+    config = json.loads(config_path.read_text()) if config_path.exists() else {}
+    config.pop("capture", None)
+    config.pop("metrics", None)
+    (directory / "server_config.json").write_text(json.dumps(config))
+    return directory
+
+
+async def replay(args) -> dict:
+    import server
+
+    server_dir = Path(args.server_dir).resolve()
+    capture = Path(args.capture).resolve()
+    directory = prepare_directory(server_dir)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    profiler = cProfile.Profile() if args.profile else None
+    try:
+        with output:
+            app = server.ServerApp()
+            app.asyncio_loop = asyncio.get_running_loop()
+            await app.start_systems([str(server_dir / "nine" / "plugins"), str(server_dir / "plugins")])
+            session = Replay(app, args.speed)
+            if profiler is not None:
+                profiler.enable()
+            try:
+                wall = await session.run(read_capture(capture), until=args.until)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                app.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if profiler is not None:
+        profiler.dump_stats(args.profile)
+    return {
+        "capture": str(capture),
+        "captured_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(capture_info(capture))),
+        "speed": args.speed,
+        "captured_seconds": round(session.duration, 3),
+        "wall_seconds": round(wall, 3),
+        "records": {"connect": session.counts[CONNECT], "message": session.counts[MESSAGE],
+                    "disconnect": session.counts[DISCONNECT]},
+        "messages_per_second": round(session.counts[MESSAGE] / wall, 1) if wall else 0.0,
+        "bytes_sent": session.bytes_sent,
+        "ticks": {
+            "expected_interval_ms": session.interval * 1000,
+            "duration_ms": summary(session.tick_ms),
+            "total_ms": round(sum(session.tick_ms), 3),
+            "overruns": sum(1 for value in session.tick_ms if value > session.interval * 1000),
+        },
+        # Насколько воспроизведение отстает от времени записи (только при speed > 0).
+        "lag_ms": summary(session.lag_ms),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0, help="множитель скорости; 0 - без пауз")
+    parser.add_argument("--until", type=float, default=None, help="остановиться на этой секунде записи")
+    parser.add_argument("--server-dir", default=".", help="каталог с server_config.json и plugins")
+    parser.add_argument("--profile", type=Path, default=None, help="сохранить профиль cProfile (pstats)")
+    parser.add_argument("--report", type=Path, default=None, help="сохранить отчет в JSON")
+    parser.add_argument("--verbose", action="store_true", help="не скрывать вывод сервера")
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(args))
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+    records, ticks = report["records"], report["ticks"]
+    print(f"Запись {report['capture']} ({report['captured_at']}): {report['captured_seconds']} с, "
+          f"подключений {records['connect']}, сообщений {records['message']}, отключений {records['disconnect']}")
+    print(f"Воспроизведено за {report['wall_seconds']} с ({report['messages_per_second']} сообщений/с)")
+    duration = ticks["duration_ms"]
+    if duration["count"]:
+        print(f"Такт + world_state: p50 {duration['p50']} мс, p99 {duration['p99']} мс, max {duration['max']} мс, "
+              f"дольше {ticks['expected_interval_ms']:.1f} мс: {ticks['overruns']} из {duration['count']}")
+    if report["lag_ms"]["count"]:
+        print(f"Отставание от записи: p99 {report['lag_ms']['p99']} мс")
+    if args.profile:
+        print(f"Профиль: {args.profile} (python -m pstats {args.profile})")
+
+
+if __name__ == "__main__":
+    main()